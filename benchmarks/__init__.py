@@ -0,0 +1 @@
+"""Throughput benchmarks and a local CoinGecko stand-in server."""
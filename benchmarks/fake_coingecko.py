@@ -0,0 +1,187 @@
+"""
+Local CoinGecko stand-in for benchmarks and offline runs.
+
+Serves synthetic /ping, /coins/markets (paginated) and
+/coins/{id}/market_chart/range responses with configurable latency,
+error rate and 429 injection. Point the pipeline at it with
+COINGECKO_BASE_URL=http://127.0.0.1:<port>/api/v3.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = "/api/v3"
+
+class FakeMarket:
+    """Deterministic synthetic coin universe"""
+
+    def __init__(self, coins: int, seed: int = 42):
+        rng = random.Random(seed)
+        self.coins = []
+        for rank in range(1, coins + 1):
+            # Market caps fall off roughly as a power law with rank
+            price = 10 ** rng.uniform(-6, 5)
+            market_cap = int(2e12 / rank ** 1.3 * rng.uniform(0.8, 1.2)) + 1
+            self.coins.append({
+                "id": f"coin-{rank}",
+                "symbol": f"c{rank}",
+                "name": f"Coin {rank}",
+                "current_price": round(price, 8),
+                "market_cap": market_cap,
+                "market_cap_rank": rank,
+                "total_volume": int(market_cap * rng.uniform(0.01, 0.3)),
+                "price_change_percentage_24h": round(rng.gauss(0, 5), 4),
+                "circulating_supply": round(market_cap / price, 2)
+            })
+        self.by_id = {coin["id"]: coin for coin in self.coins}
+
+    def markets(self, page: int, per_page: int, ids: Optional[List[str]] = None) -> List[Dict]:
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        if ids:
+            selected = [self.by_id[i] for i in ids if i in self.by_id]
+        else:
+            selected = self.coins[(page - 1) * per_page:page * per_page]
+        return [dict(coin, last_updated=now) for coin in selected]
+
+    def market_chart_range(self, coin_id: str, start: int, end: int) -> Optional[Dict]:
+        coin = self.by_id.get(coin_id)
+        if coin is None:
+            return None
+
+        # Hourly points for ranges up to 90 days, daily beyond (as the real API does)
+        step = 3600 if end - start <= 90 * 86400 else 86400
+        rng = random.Random(coin_id)
+        price, market_cap = coin["current_price"], coin["market_cap"]
+        prices, market_caps, volumes = [], [], []
+        for ts in range(start - start % step + step, end + 1, step):
+            drift = math.exp(rng.gauss(0, 0.02))
+            price *= drift
+            market_cap *= drift
+            ms = ts * 1000
+            prices.append([ms, price])
+            market_caps.append([ms, market_cap])
+            volumes.append([ms, market_cap * 0.05])
+        return {"prices": prices, "market_caps": market_caps, "total_volumes": volumes}
+
+class FakeCoinGeckoServer:
+    """Threaded HTTP server wrapping FakeMarket with fault injection"""
+
+    def __init__(self, coins: int = 1000, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 seed: int = 42):
+        self.market = FakeMarket(coins, seed=seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.requests_served = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> "FakeCoinGeckoServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _roll(self) -> float:
+        with self._lock:
+            self.requests_served += 1
+            return self._rng.random()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+
+                roll = server._roll()
+                if roll < server.throttle_rate:
+                    return self._send(429, {"status": {"error_code": 429}}, {"Retry-After": "1"})
+                if roll < server.throttle_rate + server.error_rate:
+                    return self._send(500, {"error": "injected failure"})
+
+                url = urlparse(self.path)
+                path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else url.path
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+                if path == "/ping":
+                    return self._send(200, {"gecko_says": "(V3) To the Moon!"})
+
+                if path == "/coins/markets":
+                    ids = query["ids"].split(",") if query.get("ids") else None
+                    page = int(query.get("page", 1))
+                    per_page = min(int(query.get("per_page", 100)), 250)
+                    return self._send(200, server.market.markets(page, per_page, ids))
+
+                parts = path.strip("/").split("/")
+                if len(parts) == 4 and parts[0] == "coins" and parts[2:] == ["market_chart", "range"]:
+                    chart = server.market.market_chart_range(parts[1], int(query["from"]), int(query["to"]))
+                    if chart is None:
+                        return self._send(404, {"error": "coin not found"})
+                    return self._send(200, chart)
+
+                self._send(404, {"error": "not found"})
+
+            def _send(self, status: int, body, headers: Optional[Dict] = None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake CoinGecko API")
+    parser.add_argument("--coins", type=int, default=1000, help="Size of the synthetic coin universe")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = FakeCoinGeckoServer(
+        coins=args.coins, host=args.host, port=args.port, latency=args.latency,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate
+    )
+    print(f"Fake CoinGecko serving {args.coins} coins at {server.base_url}")
+    try:
+        server.start()._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
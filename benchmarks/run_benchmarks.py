@@ -0,0 +1,179 @@
+"""
+End-to-end throughput benchmarks against the local fake CoinGecko server.
+
+Each universe size runs in a fresh interpreter so peak RSS is per size.
+Extract and transform always run; load and the full run_etl_pipeline need
+--with-db and write into DATABASE_URL, so point that at a scratch database.
+
+    python -m benchmarks.run_benchmarks --sizes 50,1000,10000,100000
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+DEFAULT_SIZES = "50,1000,10000,100000"
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _stage(name: str, rows: int, seconds: float) -> Dict:
+    return {
+        'stage': name,
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(rows / seconds, 1) if seconds > 0 else 0.0,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+def run_single(size: int, args) -> Dict:
+    """Benchmark every stage for one universe size in this process"""
+
+    from .fake_coingecko import FakeCoinGeckoServer
+
+    server = FakeCoinGeckoServer(
+        coins=size, latency=args.latency,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate
+    ).start()
+
+    # The ETL reads its settings at import time
+    os.environ['COINGECKO_BASE_URL'] = server.base_url
+    os.environ['API_CALLS_PER_MINUTE'] = '0'
+    os.environ['API_CACHE_MODE'] = 'off'
+    os.environ['ETL_COIN_LIMIT'] = str(size)
+    if args.workers:
+        os.environ['EXTRACT_WORKERS'] = str(args.workers)
+
+    from etl.extract import CryptoExtractor
+    from etl.transform import CryptoTransformer
+
+    stages = []
+    try:
+        extractor = CryptoExtractor()
+        start = time.perf_counter()
+        raw_data = extractor.extract_top_coins(limit=size)
+        stages.append(_stage('extract', len(raw_data), time.perf_counter() - start))
+
+        transformer = CryptoTransformer()
+        start = time.perf_counter()
+        clean_data = transformer.transform(raw_data)
+        stages.append(_stage('transform', len(clean_data), time.perf_counter() - start))
+
+        if args.with_db:
+            from etl.load import CryptoLoader
+            from etl.pipeline import run_etl_pipeline
+
+            loader = CryptoLoader()
+            loader.create_tables()
+            start = time.perf_counter()
+            loaded = loader.load_data(clean_data)
+            stages.append(_stage('load', loaded, time.perf_counter() - start))
+
+            start = time.perf_counter()
+            result = run_etl_pipeline(limit=size)
+            if not result['success']:
+                raise RuntimeError(result['error'])
+            stages.append(_stage('pipeline', len(clean_data), time.perf_counter() - start))
+    finally:
+        server.stop()
+
+    return {
+        'size': size,
+        'stages': stages,
+        'api_stats': extractor.get_request_stats(),
+        'requests_served': server.requests_served
+    }
+
+def run_isolated(size: int, args) -> Dict:
+    """Run one size in a child interpreter and collect its JSON result"""
+
+    command = [
+        sys.executable, "-m", "benchmarks.run_benchmarks", "--single", str(size),
+        "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+        "--throttle-rate", str(args.throttle_rate)
+    ]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    if args.with_db:
+        command.append("--with-db")
+
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark for {size} coins failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def compare_to_baseline(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Stages whose rows/sec dropped by more than tolerance versus the baseline"""
+
+    previous = {
+        (run['size'], stage['stage']): stage['rows_per_second']
+        for run in baseline for stage in run['stages']
+    }
+    regressions = []
+    for run in results:
+        for stage in run['stages']:
+            before = previous.get((run['size'], stage['stage']))
+            if before and stage['rows_per_second'] < before * (1 - tolerance):
+                regressions.append(
+                    f"{stage['stage']} @ {run['size']} coins: "
+                    f"{stage['rows_per_second']:.0f} rows/s vs {before:.0f} baseline"
+                )
+    return regressions
+
+def print_report(results: List[Dict]) -> None:
+    print(f"{'coins':>8} {'stage':<10} {'rows':>8} {'seconds':>9} {'rows/s':>11} {'peak RSS MB':>12}")
+    for run in results:
+        for stage in run['stages']:
+            print(
+                f"{run['size']:>8} {stage['stage']:<10} {stage['rows']:>8} {stage['seconds']:>9.3f} "
+                f"{stage['rows_per_second']:>11.0f} {stage['peak_rss_mb']:>12.1f}"
+            )
+        stats = run['api_stats']
+        print(f"{'':>8} api: {stats['requests']} requests, {stats['retries']} retries, "
+              f"p95 {stats['p95_latency_seconds'] * 1000:.1f} ms")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ETL throughput benchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated universe sizes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake API latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--workers", type=int, help="Extraction workers")
+    parser.add_argument("--with-db", action="store_true", help="Also benchmark load and run_etl_pipeline")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Fail if rows/sec regressed versus this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed rows/sec drop vs baseline")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args)))
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = [run_isolated(size, args) for size in sizes]
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
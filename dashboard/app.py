@@ -4,12 +4,18 @@ import plotly.express as px
 import plotly.graph_objects as go
 import sys
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Add parent directory to path to import ETL config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from etl.config import DATABASE_URL
-from sqlalchemy import create_engine
+from dashboard.queries import (
+    MAX_TOP_N, load_filter_options, load_filtered_summary, load_headline_metrics,
+    load_performance_breakdowns, load_price_trends, load_intraday_prices, load_dims
+)
 
 # Page configuration
 st.set_page_config(
@@ -19,64 +25,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-@st.cache_data(ttl=300)
-def load_data():
-    """Load data from PostgreSQL using dbt marts"""
+def load_data(top_n, selected_tier, selected_performance, price_range):
+    """Run the filtered dbt mart queries concurrently; each result is cached per filter combination"""
     
-    try:
-        engine = create_engine(DATABASE_URL)
-        
-        # Load latest summary data (from dbt marts)
-        summary_query = "SELECT * FROM crypto_summary ORDER BY latest_rank LIMIT 50"
-        summary_df = pd.read_sql(summary_query, engine)
-        
-        # Load daily trends for charts (from dbt marts)
-        daily_query = """
-        SELECT * FROM crypto_daily 
-        WHERE extracted_date >= CURRENT_DATE - INTERVAL '7 days'
-        AND crypto_id IN (
-            SELECT crypto_id FROM crypto_summary 
-            WHERE latest_rank <= 20
-        )
-        ORDER BY extracted_date DESC, avg_market_cap_billions DESC
-        """
-        daily_df = pd.read_sql(daily_query, engine)
-        
-        # Load crypto performance analytics 
-        performance_query = """
-        SELECT 
-            symbol, name, category, price_range, performance_name, signal_type,
-            avg_price, avg_market_cap_billions, avg_price_change_24h, 
-            best_rank, liquidity_status, date_actual
-        FROM crypto_performance 
-        WHERE date_actual >= CURRENT_DATE - INTERVAL '7 days'
-        ORDER BY date_actual DESC, best_rank ASC
-        LIMIT 200
-        """
-        performance_df = pd.read_sql(performance_query, engine)
-        
-        # Load dimension data for filtering
-        dims_query = """
-        SELECT 
-            'market_tier' as dim_type, tier_name as name, tier_description as description 
-        FROM dim_market_tier
-        UNION ALL
-        SELECT 
-            'price_category' as dim_type, category_name as name, category_description as description 
-        FROM dim_price_category
-        UNION ALL
-        SELECT 
-            'performance' as dim_type, performance_name as name, performance_description as description 
-        FROM dim_performance
-        """
-        dims_df = pd.read_sql(dims_query, engine)
-        
-        return summary_df, daily_df, performance_df, dims_df
-        
-    except Exception as e:
-        st.error(f"Database connection failed: {e}")
-        st.error(f"Using DATABASE_URL: {DATABASE_URL}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    queries = {
+        'display': lambda: load_filtered_summary(top_n, selected_tier, selected_performance, price_range),
+        'headline': lambda: load_headline_metrics(top_n, selected_tier, selected_performance, price_range),
+        'breakdowns': load_performance_breakdowns,
+        'trends': load_price_trends,
+        'intraday': load_intraday_prices,
+        'dims': load_dims
+    }
+    
+    # Worker threads need the session's script context for st.cache_data
+    ctx = get_script_run_ctx()
+    
+    with ThreadPoolExecutor(
+        max_workers=len(queries),
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+    ) as pool:
+        futures = {name: pool.submit(query) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
 
 def main():
     # Header
@@ -84,11 +53,15 @@ def main():
     st.markdown("*CoinGecko ETL Pipeline with dbt Dimensional Modeling*")
     st.markdown("**Data Flow**: CoinGecko API → Python ETL → PostgreSQL → dbt (Star Schema) → Streamlit")
     
-    # Load data
-    with st.spinner("Loading data from dbt marts..."):
-        summary_df, daily_df, performance_df, dims_df = load_data()
+    # Load filter options
+    try:
+        options = load_filter_options()
+    except Exception as e:
+        st.error(f"Database connection failed: {e}")
+        st.error(f"Using DATABASE_URL: {DATABASE_URL}")
+        options = {'total_records': 0}
     
-    if summary_df.empty:
+    if not options['total_records']:
         st.warning("No data available. Please run the ETL pipeline!")
         st.code("python -m etl.prefect_flow", language="bash")
         return
@@ -97,61 +70,56 @@ def main():
     st.sidebar.header("Filters")
     
     # Basic filters
-    top_n = st.sidebar.slider("Show Top N Cryptocurrencies", 10, 50, 20)
+    top_n = st.sidebar.slider("Show Top N Cryptocurrencies", 10, MAX_TOP_N, 20)
     
     # Dimensional filters
-    if not summary_df.empty:
-        market_tiers = ["All"] + sorted(summary_df['market_tier'].unique().tolist())
-        selected_tier = st.sidebar.selectbox("Market Tier", market_tiers)
-        
-        performance_types = ["All"] + sorted(summary_df['performance_24h'].unique().tolist())
-        selected_performance = st.sidebar.selectbox("Performance Type", performance_types)
-        
-        # Price range filter
-        if not summary_df['latest_price'].empty:
-            price_range = st.sidebar.slider(
-                "Price Range ($)", 
-                float(summary_df['latest_price'].min()), 
-                float(summary_df['latest_price'].max()),
-                (float(summary_df['latest_price'].min()), float(summary_df['latest_price'].max()))
-            )
+    market_tiers = ["All"] + list(options['market_tiers'])
+    selected_tier = st.sidebar.selectbox("Market Tier", market_tiers)
     
-    # Filter data
-    display_df = summary_df.head(top_n).copy()
+    performance_types = ["All"] + list(options['performance_types'])
+    selected_performance = st.sidebar.selectbox("Performance Type", performance_types)
     
-    if not summary_df.empty:
-        if selected_tier != "All":
-            display_df = display_df[display_df['market_tier'] == selected_tier]
-        if selected_performance != "All":
-            display_df = display_df[display_df['performance_24h'] == selected_performance]
-        display_df = display_df[
-            (display_df['latest_price'] >= price_range[0]) & 
-            (display_df['latest_price'] <= price_range[1])
-        ]
+    # Price range filter
+    price_range = st.sidebar.slider(
+        "Price Range ($)", 
+        float(options['price_min']), 
+        float(options['price_max']),
+        (float(options['price_min']), float(options['price_max']))
+    )
+    
+    # Filtered data, computed in Postgres
+    with st.spinner("Loading data from dbt marts..."):
+        try:
+            data = load_data(top_n, selected_tier, selected_performance, price_range)
+        except Exception as e:
+            st.error(f"Database query failed: {e}")
+            return
+    
+    display_df = data['display']
+    headline = data['headline']
+    breakdowns = data['breakdowns']
+    trend_data = data['trends']
+    intraday_data = data['intraday']
     
     # Key Metrics
     st.subheader("Market Overview")
     col1, col2, col3, col4, col5 = st.columns(5)
     
-    if not display_df.empty:
+    if headline['cryptocurrencies']:
         with col1:
-            total_cryptos = len(display_df)
-            st.metric("Cryptocurrencies", total_cryptos)
+            st.metric("Cryptocurrencies", headline['cryptocurrencies'])
         
         with col2:
-            total_market_cap = display_df['latest_market_cap_billions'].sum()
-            st.metric("Total Market Cap", f"${total_market_cap:.1f}B")
+            st.metric("Total Market Cap", f"${headline['total_market_cap_billions']:.1f}B")
         
         with col3:
-            avg_change = display_df['latest_price_change_24h'].mean()
-            st.metric("Avg 24h Change", f"{avg_change:.2f}%")
+            st.metric("Avg 24h Change", f"{headline['avg_price_change_24h']:.2f}%")
         
         with col4:
-            gainers = len(display_df[display_df['latest_price_change_24h'] > 0])
-            st.metric("Gainers", f"{gainers}/{len(display_df)}")
+            st.metric("Gainers", f"{headline['gainers']}/{headline['cryptocurrencies']}")
         
         with col5:
-            last_update = summary_df['last_updated'].max()
+            last_update = options['last_updated']
             st.metric("Last Updated", last_update.strftime("%H:%M"))
     
     # Charts Section
@@ -201,13 +169,13 @@ def main():
                 st.plotly_chart(fig_change, use_container_width=True)
     
     with tab2:
-        if not performance_df.empty:
+        if not breakdowns['signal_type'].empty:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Performance signal distribution
                 st.subheader("Trading Signals Distribution")
-                signal_counts = performance_df.groupby('signal_type').size().reset_index(name='count')
+                signal_counts = breakdowns['signal_type']
                 fig_signals = px.pie(
                     signal_counts, 
                     values='count', 
@@ -220,7 +188,7 @@ def main():
             with col2:
                 # Liquidity analysis
                 st.subheader("Liquidity Status")
-                liquidity_counts = performance_df.groupby('liquidity_status').size().reset_index(name='count')
+                liquidity_counts = breakdowns['liquidity_status']
                 fig_liquidity = px.bar(
                     liquidity_counts,
                     x='liquidity_status',
@@ -231,16 +199,13 @@ def main():
                 st.plotly_chart(fig_liquidity, use_container_width=True)
     
     with tab3:
-        if not performance_df.empty:
+        if not breakdowns['category'].empty:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Category analysis
                 st.subheader("Category Performance")
-                category_perf = performance_df.groupby('category').agg({
-                    'avg_price_change_24h': 'mean',
-                    'avg_market_cap_billions': 'sum'
-                }).reset_index()
+                category_perf = breakdowns['category']
                 
                 fig_category = px.scatter(
                     category_perf,
@@ -256,7 +221,7 @@ def main():
             with col2:
                 # Price range distribution
                 st.subheader("Price Range Analysis")
-                price_range_counts = performance_df.groupby('price_range').size().reset_index(name='count')
+                price_range_counts = breakdowns['price_range']
                 fig_price_range = px.bar(
                     price_range_counts,
                     x='price_range',
@@ -267,14 +232,10 @@ def main():
                 st.plotly_chart(fig_price_range, use_container_width=True)
     
     with tab4:
-        if not daily_df.empty:
-            # Time series trend
+        if not trend_data.empty:
+            # Time series trend (top 8 by market cap, selected in Postgres)
             st.subheader("Price Trends (Last 7 Days)")
             
-            # Select top cryptocurrencies for trend analysis
-            top_cryptos = daily_df.groupby('symbol')['avg_market_cap_billions'].max().nlargest(8).index
-            trend_data = daily_df[daily_df['symbol'].isin(top_cryptos)]
-            
             fig_trends = px.line(
                 trend_data,
                 x='extracted_date',
@@ -285,6 +246,21 @@ def main():
             )
             fig_trends.update_layout(height=500)
             st.plotly_chart(fig_trends, use_container_width=True)
+        
+        if not intraday_data.empty:
+            # Every snapshot of the last 24 hours, from the ETL's in-memory price store snapshot
+            st.subheader("Intraday Prices (Last 24 Hours)")
+            
+            fig_intraday = px.line(
+                intraday_data,
+                x='last_updated',
+                y='current_price',
+                color='crypto_id',
+                title="Intraday Prices - Top 8 by Market Cap",
+                log_y=True
+            )
+            fig_intraday.update_layout(height=500)
+            st.plotly_chart(fig_intraday, use_container_width=True)
     
     # Data table
     st.subheader("Cryptocurrency Rankings")
@@ -294,16 +270,22 @@ def main():
         display_cols = [
             'latest_rank', 'name', 'symbol', 'latest_price', 
             'latest_market_cap_billions', 'latest_price_change_24h', 
-            'performance_24h', 'market_tier', 'volatility_tier'
+            'performance_24h', 'market_tier', 'volatility_tier',
+            'volatility', 'rsi', 'drawdown'
         ]
         
         formatted_df = display_df[display_cols].copy()
         formatted_df['latest_price'] = formatted_df['latest_price'].apply(lambda x: f"${x:,.4f}")
         formatted_df['latest_market_cap_billions'] = formatted_df['latest_market_cap_billions'].apply(lambda x: f"${x:.2f}B")
         formatted_df['latest_price_change_24h'] = formatted_df['latest_price_change_24h'].apply(lambda x: f"{x:+.2f}%")
+        # Indicators are missing until a coin has enough snapshots
+        formatted_df['volatility'] = formatted_df['volatility'].apply(lambda x: f"{x:.0%}" if pd.notna(x) else "-")
+        formatted_df['rsi'] = formatted_df['rsi'].apply(lambda x: f"{x:.0f}" if pd.notna(x) else "-")
+        formatted_df['drawdown'] = formatted_df['drawdown'].apply(lambda x: f"{x:.1%}" if pd.notna(x) else "-")
         
         # Rename columns for display
-        formatted_df.columns = ['Rank', 'Name', 'Symbol', 'Price', 'Market Cap', '24h Change', 'Performance', 'Market Tier', 'Volatility']
+        formatted_df.columns = ['Rank', 'Name', 'Symbol', 'Price', 'Market Cap', '24h Change', 'Performance', 'Market Tier', 'Volatility',
+                                'Ann. Volatility', 'RSI', 'Drawdown']
         
         st.dataframe(formatted_df, use_container_width=True)
     
@@ -337,7 +319,7 @@ def main():
         
         **4. Visualization Layer**
         - **Streamlit**: Interactive dashboard with dimensional filtering
-        - **Real-time refresh**: 5-minute cache with manual refresh option
+        - **Real-time refresh**: pooled connections, concurrent queries, 5-minute fact cache and daily dimension cache
         
         **Tech Stack**: Python, PostgreSQL, dbt, Prefect, Streamlit, Plotly
         """)
@@ -346,14 +328,11 @@ def main():
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Data Management**")
     
-    if not summary_df.empty:
-        last_run = summary_df['last_updated'].max()
-        st.sidebar.success(f"Updated: {last_run.strftime('%Y-%m-%d %H:%M')}")
-        
-        # Show data quality metrics
-        total_records = len(summary_df)
-        active_cryptos = len(summary_df[summary_df['data_quality_flag'] == 'Single Record'])
-        st.sidebar.info(f"{total_records} total records")
+    last_run = options['last_updated']
+    st.sidebar.success(f"Updated: {last_run.strftime('%Y-%m-%d %H:%M')}")
+    
+    # Show data quality metrics
+    st.sidebar.info(f"{options['total_records']} total records")
     
     st.sidebar.markdown("**Pipeline Control**")
     if st.sidebar.button("Run Pipeline"):
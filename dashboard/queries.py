@@ -0,0 +1,200 @@
+"""
+Query layer for the Streamlit dashboard.
+
+Sidebar filters become bind parameters and every filter, top-N and
+aggregation runs in Postgres, so only display-sized results cross the wire.
+Each function is cached per argument combination.
+"""
+import streamlit as st
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from sqlalchemy import create_engine, text
+
+from etl.config import (
+    DATABASE_URL, DASHBOARD_POOL_SIZE, DASHBOARD_MAX_OVERFLOW,
+    DASHBOARD_FACT_TTL, DASHBOARD_DIM_TTL, VS_CURRENCIES, STORE_DIR
+)
+from etl.price_store import PriceStore
+
+# Upper bound of the "Top N" slider; filter options come from this many top coins
+MAX_TOP_N = 50
+
+@st.cache_resource
+def get_engine():
+    """Process-wide pooled engine shared by every session"""
+    return create_engine(
+        DATABASE_URL,
+        pool_size=DASHBOARD_POOL_SIZE,
+        max_overflow=DASHBOARD_MAX_OVERFLOW,
+        pool_pre_ping=True
+    )
+
+def _read(sql: str, params: Optional[Dict] = None) -> pd.DataFrame:
+    with get_engine().connect() as conn:
+        return pd.read_sql(text(sql), conn, params=params or {})
+
+def _filtered_summary_cte(top_n: int, tier: str, performance: str,
+                          price_range: Tuple[float, float]) -> Tuple[str, Dict]:
+    """Top-N coins by rank, then the sidebar filters (same order the UI applies them)"""
+
+    conditions = ["latest_price BETWEEN :price_min AND :price_max"]
+    params = {'top_n': top_n, 'price_min': price_range[0], 'price_max': price_range[1]}
+
+    if tier != "All":
+        conditions.append("market_tier = :tier")
+        params['tier'] = tier
+    if performance != "All":
+        conditions.append("performance_24h = :performance")
+        params['performance'] = performance
+
+    cte = f"""
+    WITH top_n AS (
+        SELECT * FROM crypto_summary ORDER BY latest_rank LIMIT :top_n
+    ),
+    filtered AS (
+        SELECT * FROM top_n WHERE {' AND '.join(conditions)}
+    )
+    """
+    return cte, params
+
+@st.cache_data(ttl=DASHBOARD_FACT_TTL, show_spinner=False)
+def load_filter_options() -> Dict:
+    """Sidebar choices, price bounds and freshness of the latest snapshot"""
+
+    options = _read("""
+    WITH top_n AS (
+        SELECT * FROM crypto_summary ORDER BY latest_rank LIMIT :max_top_n
+    )
+    SELECT
+        ARRAY(SELECT DISTINCT market_tier FROM top_n ORDER BY 1) as market_tiers,
+        ARRAY(SELECT DISTINCT performance_24h FROM top_n ORDER BY 1) as performance_types,
+        (SELECT MIN(latest_price) FROM top_n) as price_min,
+        (SELECT MAX(latest_price) FROM top_n) as price_max,
+        (SELECT COUNT(*) FROM crypto_summary) as total_records,
+        (SELECT MAX(last_updated) FROM crypto_summary) as last_updated
+    """, {'max_top_n': MAX_TOP_N})
+
+    return options.iloc[0].to_dict()
+
+@st.cache_data(ttl=DASHBOARD_FACT_TTL, show_spinner=False)
+def load_filtered_summary(top_n: int, tier: str, performance: str,
+                          price_range: Tuple[float, float]) -> pd.DataFrame:
+    """Rows for the charts and rankings table, with each coin's latest technical indicators"""
+
+    cte, params = _filtered_summary_cte(top_n, tier, performance, price_range)
+    params['vs_currency'] = VS_CURRENCIES[0]
+    return _read(cte + """
+    SELECT
+        f.latest_rank, f.name, f.symbol, f.latest_price, f.latest_market_cap_billions,
+        f.latest_price_change_24h, f.performance_24h, f.market_tier, f.volatility_tier,
+        i.volatility, i.rsi, i.drawdown
+    FROM filtered f
+    LEFT JOIN crypto_indicators_latest i
+        ON i.crypto_id = f.crypto_id AND i.vs_currency = :vs_currency
+    ORDER BY f.latest_rank
+    """, params)
+
+@st.cache_data(ttl=DASHBOARD_FACT_TTL, show_spinner=False)
+def load_headline_metrics(top_n: int, tier: str, performance: str,
+                          price_range: Tuple[float, float]) -> Dict:
+    """Market overview metrics aggregated server-side"""
+
+    cte, params = _filtered_summary_cte(top_n, tier, performance, price_range)
+    metrics = _read(cte + """
+    SELECT
+        COUNT(*) as cryptocurrencies,
+        COALESCE(SUM(latest_market_cap_billions), 0) as total_market_cap_billions,
+        AVG(latest_price_change_24h) as avg_price_change_24h,
+        COUNT(*) FILTER (WHERE latest_price_change_24h > 0) as gainers
+    FROM filtered
+    """, params)
+
+    return metrics.iloc[0].to_dict()
+
+@st.cache_data(ttl=DASHBOARD_FACT_TTL, show_spinner=False)
+def load_performance_breakdowns(days: int = 7) -> Dict[str, pd.DataFrame]:
+    """Signal, liquidity, category and price range breakdowns in one GROUPING SETS query"""
+
+    breakdowns = _read("""
+    SELECT
+        signal_type, liquidity_status, category, price_range,
+        GROUPING(signal_type, liquidity_status, category, price_range) as grouping_id,
+        COUNT(*) as count,
+        AVG(avg_price_change_24h) as avg_price_change_24h,
+        SUM(avg_market_cap_billions) as avg_market_cap_billions
+    FROM crypto_performance
+    WHERE date_actual >= CURRENT_DATE - make_interval(days => :days)
+    GROUP BY GROUPING SETS ((signal_type), (liquidity_status), (category), (price_range))
+    """, {'days': days})
+
+    # GROUPING() sets a bit for every column not grouped on; exactly one column is grouped per set
+    grouped_on = {0b0111: 'signal_type', 0b1011: 'liquidity_status', 0b1101: 'category', 0b1110: 'price_range'}
+    result = {}
+    for grouping_id, column in grouped_on.items():
+        rows = breakdowns[breakdowns['grouping_id'] == grouping_id]
+        if column == 'category':
+            result[column] = rows[[column, 'avg_price_change_24h', 'avg_market_cap_billions']].reset_index(drop=True)
+        else:
+            result[column] = rows[[column, 'count']].reset_index(drop=True)
+    return result
+
+@st.cache_data(ttl=DASHBOARD_FACT_TTL, show_spinner=False)
+def load_price_trends(top_symbols: int = 8, days: int = 7, rank_limit: int = 20) -> pd.DataFrame:
+    """Daily prices for the largest coins (by peak market cap in the window)"""
+
+    return _read("""
+    WITH recent AS (
+        SELECT d.*
+        FROM crypto_daily d
+        JOIN crypto_summary s ON s.crypto_id = d.crypto_id
+        WHERE d.extracted_date >= CURRENT_DATE - make_interval(days => :days)
+          AND s.latest_rank <= :rank_limit
+    ),
+    top_symbols AS (
+        SELECT symbol
+        FROM recent
+        GROUP BY symbol
+        ORDER BY MAX(avg_market_cap_billions) DESC
+        LIMIT :top_symbols
+    )
+    SELECT extracted_date, symbol, name, avg_price, avg_market_cap_billions
+    FROM recent
+    WHERE symbol IN (SELECT symbol FROM top_symbols)
+    ORDER BY extracted_date DESC, avg_market_cap_billions DESC
+    """, {'days': days, 'rank_limit': rank_limit, 'top_symbols': top_symbols})
+
+@st.cache_resource(ttl=DASHBOARD_FACT_TTL)
+def get_price_store() -> Optional[PriceStore]:
+    """Recent prices memory-mapped from the ETL's price store snapshot (None until one is written)"""
+    return PriceStore.open(STORE_DIR)
+
+def load_intraday_prices(top_coins: int = 8, hours: int = 24) -> pd.DataFrame:
+    """Every stored snapshot of the largest coins over the last hours, served from memory"""
+
+    store = get_price_store()
+    if store is None or store.newest() is None:
+        return pd.DataFrame()
+
+    vs_currency = VS_CURRENCIES[0]
+    since = store.newest() - pd.Timedelta(hours=hours)
+    top = store.top_n(top_coins, by='market_cap', vs_currency=vs_currency)
+    windows = [store.window(crypto_id, vs_currency, since=since) for crypto_id in top['crypto_id']]
+    return pd.concat(windows, ignore_index=True) if windows else pd.DataFrame()
+
+@st.cache_data(ttl=DASHBOARD_DIM_TTL, show_spinner=False)
+def load_dims() -> pd.DataFrame:
+    """Dimension data for filtering (static, cached much longer than facts)"""
+
+    return _read("""
+    SELECT
+        'market_tier' as dim_type, tier_name as name, tier_description as description
+    FROM dim_market_tier
+    UNION ALL
+    SELECT
+        'price_category' as dim_type, category_name as name, category_description as description
+    FROM dim_price_category
+    UNION ALL
+    SELECT
+        'performance' as dim_type, performance_name as name, performance_description as description
+    FROM dim_performance
+    """)
@@ -1,7 +1,34 @@
 -- Intermediate layer
-{{ config(materialized='view') }}
+-- Incremental: days with rows loaded or revised since the last loaded_at watermark (less
+-- incremental_lookback) and the trailing reprocess_days are re-aggregated.
+-- Rebuild everything with `dbt run --full-refresh`.
+{{ config(
+    materialized='incremental',
+    unique_key=['crypto_id', 'extracted_date'],
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns',
+    post_hook="DELETE FROM {{ this }} WHERE extracted_date < CURRENT_DATE - INTERVAL '90 days'"
+) }}
 
+{% if is_incremental() %}
+-- Tables built before loaded_at existed have no watermark yet: re-aggregate the whole window once
+{% set has_watermark = 'max_loaded_at' in adapter.get_columns_in_relation(this) | map(attribute='name') | list %}
+WITH touched_days AS (
+    SELECT DISTINCT extracted_date
+    FROM {{ ref('stg_crypto_prices') }}
+    WHERE vs_currency = '{{ var("reporting_currency") }}'
+    {% if has_watermark %}
+      AND loaded_at > (
+          SELECT COALESCE(MAX(max_loaded_at), '-infinity'::timestamp) - INTERVAL '{{ var("incremental_lookback") }}'
+          FROM {{ this }}
+      )
+    {% endif %}
+),
+
+daily_aggregations AS (
+{% else %}
 WITH daily_aggregations AS (
+{% endif %}
     SELECT 
         crypto_id,
         symbol,
@@ -13,6 +40,7 @@ WITH daily_aggregations AS (
         MIN(current_price) as min_price,
         MAX(current_price) as max_price,
         STDDEV(current_price) as price_volatility,
+        STDDEV(current_price) / NULLIF(AVG(current_price), 0) as relative_volatility,
         
         -- Market metrics
         AVG(market_cap_billions) as avg_market_cap_billions,
@@ -28,10 +56,18 @@ WITH daily_aggregations AS (
         COUNT(CASE WHEN current_price IS NULL THEN 1 END) as null_price_count,
         
         -- Metadata
-        MAX(extracted_at) as last_updated
+        MAX(extracted_at) as last_updated,
+        MAX(loaded_at) as max_loaded_at
         
     FROM {{ ref('stg_crypto_prices') }}
     WHERE extracted_date >= CURRENT_DATE - INTERVAL '90 days'
+      AND vs_currency = '{{ var("reporting_currency") }}'
+    {% if is_incremental() %}
+      AND (
+          extracted_date IN (SELECT extracted_date FROM touched_days)
+          OR extracted_date > CURRENT_DATE - {{ var("reprocess_days") }}
+      )
+    {% endif %}
     GROUP BY crypto_id, symbol, name, extracted_date
 ),
 
@@ -55,15 +91,17 @@ enriched_metrics AS (
             ELSE 'Other'
         END as market_tier,
         
-        -- Volatility classification
+        -- Volatility classification on the intraday coefficient of variation, so coins
+        -- priced at $0.0001 and $60,000 are comparable (annualised realised volatility
+        -- per coin is in crypto_indicators_latest)
         CASE 
-            WHEN price_volatility < 100 THEN 'Low Volatility'
-            WHEN price_volatility < 500 THEN 'Medium Volatility'
+            WHEN relative_volatility IS NULL THEN 'Unknown'
+            WHEN relative_volatility < 0.02 THEN 'Low Volatility'
+            WHEN relative_volatility < 0.05 THEN 'Medium Volatility'
             ELSE 'High Volatility'
         END as volatility_tier
         
     FROM daily_aggregations
 )
 
-SELECT * FROM enriched_metrics
-ORDER BY extracted_date DESC, avg_market_cap_billions DESC
\ No newline at end of file
+SELECT * FROM enriched_metrics
\ No newline at end of file
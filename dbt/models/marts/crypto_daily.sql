@@ -1,6 +1,15 @@
 -- dbt/models/marts/crypto_daily.sql
 
-{{ config(materialized='table') }}
+-- Incremental on (crypto_id, extracted_date): days re-aggregated upstream since the last
+-- loaded_at watermark (less incremental_lookback) and the trailing reprocess_days are
+-- replaced. Rebuild everything with `dbt run --full-refresh`.
+{{ config(
+    materialized='incremental',
+    unique_key=['crypto_id', 'extracted_date'],
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns',
+    post_hook="DELETE FROM {{ this }} WHERE extracted_date < CURRENT_DATE - INTERVAL '30 days'"
+) }}
 
 SELECT 
     crypto_id,
@@ -29,6 +38,7 @@ SELECT
     -- Metadata
     record_count,
     last_updated,
+    max_loaded_at,
     
     -- Foreign Keys
     {{ dbt_utils.generate_surrogate_key(['crypto_id']) }} as crypto_sk,
@@ -54,4 +64,16 @@ SELECT
     END as performance_sk
     
 FROM {{ ref('int_crypto_metrics') }}
-WHERE extracted_date >= CURRENT_DATE - INTERVAL '30 days'
\ No newline at end of file
+WHERE extracted_date >= CURRENT_DATE - INTERVAL '30 days'
+{% if is_incremental() %}
+{% set has_watermark = 'max_loaded_at' in adapter.get_columns_in_relation(this) | map(attribute='name') | list %}
+{% if has_watermark %}
+  AND (
+      max_loaded_at > (
+          SELECT COALESCE(MAX(max_loaded_at), '-infinity'::timestamp) - INTERVAL '{{ var("incremental_lookback") }}'
+          FROM {{ this }}
+      )
+      OR extracted_date > CURRENT_DATE - {{ var("reprocess_days") }}
+  )
+{% endif %}
+{% endif %}
\ No newline at end of file
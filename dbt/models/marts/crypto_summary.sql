@@ -2,22 +2,20 @@
 
 {{ config(materialized='table') }}
 
+-- crypto_latest is maintained by the loader (one row per coin), so no
+-- MAX(extracted_date) scan over the full price history is needed
 WITH latest_raw AS (
     SELECT *
-    FROM {{ ref('stg_crypto_prices') }}
-    WHERE extracted_date = (
-        SELECT MAX(extracted_date) 
-        FROM {{ ref('stg_crypto_prices') }}
-    )
-),
-
-latest_metrics AS (
-    SELECT *
-    FROM {{ ref('int_crypto_metrics') }}
-    WHERE extracted_date = (
-        SELECT MAX(extracted_date) 
-        FROM {{ ref('int_crypto_metrics') }}
-    )
+    FROM {{ source('crypto_raw', 'crypto_latest') }}
+    WHERE vs_currency = '{{ var("reporting_currency") }}'
+      AND current_price > 0 
+      AND market_cap > 0
+      AND symbol IS NOT NULL
+      AND extracted_date = (
+          SELECT MAX(extracted_date) 
+          FROM {{ source('crypto_raw', 'crypto_latest') }}
+          WHERE vs_currency = '{{ var("reporting_currency") }}'
+      )
 )
 
 SELECT 
@@ -72,7 +70,7 @@ SELECT
     END as performance_sk
     
 FROM latest_raw r
-LEFT JOIN latest_metrics m 
+LEFT JOIN {{ ref('int_crypto_metrics') }} m 
     ON r.crypto_id = m.crypto_id 
     AND r.extracted_date = m.extracted_date
     
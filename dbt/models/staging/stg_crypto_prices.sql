@@ -6,6 +6,7 @@ SELECT
     crypto_id,
     symbol,
     name,
+    vs_currency,
     
     -- Price data
     current_price,
@@ -23,11 +24,12 @@ SELECT
     last_updated,
     extracted_date,
     extracted_at,
+    loaded_at,
     
     -- Metadata
     id as row_id
     
-FROM crypto_prices
+FROM {{ source('crypto_raw', 'crypto_prices') }}
 
 -- Basic filters
 WHERE current_price > 0 
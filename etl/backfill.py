@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+from .extract import CryptoExtractor
+from .transform import CryptoTransformer
+from .load import CryptoLoader
+from .config import BACKFILL_CHECKPOINT_DIR
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class BackfillCheckpoint:
+    """Per-coin progress for one backfill range, persisted as JSON after every coin
+
+    Keyed on the arguments given: without an end the checkpoint is the
+    start's open-ended one, which stores the end resolved on its first run
+    so a resume the next day covers the same window. Once such a window has
+    completed, the next run starts a new one ending today.
+    """
+
+    def __init__(self, start: datetime, end: Optional[datetime] = None,
+                 directory: str = BACKFILL_CHECKPOINT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(
+            directory, f"backfill_{start:%Y%m%d%H%M}_{'open' if end is None else f'{end:%Y%m%d%H%M}'}.json"
+        )
+        self._lock = threading.Lock()
+        self.coins = {}
+        self.end = end
+        self.complete = False
+
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            if end is not None or not state.get('complete'):
+                self.coins = state.get('coins', {})
+                if end is None and state.get('end'):
+                    self.end = datetime.fromisoformat(state['end'])
+
+        if self.end is None:
+            self.end = _today()
+
+    def is_done(self, coin_id: str) -> bool:
+        return self.coins.get(coin_id, {}).get('status') == 'done'
+
+    def mark(self, coin_id: str, status: str, records: int = 0, error: Optional[str] = None) -> None:
+        """Record a coin's outcome and atomically rewrite the checkpoint file"""
+        with self._lock:
+            self.coins[coin_id] = {
+                'status': status,
+                'records': records,
+                'error': error,
+                'updated_at': datetime.now().isoformat(timespec='seconds')
+            }
+            self._write()
+
+    def finish(self, complete: bool) -> None:
+        """Record whether every coin of the window is done"""
+        with self._lock:
+            self.complete = complete
+            self._write()
+
+    def _write(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'end': self.end.isoformat(), 'complete': self.complete, 'coins': self.coins}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def run_backfill(start: datetime, end: Optional[datetime] = None, coin_ids: Optional[List[str]] = None,
+                 top: int = 100, workers: Optional[int] = None) -> Dict:
+    """Backfill crypto_prices from /market_chart/range, resuming from the checkpoint
+
+    end defaults to today, or to the end of the unfinished open-ended run it resumes.
+    """
+
+    start_time = time.time()
+    checkpoint = BackfillCheckpoint(start, end)
+    end = checkpoint.end
+
+    logger.info("="*50)
+    logger.info(f"STARTING BACKFILL {start:%Y-%m-%d} -> {end:%Y-%m-%d}")
+    logger.info("="*50)
+
+    extractor = CryptoExtractor(workers=workers) if workers else CryptoExtractor()
+    transformer = CryptoTransformer()
+    loader = CryptoLoader()
+
+    if coin_ids:
+        coins = extractor.extract_coins_metadata(coin_ids)
+    else:
+        # Charts are fetched in USD, so rank coins in USD only
+        coins = extractor.extract_top_coins(limit=top, vs_currencies=['usd'])
+    coins = coins[['id', 'symbol', 'name']].to_dict('records')
+
+    pending = [coin for coin in coins if not checkpoint.is_done(coin['id'])]
+    logger.info(f"{len(coins) - len(pending)} coins already done, {len(pending)} to backfill")
+
+    loader.create_tables()
+    # Every month of the window up front: workers loading in parallel must not race on partition DDL
+    loader.ensure_partitions(start=start.date(), end=end.date())
+
+    def backfill_coin(coin: Dict) -> int:
+        chart = extractor.extract_market_chart_range(coin['id'], start, end)
+        history = transformer.transform_market_chart(chart, coin)
+        return loader.load_data(history, ensure_partitions=False)
+
+    records_loaded = 0
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=extractor.workers) as pool:
+        futures = {pool.submit(backfill_coin, coin): coin['id'] for coin in pending}
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                records = future.result()
+                records_loaded += records
+                checkpoint.mark(coin_id, 'done', records=records)
+                logger.info(f"Backfilled {coin_id}: {records} records")
+            except Exception as e:
+                failed.append(coin_id)
+                checkpoint.mark(coin_id, 'failed', error=str(e))
+                logger.error(f"Backfill of {coin_id} failed: {e}")
+
+    checkpoint.finish(complete=not failed)
+    duration = time.time() - start_time
+
+    logger.info("="*50)
+    logger.info("BACKFILL COMPLETED" if not failed else f"BACKFILL FINISHED WITH {len(failed)} FAILURES")
+    logger.info(f"Records loaded: {records_loaded}")
+    logger.info(f"Duration: {duration:.2f} seconds")
+    logger.info("="*50)
+
+    return {
+        'success': not failed,
+        'coins_total': len(coins),
+        'coins_backfilled': len(pending) - len(failed),
+        'coins_failed': failed,
+        'records_processed': records_loaded,
+        'duration_seconds': round(duration, 2),
+        'api_stats': extractor.get_request_stats(),
+        'checkpoint': checkpoint.path
+    }
+
+def _today() -> datetime:
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _parse_date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Backfill historical crypto prices (rerun with the same --start/--end to resume)"
+    )
+    parser.add_argument("--start", type=_parse_date, required=True, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=_parse_date,
+                        help="End date (YYYY-MM-DD), defaults to today (an unfinished run's end when resuming)")
+    parser.add_argument("--coins", help="Comma-separated CoinGecko ids; defaults to the current top coins")
+    parser.add_argument("--top", type=int, default=100, help="Number of top coins when --coins is not given")
+    parser.add_argument("--workers", type=int, help="Concurrent coin downloads")
+    args = parser.parse_args(argv)
+
+    coin_ids = [c.strip() for c in args.coins.split(",") if c.strip()] if args.coins else None
+    result = run_backfill(args.start, args.end, coin_ids=coin_ids, top=args.top, workers=args.workers)
+    return 0 if result['success'] else 1
+
+if __name__ == "__main__":
+    exit(main())
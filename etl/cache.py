@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Optional
+from .config import API_CACHE_DIR, API_CACHE_TTL_SECONDS, API_CACHE_MAX_MB
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request has no recorded payload"""
+
+class ResponseCache:
+    """On-disk JSON response cache keyed by endpoint and params
+
+    Entries expire after ttl_seconds (ignored when replaying) and the least
+    recently used files are evicted once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, directory: str = API_CACHE_DIR, ttl_seconds: int = API_CACHE_TTL_SECONDS,
+                 max_bytes: int = API_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+
+    @staticmethod
+    def make_key(path: str, params: Optional[dict] = None) -> str:
+        canonical = json.dumps({'path': path, 'params': params or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, path: str, params: Optional[dict] = None, ignore_ttl: bool = False) -> Optional[Any]:
+        """Return the cached payload, or None if missing or expired"""
+
+        file_path = self._file_path(self.make_key(path, params))
+        try:
+            age = time.time() - os.path.getmtime(file_path)
+            if not ignore_ttl and age > self.ttl_seconds:
+                self._count(hit=False)
+                return None
+            with open(file_path) as f:
+                payload = json.load(f)['payload']
+        except (OSError, ValueError, KeyError):
+            self._count(hit=False)
+            return None
+
+        # Reads refresh the access time used for LRU eviction; another
+        # process may evict the file once it has been read
+        try:
+            os.utime(file_path, (time.time(), os.path.getmtime(file_path)))
+        except FileNotFoundError:
+            pass
+        self._count(hit=True)
+        return payload
+
+    def put(self, path: str, payload: Any, params: Optional[dict] = None) -> None:
+        """Record a payload, then evict least recently used entries over the size bound"""
+
+        file_path = self._file_path(self.make_key(path, params))
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'path': path, 'params': params or {}, 'recorded_at': time.time(), 'payload': payload}, f)
+        size = os.path.getsize(tmp_path)
+        replaced = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        os.replace(tmp_path, file_path)
+
+        with self._lock:
+            self._total_bytes += size - replaced
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in self._entries():
+                stat = entry.stat()
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, entry.path))
+                total += stat.st_size
+
+            # Evict down to 90% so the next few puts don't rescan the directory
+            target = int(self.max_bytes * 0.9)
+            evicted = 0
+            for _, size, file_path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(file_path)
+                    total -= size
+                    evicted += 1
+                except OSError:
+                    pass
+
+            self._total_bytes = total
+            logger.debug(f"Evicted {evicted} cached responses ({total / 1e6:.1f} MB kept)")
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
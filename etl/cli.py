@@ -0,0 +1,101 @@
+"""
+Command line entry point: python -m etl <command>
+
+Only argparse and the settings are imported up front; each command imports
+the modules it needs (pandas, SQLAlchemy, requests, Prefect, dbt) when it
+runs, so probes like `python -m etl health` start fast.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+# Commands that hand their remaining arguments to an existing module's own parser
+DELEGATED_COMMANDS = {
+    'backfill': ('etl.backfill', "Backfill historical prices from /market_chart/range"),
+    'reprocess': ('etl.reprocess', "Replay the raw landing zone through transform and load"),
+    'poll': ('etl.poller', "Poll the API continuously, writing only changed coins"),
+}
+
+def _print(result) -> None:
+    print(json.dumps(result, indent=2, default=str))
+
+def cmd_run(args) -> int:
+    if args.prefect:
+        from .prefect_flow import crypto_prefect_flow
+        result = crypto_prefect_flow(limit=args.limit)
+    else:
+        from .pipeline import run_etl_pipeline
+        result = run_etl_pipeline(limit=args.limit, streaming=args.streaming)
+    _print({key: value for key, value in result.items() if key not in ('metrics', 'etl_metrics')})
+    return 0 if result['success'] else 1
+
+def cmd_stats(args) -> int:
+    from .load import CryptoLoader
+    stats = CryptoLoader().get_latest_stats(vs_currency=args.currency)
+    _print(stats)
+    return 0 if stats else 1
+
+def cmd_health(args) -> int:
+    checks = {}
+    if not args.db_only:
+        from .extract import CryptoExtractor
+        checks['api'] = CryptoExtractor().health_check()
+    if not args.api_only:
+        from .load import CryptoLoader
+        checks['database'] = CryptoLoader().health_check()
+    _print(checks)
+    return 0 if all(checks.values()) else 1
+
+def cmd_dbt(args) -> int:
+    from .dbt_runner import get_dbt_runner
+    dbt_args = args.dbt_args[1:] if args.dbt_args[:1] == ['--'] else args.dbt_args
+    result = get_dbt_runner().run(dbt_args)
+    _print(result)
+    return 0 if result['success'] else 1
+
+def build_parser() -> argparse.ArgumentParser:
+    from .config import ETL_COIN_LIMIT, ETL_STREAMING, VS_CURRENCIES
+
+    parser = argparse.ArgumentParser(prog="python -m etl", description="Crypto ETL pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run extract, transform and load once")
+    run.add_argument("--limit", type=int, default=ETL_COIN_LIMIT, help="Number of top coins")
+    run.add_argument("--streaming", action=argparse.BooleanOptionalAction, default=ETL_STREAMING,
+                     help="Transform and load page by page")
+    run.add_argument("--prefect", action="store_true", help="Run the Prefect flow (ETL and dbt)")
+    run.set_defaults(handler=cmd_run)
+
+    stats = commands.add_parser("stats", help="Latest snapshot statistics")
+    stats.add_argument("--currency", default=VS_CURRENCIES[0], help="Quote currency")
+    stats.set_defaults(handler=cmd_stats)
+
+    health = commands.add_parser("health", help="Check the API and database (exit 1 on failure)")
+    only = health.add_mutually_exclusive_group()
+    only.add_argument("--api-only", action="store_true")
+    only.add_argument("--db-only", action="store_true")
+    health.set_defaults(handler=cmd_health)
+
+    dbt = commands.add_parser("dbt", help="Run dbt models in-process (extra args go to dbt run)")
+    dbt.add_argument("dbt_args", nargs=argparse.REMAINDER, help="e.g. -- --select marts")
+    dbt.set_defaults(handler=cmd_dbt)
+
+    for name, (_, help_text) in DELEGATED_COMMANDS.items():
+        delegated = commands.add_parser(name, help=help_text, add_help=False)
+        delegated.add_argument("delegated_args", nargs=argparse.REMAINDER)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Delegated commands parse their own arguments, --help included
+    if argv and argv[0] in DELEGATED_COMMANDS:
+        import importlib
+        module = importlib.import_module(DELEGATED_COMMANDS[argv[0]][0])
+        sys.argv[0] = f"python -m etl {argv[0]}"
+        return module.main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
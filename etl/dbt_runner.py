@@ -0,0 +1,130 @@
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from .config import DBT_PROJECT_DIR, DBT_STATE_DIR
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Files whose change invalidates the cached manifest
+PROJECT_FILE_SUFFIXES = ('.sql', '.yml', '.yaml', '.csv', '.md')
+
+class DbtProjectRunner:
+    """Run dbt in-process, reusing the parsed manifest between invocations
+
+    The first invocation parses the project (dbt's partial parsing keeps that
+    cheap across processes too); later ones in the same process reuse the
+    Manifest object until a project file changes.
+    """
+
+    def __init__(self, project_dir: str = DBT_PROJECT_DIR, state_dir: str = DBT_STATE_DIR):
+        self.project_dir = os.path.abspath(project_dir)
+        self.state_dir = os.path.abspath(state_dir)
+        self._manifest = None
+        self._fingerprint = None
+        # dbt keeps global state per invocation and is not safe to run concurrently
+        self._lock = threading.Lock()
+
+    def selection(self, changed_sources: List[str]) -> List[str]:
+        """Node selection: everything downstream of changed sources, plus modified SQL
+
+        Static dimensions (dim_date, dim_market_tier, ...) read no source, so
+        they are only rebuilt through state:modified when their SQL changes.
+        Without a previous manifest there is nothing to compare against, so the
+        first run builds every model.
+        """
+
+        if not os.path.exists(os.path.join(self.state_dir, 'manifest.json')):
+            return []
+
+        select = [f"source:crypto_raw.{source}+" for source in changed_sources]
+        select.append("state:modified+")
+        return ["--select", *select, "--state", self.state_dir]
+
+    def run(self, args: Optional[List[str]] = None) -> Dict:
+        """dbt run with extra CLI args; returns per-model status, timing and rows affected"""
+
+        from dbt.cli.main import dbtRunner
+
+        with self._lock:
+            manifest, parse_seconds = self._get_manifest()
+
+            start = time.perf_counter()
+            result = dbtRunner(manifest=manifest).invoke(["run", *self._project_args(), *(args or [])])
+            duration = time.perf_counter() - start
+
+            if result.exception is not None:
+                raise result.exception
+
+            models = [self._model_result(node_result) for node_result in (result.result or [])]
+            if result.success:
+                self._save_state()
+
+        return {
+            'success': result.success,
+            'models': models,
+            'rows_affected': sum(model['rows_affected'] or 0 for model in models),
+            'parse_seconds': round(parse_seconds, 4),
+            'duration_seconds': round(duration, 4)
+        }
+
+    def _get_manifest(self) -> Tuple[object, float]:
+        """Cached Manifest, re-parsed only when a project file changed"""
+
+        fingerprint = self._project_fingerprint()
+        if self._manifest is not None and fingerprint == self._fingerprint:
+            return self._manifest, 0.0
+
+        from dbt.cli.main import dbtRunner
+
+        start = time.perf_counter()
+        result = dbtRunner().invoke(["parse", *self._project_args()])
+        if not result.success:
+            raise result.exception or Exception("dbt parse failed")
+
+        self._manifest, self._fingerprint = result.result, fingerprint
+        parse_seconds = time.perf_counter() - start
+        logger.info(f"Parsed dbt project in {parse_seconds:.2f}s")
+        return self._manifest, parse_seconds
+
+    def _project_fingerprint(self) -> Tuple:
+        entries = []
+        for root, dirs, files in os.walk(self.project_dir):
+            dirs[:] = [d for d in dirs if d not in ('target', 'logs', 'dbt_packages', 'state')]
+            for name in files:
+                if name.endswith(PROJECT_FILE_SUFFIXES):
+                    path = os.path.join(root, name)
+                    entries.append((path, os.path.getmtime(path)))
+        return tuple(sorted(entries))
+
+    def _project_args(self) -> List[str]:
+        return ["--project-dir", self.project_dir, "--profiles-dir", self.project_dir]
+
+    def _model_result(self, node_result) -> Dict:
+        adapter_response = node_result.adapter_response or {}
+        return {
+            'model': node_result.node.name,
+            'status': str(node_result.status),
+            'execution_seconds': round(node_result.execution_time or 0.0, 4),
+            'rows_affected': adapter_response.get('rows_affected'),
+            'message': node_result.message
+        }
+
+    def _save_state(self) -> None:
+        """The manifest of a successful run is the baseline for the next state:modified"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        shutil.copyfile(os.path.join(self.project_dir, 'target', 'manifest.json'),
+                        os.path.join(self.state_dir, 'manifest.json'))
+
+_runner = None
+_runner_lock = threading.Lock()
+
+def get_dbt_runner() -> DbtProjectRunner:
+    """Process-wide runner so long-lived workers keep the parsed manifest"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = DbtProjectRunner()
+        return _runner
@@ -1,55 +1,401 @@
+import math
+import random
+import re
+import threading
+import time
 import requests
 import pandas as pd
-from typing import Optional
-from .config import COINGECKO_BASE_URL, COINGECKO_API_KEY
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Iterator, List, Optional
+from .config import (
+    COINGECKO_BASE_URL, COINGECKO_API_KEY, COINGECKO_MAX_PER_PAGE,
+    EXTRACT_WORKERS, API_CALLS_PER_MINUTE, VS_CURRENCIES,
+    API_MAX_RETRIES, API_BACKOFF_BASE, API_BACKOFF_MAX, API_RETRY_AFTER_MAX,
+    API_CACHE_MODE
+)
+from .cache import ResponseCache, CacheMiss
+from .metrics import PipelineMetrics, timed
 from .logger import setup_logger
 
 logger = setup_logger(__name__)
 
+class RateLimiter:
+    """Thread-safe limiter spacing API calls evenly over a minute"""
+
+    def __init__(self, calls_per_minute: int = API_CALLS_PER_MINUTE):
+        self.interval = 60.0 / calls_per_minute if calls_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        """Block until the next call slot is available"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
+
+class RequestStats:
+    """Thread-safe per-request latency and retry counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes_received = 0
+        self.latencies = []
+
+    def record(self, latency: float, retries: int, failed: bool = False, bytes_received: int = 0) -> None:
+        with self._lock:
+            self.requests += 1
+            self.retries += retries
+            self.failures += int(failed)
+            self.bytes_received += bytes_received
+            self.latencies.append(latency)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            count = len(latencies)
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures,
+                'bytes_received': self.bytes_received,
+                'avg_latency_seconds': round(sum(latencies) / count, 4) if count else 0.0,
+                'p95_latency_seconds': round(latencies[int(0.95 * (count - 1))], 4) if count else 0.0,
+                'max_latency_seconds': round(latencies[-1], 4) if count else 0.0
+            }
+
 class CryptoExtractor:
     """Extract cryptocurrency data from CoinGecko API"""
-    
-    def __init__(self):
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, workers: int = EXTRACT_WORKERS, calls_per_minute: int = API_CALLS_PER_MINUTE,
+                 max_retries: int = API_MAX_RETRIES, cache_mode: str = API_CACHE_MODE,
+                 metrics: Optional[PipelineMetrics] = None):
         self.base_url = COINGECKO_BASE_URL
         self.headers = {}
-        
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(calls_per_minute)
+        self.stats = RequestStats()
+        self.metrics = metrics or PipelineMetrics()
+
+        # Response cache: off, record (serve within TTL, else fetch and store) or replay (offline)
+        if cache_mode not in ('off', 'record', 'replay'):
+            raise ValueError(f"Unknown cache mode: {cache_mode}")
+        self.cache_mode = cache_mode
+        self.cache = ResponseCache() if cache_mode != 'off' else None
+
         if COINGECKO_API_KEY:
             self.headers['x-cg-demo-api-key'] = COINGECKO_API_KEY
-    
-    def extract_top_coins(self, limit: int = 50) -> pd.DataFrame:
-                
+
+        # Keep-alive session sized so every worker can hold a connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self) -> None:
+        """Release pooled connections"""
+        self.session.close()
+
+    def get_request_stats(self) -> Dict:
+        """Latency and retry counts for requests made by this extractor"""
+        stats = self.stats.summary()
+        if self.cache is not None:
+            stats['cache_hits'] = self.cache.hits
+            stats['cache_misses'] = self.cache.misses
+        return stats
+
+    def extract_top_coins(self, limit: Optional[int] = 50,
+                          vs_currencies: Optional[List[str]] = None) -> pd.DataFrame:
+        """Top coins by market cap, one row per coin and quote currency (vs_currency column)
+
+        limit=None extracts every listed coin.
+        """
+
+        vs_currencies = vs_currencies or VS_CURRENCIES
+        if limit is None or limit > COINGECKO_MAX_PER_PAGE or len(vs_currencies) > 1:
+            # Pages per currency, fetched concurrently under the shared rate limit
+            per_page = COINGECKO_MAX_PER_PAGE if limit is None else min(limit, COINGECKO_MAX_PER_PAGE)
+            return self.extract_all_coins(max_coins=limit, per_page=per_page, vs_currencies=vs_currencies)
+
         logger.info(f"Extracting top {limit} cryptocurrencies")
-        
+
         try:
-            url = f"{self.base_url}/coins/markets"
-            params = {
-                "vs_currency": "usd",
-                "order": "market_cap_desc",
-                "per_page": limit,
-                "page": 1,
-                "sparkline": False
-            }
-            
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._fetch_markets_page(page=1, per_page=limit, vs_currency=vs_currencies[0])
             df = pd.DataFrame(data)
-            
+            df['vs_currency'] = vs_currencies[0]
+
             logger.info(f"Successfully extracted {len(df)} records")
             return df
-            
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"API request failed: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Extraction failed: {e}")
+            raise
+
+    def extract_all_coins(self, max_coins: Optional[int] = None,
+                          per_page: int = COINGECKO_MAX_PER_PAGE,
+                          vs_currencies: Optional[List[str]] = None) -> pd.DataFrame:
+        """Extract market data page by page with a bounded pool of workers"""
+
+        vs_currencies = vs_currencies or VS_CURRENCIES
+        target = max_coins if max_coins else "all"
+        logger.info(
+            f"Extracting {target} cryptocurrencies in {', '.join(vs_currencies)} "
+            f"({per_page} per page, {self.workers} workers)"
+        )
+
+        try:
+            frames = list(self.iter_market_pages(max_coins=max_coins, per_page=per_page,
+                                                 vs_currencies=vs_currencies))
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+            logger.info(f"Successfully extracted {len(df)} records from {len(frames)} pages")
+            return df
+
         except requests.exceptions.RequestException as e:
             logger.error(f"API request failed: {e}")
             raise
         except Exception as e:
             logger.error(f"Extraction failed: {e}")
             raise
-    
+
+    def iter_market_pages(self, max_coins: Optional[int] = None,
+                          per_page: int = COINGECKO_MAX_PER_PAGE,
+                          vs_currencies: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yield /coins/markets pages in order while up to `workers` requests are in flight
+
+        With max_coins the page count is known up front; otherwise pages are
+        requested until the API returns a short page. Coins that shift across
+        page boundaries between requests are yielded only once. Several quote
+        currencies are crawled side by side, pages tagged with vs_currency.
+        """
+
+        per_page = min(per_page, COINGECKO_MAX_PER_PAGE)
+        last_page = math.ceil(max_coins / per_page) if max_coins else None
+        crawls = {
+            currency: {'next_page': 1, 'remaining': max_coins, 'seen': set(), 'exhausted': False}
+            for currency in (vs_currencies or VS_CURRENCIES)
+        }
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = deque()
+            try:
+                while True:
+                    # Round-robin across currencies so each progresses under the shared rate limit
+                    submitted = True
+                    while submitted and len(in_flight) < self.workers:
+                        submitted = False
+                        for currency, crawl in crawls.items():
+                            if len(in_flight) >= self.workers:
+                                break
+                            if crawl['exhausted'] or (last_page is not None and crawl['next_page'] > last_page):
+                                continue
+                            future = pool.submit(self._fetch_markets_page, crawl['next_page'], per_page, currency)
+                            in_flight.append((currency, future))
+                            crawl['next_page'] += 1
+                            submitted = True
+
+                    if not in_flight:
+                        break
+
+                    currency, future = in_flight.popleft()
+                    crawl = crawls[currency]
+                    page = future.result()
+                    if len(page) < per_page:
+                        crawl['exhausted'] = True
+
+                    frame = pd.DataFrame(page)
+                    if frame.empty:
+                        continue
+
+                    frame = frame[~frame['id'].isin(crawl['seen'])]
+                    if crawl['remaining'] is not None:
+                        frame = frame.head(crawl['remaining'])
+                        crawl['remaining'] -= len(frame)
+                        crawl['exhausted'] = crawl['exhausted'] or crawl['remaining'] <= 0
+                    crawl['seen'].update(frame['id'])
+
+                    if not frame.empty:
+                        frame = frame.reset_index(drop=True)
+                        frame['vs_currency'] = currency
+                        yield frame
+            finally:
+                for _, future in in_flight:
+                    future.cancel()
+
+    def extract_markets_page(self, page: int, per_page: int = COINGECKO_MAX_PER_PAGE,
+                             vs_currency: str = "usd") -> pd.DataFrame:
+        """One /coins/markets page tagged with vs_currency (a shard for parallel orchestration)"""
+
+        df = pd.DataFrame(self._fetch_markets_page(page, per_page, vs_currency))
+        df['vs_currency'] = vs_currency
+        return df
+
+    def extract_coins_metadata(self, coin_ids: List[str], vs_currency: str = "usd") -> pd.DataFrame:
+        """Current market data (symbol, name, rank, ...) for specific coins"""
+
+        frames = []
+        for offset in range(0, len(coin_ids), COINGECKO_MAX_PER_PAGE):
+            batch = coin_ids[offset:offset + COINGECKO_MAX_PER_PAGE]
+            params = {
+                "vs_currency": vs_currency,
+                "ids": ",".join(batch),
+                "per_page": COINGECKO_MAX_PER_PAGE,
+                "page": 1,
+                "sparkline": False
+            }
+            frames.append(pd.DataFrame(self._get_json("/coins/markets", params=params)))
+
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def extract_market_chart_range(self, coin_id: str, start: datetime, end: datetime,
+                                   vs_currency: str = "usd") -> pd.DataFrame:
+        """Historical price, market cap and volume for one coin between start and end (UTC)"""
+
+        params = {
+            "vs_currency": vs_currency,
+            "from": int(start.replace(tzinfo=timezone.utc).timestamp()),
+            "to": int(end.replace(tzinfo=timezone.utc).timestamp())
+        }
+        data = self._get_json(f"/coins/{coin_id}/market_chart/range", params=params)
+
+        series = []
+        for key, column in [('prices', 'price'), ('market_caps', 'market_cap'), ('total_volumes', 'total_volume')]:
+            frame = pd.DataFrame(data.get(key) or [], columns=['timestamp', column])
+            series.append(frame.drop_duplicates('timestamp').set_index('timestamp')[column])
+
+        chart = pd.concat(series, axis=1).sort_index().reset_index()
+        chart['timestamp'] = pd.to_datetime(chart['timestamp'], unit='ms')
+        return chart
+
+    def _fetch_markets_page(self, page: int, per_page: int, vs_currency: str = "usd") -> List[dict]:
+        """Fetch a single /coins/markets page"""
+
+        params = {
+            "vs_currency": vs_currency,
+            "order": "market_cap_desc",
+            "per_page": per_page,
+            "page": page,
+            "sparkline": False
+        }
+
+        return self._get_json("/coins/markets", params=params)
+
+    def _get_json(self, path: str, params: Optional[dict] = None) -> Any:
+        """Parsed JSON for a GET, served from the response cache when enabled"""
+
+        if self.cache is None:
+            return self._get(path, params=params).json()
+
+        payload = self.cache.get(path, params, ignore_ttl=self.cache_mode == 'replay')
+        if payload is not None:
+            return payload
+
+        if self.cache_mode == 'replay':
+            raise CacheMiss(f"No recorded response for {path} {params or {}}")
+
+        payload = self._get(path, params=params).json()
+        self.cache.put(path, payload, params)
+        return payload
+
+    def _get(self, path: str, params: Optional[dict] = None, timeout: int = 30) -> requests.Response:
+        """GET with rate limiting, exponential backoff with jitter and Retry-After support"""
+
+        url = f"{self.base_url}{path}"
+        start = time.perf_counter()
+        attempt = 0
+
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    self._record_request(path, time.perf_counter() - start, attempt, failed=True)
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(f"{path} failed ({e}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    self._record_request(
+                        path, time.perf_counter() - start, attempt,
+                        failed=not response.ok, bytes_received=len(response.content)
+                    )
+                    response.raise_for_status()
+                    return response
+                retry_after = self._retry_after(response)
+                delay = self._backoff_delay(attempt) if retry_after is None else retry_after
+                logger.warning(
+                    f"{path} returned {response.status_code}, "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                )
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _record_request(self, path: str, latency: float, retries: int,
+                        failed: bool = False, bytes_received: int = 0) -> None:
+        self.stats.record(latency, retries, failed=failed, bytes_received=bytes_received)
+
+        # Coin ids in the path would explode label cardinality
+        endpoint = re.sub(r'^/coins/[^/]+/', '/coins/{id}/', path)
+        self.metrics.observe('http_request', latency, endpoint=endpoint)
+        self.metrics.increment('http_requests_total', endpoint=endpoint, status='error' if failed else 'ok')
+        self.metrics.increment('http_retries_total', retries, endpoint=endpoint)
+        self.metrics.increment('http_bytes_received_total', bytes_received, endpoint=endpoint)
+
+        logger.debug(
+            f"GET {path} {'failed' if failed else 'ok'} in {latency * 1000:.0f} ms",
+            extra={'endpoint': endpoint, 'latency_seconds': round(latency, 4), 'retries': retries,
+                   'bytes_received': bytes_received, 'failed': failed}
+        )
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(API_BACKOFF_MAX, API_BACKOFF_BASE * 2 ** attempt))
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """Parse Retry-After as seconds or an HTTP date, capped at API_RETRY_AFTER_MAX"""
+
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        try:
+            return min(API_RETRY_AFTER_MAX, max(0.0, float(value)))
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return min(API_RETRY_AFTER_MAX, max(0.0, retry_at.timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return None
+
+    @timed('http_request', endpoint='/ping')
     def health_check(self) -> bool:
         """Check if CoinGecko API is accessible"""
+        if self.cache_mode == 'replay':
+            return True
         try:
-            response = requests.get(f"{self.base_url}/ping", timeout=10)
+            response = self.session.get(f"{self.base_url}/ping", timeout=10)
             return response.status_code == 200
         except:
-            return False# Updated: Mon Sep 15 13:54:14 +08 2025
+            return False
+# Updated: Mon Sep 15 13:54:14 +08 2025
@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+from .config import INDICATOR_EMA_SPAN, INDICATOR_RSI_PERIOD, INDICATOR_VOLATILITY_WINDOW
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+EPOCH = pd.Timestamp(0, tz='UTC')
+
+KEY_COLUMNS = ['crypto_id', 'vs_currency']
+
+# Indicator values written per snapshot (crypto_indicators)
+INDICATOR_COLUMNS = ['current_price', 'log_return', 'volatility', 'ema', 'rsi', 'drawdown']
+
+def _as_epoch_seconds(values: pd.Series) -> np.ndarray:
+    """Snapshot times (API strings or naive UTC timestamps) as float seconds, NaN when unknown"""
+    times = pd.to_datetime(pd.Series(values), utc=True, errors='coerce')
+    return ((times - EPOCH) / pd.Timedelta(seconds=1)).to_numpy(dtype='float64', na_value=np.nan)
+
+def _as_timestamps(seconds: np.ndarray) -> pd.DatetimeIndex:
+    """Inverse of _as_epoch_seconds: naive UTC, millisecond precision like the API"""
+    return pd.to_datetime(seconds, unit='s').round('ms')
+
+class IndicatorEngine:
+    """Incremental technical indicators per (crypto_id, vs_currency)
+
+    Each coin is a row of preallocated state arrays, so a snapshot updates every
+    coin in one vectorized step and history is never recomputed:
+
+    - log_return: ln(price / previous price)
+    - volatility: realised volatility over the last volatility_window returns,
+      annualised by the time they span (snapshot cadence may vary)
+    - ema: exponential moving average of price over ema_span snapshots
+    - rsi: Wilder's RSI over rsi_period snapshots
+    - drawdown: price / running peak - 1
+    """
+
+    def __init__(self, ema_span: int = INDICATOR_EMA_SPAN, rsi_period: int = INDICATOR_RSI_PERIOD,
+                 volatility_window: int = INDICATOR_VOLATILITY_WINDOW):
+        self.ema_span = ema_span
+        self.rsi_period = rsi_period
+        self.volatility_window = volatility_window
+        self._alpha = 2.0 / (ema_span + 1)
+        self._index = {}
+        self._keys = []
+        self._allocate(0)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _allocate(self, capacity: int) -> None:
+        state = {
+            'price': np.full(capacity, np.nan),
+            'time': np.full(capacity, np.nan),
+            'observations': np.zeros(capacity, dtype=np.int64),
+            'ema': np.full(capacity, np.nan),
+            'avg_gain': np.zeros(capacity),
+            'avg_loss': np.zeros(capacity),
+            'peak': np.full(capacity, np.nan),
+            # Last volatility_window returns and the seconds each spanned, oldest first
+            'returns': np.full((capacity, self.volatility_window), np.nan),
+            'intervals': np.full((capacity, self.volatility_window), np.nan),
+            # Latest indicator values
+            'log_return': np.full(capacity, np.nan),
+            'volatility': np.full(capacity, np.nan),
+            'rsi': np.full(capacity, np.nan),
+            'drawdown': np.full(capacity, np.nan)
+        }
+        if hasattr(self, '_state'):
+            used = len(self._keys)
+            for name, values in state.items():
+                values[:used] = self._state[name][:used]
+        self._state = state
+
+    def _rows_for(self, keys: pd.DataFrame) -> np.ndarray:
+        """State row per key, adding rows (capacity doubles) for coins not seen before"""
+
+        pairs = list(zip(keys['crypto_id'].astype(str), keys['vs_currency'].astype(str)))
+        new = [pair for pair in dict.fromkeys(pairs) if pair not in self._index]
+        if new:
+            needed = len(self._keys) + len(new)
+            capacity = len(self._state['price'])
+            if needed > capacity:
+                self._allocate(max(needed, 2 * capacity, 64))
+            for pair in new:
+                self._index[pair] = len(self._keys)
+                self._keys.append(pair)
+        return np.fromiter((self._index[pair] for pair in pairs), dtype=np.int64, count=len(pairs))
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Advance the state with one or more snapshots and return their indicator rows
+
+        df needs crypto_id, vs_currency, current_price and last_updated. Rows are
+        laid out as a (coins x time) array, one column per snapshot of a coin, and
+        the recursion steps across columns with every coin updated at once.
+        Snapshots not newer than a coin's state (already processed) are skipped.
+        """
+
+        columns = [*KEY_COLUMNS, 'last_updated', *INDICATOR_COLUMNS]
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        frame = pd.DataFrame({
+            'crypto_id': df['crypto_id'].astype(str).to_numpy(),
+            'vs_currency': df['vs_currency'].astype(str).to_numpy(),
+            'price': pd.to_numeric(df['current_price'], errors='coerce').to_numpy(dtype='float64'),
+            'time': _as_epoch_seconds(df['last_updated'])
+        })
+        frame = frame[(frame['price'] > 0) & frame['time'].notna()]
+        frame = frame.sort_values('time', kind='stable').drop_duplicates([*KEY_COLUMNS, 'time'], keep='last')
+        if frame.empty:
+            return pd.DataFrame(columns=columns)
+
+        rows = self._rows_for(frame)
+        codes, coin_rows = pd.factorize(rows)
+        steps = frame.groupby(codes).cumcount().to_numpy()
+
+        # (coins x time): column t holds each coin's t-th snapshot in this batch
+        shape = (len(coin_rows), steps.max() + 1)
+        prices = np.full(shape, np.nan)
+        times = np.full(shape, np.nan)
+        prices[codes, steps] = frame['price'].to_numpy()
+        times[codes, steps] = frame['time'].to_numpy()
+
+        outputs = {name: np.full(shape, np.nan) for name in ('log_return', 'volatility', 'ema', 'rsi', 'drawdown')}
+        applied = np.zeros(shape, dtype=bool)
+        for t in range(shape[1]):
+            last_time = self._state['time'][coin_rows]
+            valid = ~np.isnan(prices[:, t]) & ~(times[:, t] <= last_time)
+            if not valid.any():
+                continue
+            step = self._step(coin_rows[valid], prices[valid, t], times[valid, t])
+            for name, values in step.items():
+                outputs[name][valid, t] = values
+            applied[valid, t] = True
+
+        done = applied[codes, steps]
+        result = pd.DataFrame({
+            'crypto_id': frame['crypto_id'].to_numpy()[done],
+            'vs_currency': frame['vs_currency'].to_numpy()[done],
+            'last_updated': _as_timestamps(frame['time'].to_numpy()[done]),
+            'current_price': frame['price'].to_numpy()[done],
+            **{name: values[codes, steps][done] for name, values in outputs.items()}
+        })
+
+        skipped = len(frame) - len(result)
+        if skipped:
+            logger.debug(f"Skipped {skipped} snapshots already reflected in indicator state")
+        return result[columns]
+
+    def _step(self, rows: np.ndarray, price: np.ndarray, time: np.ndarray) -> Dict[str, np.ndarray]:
+        """Apply one snapshot to the given state rows (every array is indexed by rows)"""
+
+        state = self._state
+        previous = state['price'][rows]
+        has_previous = ~np.isnan(previous)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_return = np.where(has_previous, np.log(price / previous), np.nan)
+            interval = time - state['time'][rows]
+
+        # Return window: shift left and append, for coins that have a previous price
+        moved = rows[has_previous]
+        for name, value in (('returns', log_return), ('intervals', interval)):
+            window = state[name]
+            window[moved, :-1] = window[moved, 1:]
+            window[moved, -1] = value[has_previous]
+
+        observations = state['observations'][rows] + 1
+        returns_seen = observations - 1
+
+        # Realised volatility: sqrt(sum r^2 / elapsed) annualised; needs at least two returns
+        squared = np.nansum(state['returns'][rows] ** 2, axis=1)
+        elapsed = np.nansum(state['intervals'][rows], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volatility = np.where(
+                (returns_seen >= 2) & (elapsed > 0), np.sqrt(squared / elapsed * SECONDS_PER_YEAR), np.nan
+            )
+
+        ema = state['ema'][rows]
+        ema = np.where(np.isnan(ema), price, ema + self._alpha * (price - ema))
+
+        # Wilder smoothing, seeded with the plain mean of the first rsi_period changes
+        change = np.where(has_previous, price - previous, 0.0)
+        weight = np.where(has_previous, 1.0 / np.clip(returns_seen, 1, self.rsi_period), 0.0)
+        avg_gain = state['avg_gain'][rows] + weight * (np.maximum(change, 0.0) - state['avg_gain'][rows])
+        avg_loss = state['avg_loss'][rows] + weight * (np.maximum(-change, 0.0) - state['avg_loss'][rows])
+        total = avg_gain + avg_loss
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(total > 0, 100.0 * avg_gain / total, 50.0)
+        rsi = np.where(returns_seen >= self.rsi_period, rsi, np.nan)
+
+        peak = np.fmax(state['peak'][rows], price)
+        drawdown = price / peak - 1.0
+
+        state['price'][rows] = price
+        state['time'][rows] = time
+        state['observations'][rows] = observations
+        state['ema'][rows] = ema
+        state['avg_gain'][rows] = avg_gain
+        state['avg_loss'][rows] = avg_loss
+        state['peak'][rows] = peak
+
+        outputs = {'log_return': log_return, 'volatility': volatility, 'ema': ema, 'rsi': rsi, 'drawdown': drawdown}
+        for name, values in outputs.items():
+            if name != 'ema':
+                state[name][rows] = values
+        return outputs
+
+    def state_frame(self, keys: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """State and latest indicators per coin (only coins in keys, if given) for persistence"""
+
+        if keys is None:
+            rows = np.arange(len(self._keys))
+        else:
+            pairs = dict.fromkeys(zip(keys['crypto_id'].astype(str), keys['vs_currency'].astype(str)))
+            rows = np.array([self._index[pair] for pair in pairs if pair in self._index], dtype=np.int64)
+
+        state = self._state
+        return pd.DataFrame({
+            'crypto_id': [self._keys[row][0] for row in rows],
+            'vs_currency': [self._keys[row][1] for row in rows],
+            'last_updated': _as_timestamps(state['time'][rows]),
+            'current_price': state['price'][rows],
+            **{name: state[name][rows] for name in ('log_return', 'volatility', 'ema', 'rsi', 'drawdown')},
+            'observations': state['observations'][rows],
+            'avg_gain': state['avg_gain'][rows],
+            'avg_loss': state['avg_loss'][rows],
+            'peak': state['peak'][rows],
+            'returns': list(state['returns'][rows]),
+            'intervals': list(state['intervals'][rows])
+        })
+
+    @classmethod
+    def from_state(cls, state: pd.DataFrame, **kwargs) -> 'IndicatorEngine':
+        """Engine resumed from a state_frame (e.g. read back from crypto_indicators_latest)"""
+
+        engine = cls(**kwargs)
+        if state.empty:
+            return engine
+
+        rows = engine._rows_for(state)
+        target = engine._state
+        target['price'][rows] = pd.to_numeric(state['current_price'], errors='coerce').to_numpy(dtype='float64')
+        target['time'][rows] = _as_epoch_seconds(state['last_updated'])
+        target['observations'][rows] = state['observations'].fillna(0).to_numpy(dtype=np.int64)
+        for name in ('ema', 'peak', 'log_return', 'volatility', 'rsi', 'drawdown'):
+            target[name][rows] = pd.to_numeric(state[name], errors='coerce').to_numpy(dtype='float64')
+        for name in ('avg_gain', 'avg_loss'):
+            target[name][rows] = pd.to_numeric(state[name], errors='coerce').fillna(0.0).to_numpy(dtype='float64')
+
+        # Windows are stored oldest first; keep the newest volatility_window values
+        width = engine.volatility_window
+        for name in ('returns', 'intervals'):
+            for row, values in zip(rows, state[name]):
+                values = np.asarray(values if values is not None else [], dtype='float64')[-width:]
+                if len(values):
+                    target[name][row, width - len(values):] = values
+
+        logger.info(f"Indicator state resumed for {len(engine)} coins")
+        return engine
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Iterator, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from .config import LANDING_DIR, LANDING_COMPRESSION, LOAD_CHUNK_SIZE
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Extraction time stamped on every landed row
+EXTRACTED_AT_COLUMN = '_extracted_at'
+
+# Hive directories: date=YYYY-MM-DD/hour=HH
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string()), ('hour', pa.int32())]), flavor='hive')
+
+class RawLandingZone:
+    """Raw /coins/markets payloads persisted as date/hour-partitioned Parquet
+
+    Every API column is kept so history can be replayed through a changed
+    transform. Reads prune partitions by date and push coin filters down to
+    row-group statistics.
+
+    With flush_seconds > 0, batches are buffered and written together once
+    the oldest is that old (or the hour partition changes), so a frequent
+    writer such as the poller makes a few files per hour instead of one per
+    batch. Call flush() before exiting.
+    """
+
+    def __init__(self, directory: str = LANDING_DIR, compression: str = LANDING_COMPRESSION,
+                 flush_seconds: float = 0):
+        self.directory = directory
+        self.compression = compression
+        self.flush_seconds = flush_seconds
+        self._pending = []
+        self._pending_since = None
+
+    def write(self, df: pd.DataFrame, extracted_at: Optional[datetime] = None,
+              source: str = 'markets') -> Optional[str]:
+        """Land one extracted batch; returns the Parquet path written, None while buffered"""
+
+        if df.empty:
+            return None
+
+        extracted_at = pd.Timestamp(extracted_at or datetime.now())
+        frame = self._normalise(df)
+        frame[EXTRACTED_AT_COLUMN] = extracted_at
+
+        if self.flush_seconds <= 0:
+            return self._write_file(frame, extracted_at, source)
+
+        path = None
+        if self._pending and f"{self._pending[0][1]:%Y%m%d%H}" != f"{extracted_at:%Y%m%d%H}":
+            path = self.flush()
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append((frame, extracted_at, source))
+        if time.monotonic() - self._pending_since >= self.flush_seconds:
+            path = self.flush()
+        return path
+
+    def flush(self) -> Optional[str]:
+        """Write buffered batches as one file (in the first batch's partition) and return its path"""
+
+        if not self._pending:
+            return None
+        pending, self._pending = self._pending, []
+        _, extracted_at, source = pending[0]
+        return self._write_file(pd.concat([frame for frame, _, _ in pending], ignore_index=True), extracted_at, source)
+
+    def _write_file(self, frame: pd.DataFrame, extracted_at: pd.Timestamp, source: str) -> str:
+        directory = os.path.join(self.directory, f"date={extracted_at:%Y-%m-%d}", f"hour={extracted_at:%H}")
+        os.makedirs(directory, exist_ok=True)
+
+        name = f"{source}_{extracted_at:%Y%m%dT%H%M%S%f}_{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(directory, name)
+        # Dot-prefixed temp files are skipped by readers until renamed
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        frame.to_parquet(tmp_path, engine='pyarrow', compression=self.compression, index=False)
+        os.replace(tmp_path, path)
+
+        logger.debug(f"Landed {len(frame)} raw records at {path}")
+        return path
+
+    def iter_batches(self, start: datetime, end: datetime, columns: Optional[List[str]] = None,
+                     coin_ids: Optional[List[str]] = None,
+                     batch_rows: int = LOAD_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """Yield landed rows extracted in [start, end) in extraction order, about batch_rows at a time
+
+        columns limits what is read from disk (EXTRACTED_AT_COLUMN is always included).
+        """
+
+        dataset = self._dataset(start, end)
+        if dataset is None:
+            return
+
+        row_filter = (
+            (ds.field(EXTRACTED_AT_COLUMN) >= pd.Timestamp(start))
+            & (ds.field(EXTRACTED_AT_COLUMN) < pd.Timestamp(end))
+        )
+        if coin_ids:
+            row_filter &= ds.field('id').isin(coin_ids)
+
+        if columns is not None:
+            columns = [c for c in dict.fromkeys(list(columns) + [EXTRACTED_AT_COLUMN]) if c in dataset.schema.names]
+
+        # File names sort by extraction time within the zero-padded partition directories
+        fragments = sorted(dataset.get_fragments(filter=row_filter), key=lambda fragment: fragment.path)
+
+        pending, pending_rows = [], 0
+        for fragment in fragments:
+            table = fragment.to_table(schema=dataset.schema, columns=columns, filter=row_filter)
+            if table.num_rows == 0:
+                continue
+            pending.append(table)
+            pending_rows += table.num_rows
+            if pending_rows >= batch_rows:
+                yield pa.concat_tables(pending).to_pandas()
+                pending, pending_rows = [], 0
+
+        if pending:
+            yield pa.concat_tables(pending).to_pandas()
+
+    def read(self, start: datetime, end: datetime, columns: Optional[List[str]] = None,
+             coin_ids: Optional[List[str]] = None) -> pd.DataFrame:
+        """All landed rows extracted in [start, end) as one frame"""
+
+        batches = list(self.iter_batches(start, end, columns=columns, coin_ids=coin_ids))
+        return pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+
+    def _dataset(self, start: datetime, end: datetime) -> Optional[ds.Dataset]:
+        """The landed files of the date partitions overlapping [start, end)
+
+        Only those directories are listed, so the footers read to unify the
+        schema are the window's, not the whole history's.
+        """
+
+        paths = self._window_files(start, end)
+        if not paths:
+            return None
+
+        dataset = ds.dataset(paths, format='parquet', partitioning=PARTITIONING, partition_base_dir=self.directory)
+        fragments = list(dataset.get_fragments())
+
+        # Pages where a column was all null land it as the null type; unify so every file reads
+        schema = pa.unify_schemas([fragment.physical_schema for fragment in fragments])
+        schema = pa.unify_schemas([schema, PARTITIONING.schema])
+        return ds.dataset(paths, format='parquet', partitioning=PARTITIONING, partition_base_dir=self.directory,
+                          schema=schema)
+
+    def _window_files(self, start: datetime, end: datetime) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+
+        first = f"date={start:%Y-%m-%d}"
+        last = f"date={pd.Timestamp(end) - pd.Timedelta(microseconds=1):%Y-%m-%d}"
+        paths = []
+        for date_dir in sorted(os.listdir(self.directory)):
+            if not first <= date_dir <= last:
+                continue
+            for root, dirs, names in os.walk(os.path.join(self.directory, date_dir)):
+                # Dot-prefixed temp files are still being written
+                dirs[:] = [d for d in dirs if not d.startswith(('.', '_'))]
+                paths.extend(os.path.join(root, name) for name in names
+                             if name.endswith('.parquet') and not name.startswith(('.', '_')))
+        return sorted(paths)
+
+    def _normalise(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Make page schemas compatible: nested values become JSON text, integers become floats"""
+
+        frame = df.copy()
+        for column in frame.columns:
+            values = frame[column]
+            if pd.api.types.is_integer_dtype(values):
+                # A single null in another page turns the same column into float64
+                frame[column] = values.astype('float64')
+            elif values.dtype == object and values.map(lambda v: isinstance(v, (dict, list))).any():
+                frame[column] = values.map(lambda v: json.dumps(v) if isinstance(v, (dict, list)) else v)
+        return frame
@@ -1,15 +1,66 @@
+import io
+import queue
+import re
+import threading
+import time
 import pandas as pd
+from datetime import date, datetime, timedelta
 from sqlalchemy import create_engine, text
-from typing import Dict
-from .config import DATABASE_URL
+from typing import Callable, Dict, Iterator, List, Optional
+from .config import (
+    DATABASE_URL, LOAD_METHOD, LOAD_CHUNK_SIZE, LOAD_QUEUE_SIZE,
+    PARTITION_PREMAKE_MONTHS, PARTITION_RETENTION_MONTHS, PARTITION_RETENTION_MODE,
+    VS_CURRENCIES
+)
+from .metrics import PipelineMetrics, timed
+from .price_store import PriceStore
 from .logger import setup_logger
 
 logger = setup_logger(__name__)
 
+TABLE_COLUMNS = [
+    'crypto_id', 'symbol', 'name', 'vs_currency', 'current_price', 'market_cap', 'rank',
+    'volume_24h', 'price_change_24h', 'circulating_supply', 'last_updated',
+    'price_category', 'market_cap_billions', 'extracted_at', 'extracted_date'
+]
+
+# One row per coin, quote currency and API update (partition key included for Postgres)
+NATURAL_KEY = 'crypto_id, vs_currency, last_updated, extracted_date'
+
+# Integer columns must be written without a decimal point for COPY
+INTEGER_COLUMNS = ['market_cap', 'rank', 'volume_24h', 'circulating_supply']
+
+# Postgres SQLSTATE unique_violation: COPY of rows that are already stored
+UNIQUE_VIOLATION = '23505'
+
+PARTITION_PATTERN = re.compile(r'^crypto_prices_p(\d{4})(\d{2})$')
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def _partition_name(month: date) -> str:
+    return f"crypto_prices_p{month.year:04d}{month.month:02d}"
+
+def _partition_month(name: str) -> Optional[date]:
+    match = PARTITION_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
 class CryptoLoader:
     """Load cryptocurrency data to PostgreSQL"""
     
-    def __init__(self):
+    def __init__(self, metrics: Optional[PipelineMetrics] = None, store: Optional[PriceStore] = None):
+        self.last_load_stats = {}
+        # (crypto_id, vs_currency) of the rows the last upsert actually wrote
+        self.last_written_keys = set()
+        # Partitions known to exist (created or ensured by this loader), so loads skip the DDL
+        self._partition_names = set()
+        self.metrics = metrics or PipelineMetrics()
+        # Recent prices in memory; every successful load is appended (see open_price_store)
+        self.store = store
         try:
             self.engine = create_engine(DATABASE_URL)
             logger.info("Database connection successful")
@@ -17,93 +68,790 @@ class CryptoLoader:
             logger.error(f"Failed to connect to database: {e}")
             raise
     
+    @timed('db_call', operation='create_tables')
     def create_tables(self) -> None:
-        """Create crypto_prices table if not exists"""
+        """Create crypto_prices table (range partitioned by month on extracted_date) if not exists"""
         
         create_table_sql = """
         CREATE TABLE IF NOT EXISTS crypto_prices (
-            id SERIAL PRIMARY KEY,
+            id SERIAL,
             crypto_id VARCHAR(50) NOT NULL,
             symbol VARCHAR(10) NOT NULL,
             name VARCHAR(100) NOT NULL,
+            vs_currency VARCHAR(10) NOT NULL DEFAULT 'usd',
             current_price DECIMAL(20,8) NOT NULL,
             market_cap BIGINT NOT NULL,
             rank INTEGER,
             volume_24h BIGINT,
             price_change_24h DECIMAL(10,4),
             circulating_supply BIGINT,
-            last_updated TIMESTAMP,
+            last_updated TIMESTAMP NOT NULL,
             price_category VARCHAR(10),
             market_cap_billions DECIMAL(10,2),
             extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             extracted_date DATE NOT NULL,
+            loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
             
+            PRIMARY KEY (id, extracted_date),
             CONSTRAINT positive_price CHECK (current_price > 0),
             CONSTRAINT positive_market_cap CHECK (market_cap > 0)
-        );
+        ) PARTITION BY RANGE (extracted_date);
         
         CREATE INDEX IF NOT EXISTS idx_crypto_id ON crypto_prices(crypto_id);
         CREATE INDEX IF NOT EXISTS idx_extracted_date ON crypto_prices(extracted_date);
         CREATE INDEX IF NOT EXISTS idx_rank ON crypto_prices(rank);
+        
+        -- Tables created before multi-currency support hold USD prices only
+        ALTER TABLE crypto_prices ADD COLUMN IF NOT EXISTS vs_currency VARCHAR(10) NOT NULL DEFAULT 'usd';
+        CREATE INDEX IF NOT EXISTS idx_currency_date ON crypto_prices(vs_currency, extracted_date);
+        
+        -- Change marker for the incremental dbt models: set on insert and on every upsert update
+        -- (ids are drawn before commit, so concurrent writers can commit a lower id after a higher one)
+        ALTER TABLE crypto_prices ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+        CREATE INDEX IF NOT EXISTS idx_loaded_at ON crypto_prices(loaded_at);
+        
+        -- Natural key (unique indexes on a partitioned table must include the partition key)
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_crypto_prices_currency_key
+            ON crypto_prices(crypto_id, vs_currency, last_updated, extracted_date);
+        DROP INDEX IF EXISTS uq_crypto_prices_natural_key;
+        
+        -- Latest snapshot per coin and currency, maintained by every load
+        CREATE TABLE IF NOT EXISTS crypto_latest (
+            crypto_id VARCHAR(50) NOT NULL,
+            symbol VARCHAR(10) NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            vs_currency VARCHAR(10) NOT NULL DEFAULT 'usd',
+            current_price DECIMAL(20,8) NOT NULL,
+            market_cap BIGINT NOT NULL,
+            rank INTEGER,
+            volume_24h BIGINT,
+            price_change_24h DECIMAL(10,4),
+            circulating_supply BIGINT,
+            last_updated TIMESTAMP,
+            price_category VARCHAR(10),
+            market_cap_billions DECIMAL(10,2),
+            extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            extracted_date DATE NOT NULL,
+            
+            PRIMARY KEY (crypto_id, vs_currency)
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_latest_extracted_date ON crypto_latest(extracted_date);
+        
+        -- Technical indicators per snapshot (see etl/indicators.py)
+        CREATE TABLE IF NOT EXISTS crypto_indicators (
+            crypto_id VARCHAR(50) NOT NULL,
+            vs_currency VARCHAR(10) NOT NULL,
+            last_updated TIMESTAMP NOT NULL,
+            current_price DOUBLE PRECISION NOT NULL,
+            log_return DOUBLE PRECISION,
+            volatility DOUBLE PRECISION,
+            ema DOUBLE PRECISION,
+            rsi DOUBLE PRECISION,
+            drawdown DOUBLE PRECISION,
+            
+            PRIMARY KEY (crypto_id, vs_currency, last_updated)
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_indicators_last_updated ON crypto_indicators(last_updated);
+        
+        -- Latest indicators and the per-coin state the next snapshot continues from
+        CREATE TABLE IF NOT EXISTS crypto_indicators_latest (
+            crypto_id VARCHAR(50) NOT NULL,
+            vs_currency VARCHAR(10) NOT NULL,
+            last_updated TIMESTAMP NOT NULL,
+            current_price DOUBLE PRECISION NOT NULL,
+            log_return DOUBLE PRECISION,
+            volatility DOUBLE PRECISION,
+            ema DOUBLE PRECISION,
+            rsi DOUBLE PRECISION,
+            drawdown DOUBLE PRECISION,
+            observations BIGINT NOT NULL,
+            avg_gain DOUBLE PRECISION NOT NULL,
+            avg_loss DOUBLE PRECISION NOT NULL,
+            peak DOUBLE PRECISION NOT NULL,
+            returns DOUBLE PRECISION[] NOT NULL,
+            intervals DOUBLE PRECISION[] NOT NULL,
+            
+            PRIMARY KEY (crypto_id, vs_currency)
+        );
+        
+        -- Rows that failed validation (see etl/validation.py), loosely typed so any of them fits
+        CREATE TABLE IF NOT EXISTS crypto_prices_quarantine (
+            crypto_id TEXT,
+            symbol TEXT,
+            name TEXT,
+            vs_currency TEXT,
+            current_price DOUBLE PRECISION,
+            market_cap DOUBLE PRECISION,
+            rank DOUBLE PRECISION,
+            volume_24h DOUBLE PRECISION,
+            price_change_24h DOUBLE PRECISION,
+            circulating_supply DOUBLE PRECISION,
+            last_updated TEXT,
+            price_category TEXT,
+            market_cap_billions DOUBLE PRECISION,
+            extracted_at TIMESTAMP,
+            extracted_date DATE,
+            quarantine_reason TEXT NOT NULL,
+            quarantined_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_quarantine_quarantined_at ON crypto_prices_quarantine(quarantined_at);
         """
         
         try:
-            with self.engine.connect() as conn:
+            self._drop_single_currency_latest()
+            
+            # DDL is transactional in Postgres: a failed legacy migration rolls back to the old heap
+            with self.engine.begin() as conn:
+                legacy_range = self._rename_legacy_table(conn)
                 conn.execute(text(create_table_sql))
-                conn.commit()
+                self._require_last_updated(conn)
+                partitions = self._create_partitions(conn)
+                if legacy_range:
+                    self._migrate_legacy_table(conn, *legacy_range)
+            self._partition_names.update(partitions)
+            
+            self._seed_latest()
+            
             logger.info("Database tables created")
         except Exception as e:
             logger.error(f"Failed to create tables: {e}")
             raise
     
-    def load_data(self, df: pd.DataFrame) -> int:
-        """Load data to PostgreSQL"""
+    @timed('db_call', operation='ensure_partitions')
+    def ensure_partitions(self, start: Optional[date] = None, end: Optional[date] = None,
+                          months_ahead: int = PARTITION_PREMAKE_MONTHS) -> List[str]:
+        """Create monthly partitions from start's month through months_ahead past the current month"""
+        
+        with self.engine.begin() as conn:
+            created = self._create_partitions(conn, start, end, months_ahead)
+        self._partition_names.update(created)
+        return created
+    
+    def _create_partitions(self, conn, start: Optional[date] = None, end: Optional[date] = None,
+                           months_ahead: int = PARTITION_PREMAKE_MONTHS) -> List[str]:
+        """ensure_partitions on an open connection (the caller commits)"""
+        
+        today = date.today()
+        first = _month_start(min(start or today, today))
+        last = _add_months(_month_start(max(end or today, today)), months_ahead)
+        
+        created = []
+        month = first
+        while month <= last:
+            name = _partition_name(month)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF crypto_prices "
+                f"FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')"
+            ))
+            created.append(name)
+            month = _add_months(month, 1)
+        return created
+    
+    def _ensure_partitions_for(self, df: pd.DataFrame) -> None:
+        """Make sure every month in a batch has a partition (backfills load past months, and a
+        long-running poller outlives the months premade at startup)"""
+        
+        if 'extracted_date' in df.columns and not df.empty:
+            months = {_month_start(day) for day in pd.to_datetime(df['extracted_date']).dt.date.unique()}
+            missing = sorted(month for month in months if _partition_name(month) not in self._partition_names)
+            if missing:
+                self.ensure_partitions(start=missing[0], end=missing[-1])
+    
+    @timed('db_call', operation='apply_retention')
+    def apply_retention(self, retention_months: int = PARTITION_RETENTION_MONTHS,
+                        mode: str = PARTITION_RETENTION_MODE) -> List[str]:
+        """Detach or drop whole partitions older than retention_months (and expire indicator and quarantine rows)"""
+        
+        if retention_months <= 0:
+            return []
+        
+        cutoff = _add_months(_month_start(date.today()), -retention_months)
+        partitions_query = """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = 'crypto_prices'
+        """
+        
+        expired = []
+        with self.engine.connect() as conn:
+            for (name,) in conn.execute(text(partitions_query)).all():
+                month = _partition_month(name)
+                if month is None or _add_months(month, 1) > cutoff:
+                    continue
+                conn.execute(text(f"ALTER TABLE crypto_prices DETACH PARTITION {name}"))
+                self._partition_names.discard(name)
+                if mode == 'drop':
+                    conn.execute(text(f"DROP TABLE {name}"))
+                else:
+                    # Free the partition name so the month can be created again (e.g. by a backfill)
+                    conn.execute(text(f"ALTER TABLE {name} RENAME TO {self._detached_name(conn, name)}"))
+                expired.append(name)
+            # Indicator history expires with the prices it was computed from
+            conn.execute(text("DELETE FROM crypto_indicators WHERE last_updated < :cutoff"), {'cutoff': cutoff})
+            conn.execute(text("DELETE FROM crypto_prices_quarantine WHERE quarantined_at < :cutoff"), {'cutoff': cutoff})
+            conn.commit()
+        
+        if expired:
+            action = 'Dropped' if mode == 'drop' else 'Detached'
+            logger.info(f"{action} {len(expired)} expired partitions: {', '.join(sorted(expired))}")
+        return expired
+    
+    def _detached_name(self, conn, name: str) -> str:
+        """First free {name}_detached[_N] table name"""
+        
+        candidate, suffix = f"{name}_detached", 1
+        while conn.execute(text("SELECT to_regclass(:name)"), {'name': candidate}).scalar() is not None:
+            suffix += 1
+            candidate = f"{name}_detached_{suffix}"
+        return candidate
+    
+    @timed('db_call', operation='delete_snapshots')
+    def delete_snapshots(self, keys: pd.DataFrame) -> int:
+        """Delete the crypto_prices rows matching (crypto_id, vs_currency, extracted_at) keys
+        
+        Used before reprocessing landed extractions: only rows the landing zone
+        can restore are removed, never backfilled or unlanded history. To reload
+        the rows in the same transaction use load_data(..., replace_keys=keys).
+        """
+        
+        if keys.empty:
+            return 0
+        
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                deleted = self._delete_snapshots(cursor, keys)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to delete snapshots: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        logger.info(f"Deleted {deleted} records about to be reprocessed")
+        return deleted
+    
+    def _delete_snapshots(self, cursor, keys: pd.DataFrame) -> int:
+        """delete_snapshots on an open cursor (the caller commits)"""
+        
+        keys = keys[['crypto_id', 'vs_currency', 'extracted_at']].drop_duplicates()
+        extracted = pd.to_datetime(keys['extracted_at'])
+        dates = {'start_date': extracted.min().date(), 'end_date': extracted.max().date()}
+        
+        cursor.execute("""
+            CREATE TEMP TABLE crypto_prices_delete_keys (
+                crypto_id VARCHAR(50), vs_currency VARCHAR(10), extracted_at TIMESTAMP
+            ) ON COMMIT DROP
+        """)
+        self._copy_frame(cursor, keys, 'crypto_prices_delete_keys', LOAD_CHUNK_SIZE)
+        cursor.execute("""
+            DELETE FROM crypto_prices p
+            USING crypto_prices_delete_keys k
+            WHERE p.extracted_date BETWEEN %(start_date)s AND %(end_date)s
+              AND p.crypto_id = k.crypto_id
+              AND p.vs_currency = k.vs_currency
+              AND p.extracted_at = k.extracted_at
+        """, dates)
+        return cursor.rowcount
+    
+    def _rename_legacy_table(self, conn) -> Optional[tuple]:
+        """Move an unpartitioned crypto_prices aside and return its date range (the caller commits)"""
+        
+        relkind = conn.execute(text(
+            "SELECT relkind FROM pg_class "
+            "WHERE relname = 'crypto_prices' AND relnamespace = current_schema()::regnamespace"
+        )).scalar()
+        if relkind != 'r':
+            # A heap left behind by an interrupted migration from before it ran in one transaction
+            if conn.execute(text("SELECT to_regclass('crypto_prices_legacy')")).scalar() is None:
+                return None
+            logger.info("Resuming migration of crypto_prices_legacy")
+            return conn.execute(text(
+                "SELECT MIN(extracted_date), MAX(extracted_date) FROM crypto_prices_legacy"
+            )).one()
+        
+        date_range = conn.execute(text(
+            "SELECT MIN(extracted_date), MAX(extracted_date) FROM crypto_prices"
+        )).one()
+        conn.execute(text("ALTER TABLE crypto_prices RENAME TO crypto_prices_legacy"))
+        conn.execute(text("ALTER INDEX IF EXISTS crypto_prices_pkey RENAME TO crypto_prices_legacy_pkey"))
+        for index in ['idx_crypto_id', 'idx_extracted_date', 'idx_rank', 'idx_currency_date',
+                      'uq_crypto_prices_natural_key', 'uq_crypto_prices_currency_key']:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        
+        logger.info("Converting crypto_prices to a partitioned table")
+        return date_range
+    
+    def _require_last_updated(self, conn) -> None:
+        """Make last_updated NOT NULL on tables created before it was (the caller commits)
+        
+        A NULL never conflicts in the natural key, so retried snapshots without
+        last_updated were stored again; such rows are moved to quarantine.
+        """
+        
+        nullable = conn.execute(text("""
+            SELECT is_nullable = 'YES' FROM information_schema.columns
+            WHERE table_name = 'crypto_prices' AND table_schema = current_schema()
+              AND column_name = 'last_updated'
+        """)).scalar()
+        if not nullable:
+            return
+        
+        moved = self._quarantine_unkeyed_rows(conn, 'crypto_prices')
+        conn.execute(text("ALTER TABLE crypto_prices ALTER COLUMN last_updated SET NOT NULL"))
+        logger.info(f"crypto_prices.last_updated is now required ({moved} records without it quarantined)")
+    
+    def _quarantine_unkeyed_rows(self, conn, table: str, vs_currency: str = 'vs_currency') -> int:
+        """Move rows without last_updated from table to crypto_prices_quarantine (the caller commits)"""
+        
+        columns = ', '.join(TABLE_COLUMNS)
+        values = ', '.join(vs_currency if column == 'vs_currency' else column for column in TABLE_COLUMNS)
+        conn.execute(text(f"""
+            INSERT INTO crypto_prices_quarantine ({columns}, quarantine_reason)
+            SELECT {values}, 'null:last_updated' FROM {table} WHERE last_updated IS NULL
+        """))
+        return conn.execute(text(f"DELETE FROM {table} WHERE last_updated IS NULL")).rowcount
+    
+    def _migrate_legacy_table(self, conn, min_date: Optional[date], max_date: Optional[date]) -> None:
+        """Copy deduplicated legacy rows into the partitioned table and drop the old heap (the caller commits)"""
+        
+        if min_date is not None:
+            self._create_partitions(conn, start=min_date, end=max_date)
+        
+        # Legacy heaps predate the vs_currency column (USD only, filled by the default)
+        self._quarantine_unkeyed_rows(conn, 'crypto_prices_legacy', vs_currency="'usd'")
+        columns = ', '.join(column for column in TABLE_COLUMNS if column != 'vs_currency')
+        result = conn.execute(text(f"""
+            INSERT INTO crypto_prices ({columns})
+            SELECT {columns} FROM crypto_prices_legacy
+            ON CONFLICT ({NATURAL_KEY}) DO NOTHING
+        """))
+        conn.execute(text("DROP TABLE crypto_prices_legacy"))
+        
+        logger.info(f"Migrated {result.rowcount} legacy records into partitioned crypto_prices")
+    
+    def load_data(self, df: pd.DataFrame, method: str = LOAD_METHOD, update_existing: bool = False,
+                  ensure_partitions: bool = True, replace_keys: Optional[pd.DataFrame] = None) -> int:
+        """Load data to PostgreSQL using upsert or COPY, or to_sql as a fallback
+        
+        update_existing (upsert only) overwrites a stored row with the same
+        natural key instead of skipping it, for revised values of a snapshot.
+        replace_keys (see delete_snapshots) are deleted in the same transaction
+        as the batch is merged, always with upsert, so a failed reload leaves
+        the old rows in place. Concurrent callers should create partitions up
+        front and pass ensure_partitions=False, so no two of them run
+        partition DDL at once.
+        """
         
         if df.empty:
             logger.warning("No data to load")
+            self.last_load_stats = {}
             return 0
         
+        if ensure_partitions:
+            self._ensure_partitions_for(df)
+        
+        if method == 'upsert' or replace_keys is not None:
+            records = self.upsert_load(df, update_existing=update_existing, replace_keys=replace_keys)['records']
+            self._append_to_store(df)
+            return records
+        
+        if method == 'copy':
+            try:
+                records = self.bulk_load(df)['records']
+            except Exception as e:
+                if getattr(e, 'pgcode', None) != UNIQUE_VIOLATION:
+                    raise
+                # A retried batch: COPY can't skip what is already stored, the upsert can
+                logger.warning("COPY hit rows that are already loaded, merging the batch with upsert instead")
+                records = self.upsert_load(df)['records']
+            self._append_to_store(df)
+            return records
+        
         try:
             record_count = len(df)
             logger.info(f"Loading {record_count} records to database")
+            start = time.perf_counter()
             
-            # Load data
-            df.to_sql(
-                'crypto_prices',
-                self.engine,
-                if_exists='append',
-                index=False,
-                method='multi'
-            )
+            # Load data and refresh crypto_latest in one transaction
+            with self.metrics.timer('db_call', operation='to_sql'), self.engine.begin() as conn:
+                df.to_sql(
+                    'crypto_prices',
+                    conn,
+                    if_exists='append',
+                    index=False,
+                    method='multi'
+                )
+                self._refresh_latest(conn.connection.cursor(), df)
             
+            self.last_load_stats = self._load_stats('to_sql', record_count, time.perf_counter() - start)
             logger.info(f"Successfully loaded {record_count} records")
+            self._append_to_store(df)
             return record_count
             
         except Exception as e:
             logger.error(f"Failed to load data: {e}")
             raise
     
-    def get_latest_stats(self) -> Dict:
-        """Data Statistics"""
+    @timed('db_call', operation='copy')
+    def bulk_load(self, df: pd.DataFrame, table: str = 'crypto_prices',
+                  chunk_size: int = LOAD_CHUNK_SIZE) -> Dict:
+        """Stream data into PostgreSQL with COPY FROM STDIN in CSV chunks"""
+        
+        if df.empty:
+            logger.warning("No data to load")
+            self.last_load_stats = self._load_stats('copy', 0, 0.0)
+            return self.last_load_stats
+        
+        record_count = len(df)
+        logger.info(f"Bulk loading {record_count} records into {table} via COPY")
+        
+        start = time.perf_counter()
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                self._copy_frame(cursor, df, table, chunk_size)
+                if table == 'crypto_prices':
+                    self._refresh_latest(cursor, df)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to bulk load data: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        self.last_load_stats = self._load_stats('copy', record_count, time.perf_counter() - start)
+        logger.info(
+            f"Successfully loaded {record_count} records "
+            f"({self.last_load_stats['rows_per_second']:.0f} rows/sec)"
+        )
+        return self.last_load_stats
+    
+    @timed('db_call', operation='upsert')
+    def upsert_load(self, df: pd.DataFrame, chunk_size: int = LOAD_CHUNK_SIZE,
+                    update_existing: bool = False, replace_keys: Optional[pd.DataFrame] = None) -> Dict:
+        """Idempotent load: COPY into a temp staging table, then merge on the natural key
+        
+        Rows whose key is already stored are skipped, or overwritten with
+        update_existing. The keys actually written are kept in last_written_keys.
+        Snapshots matching replace_keys are deleted first, in the same transaction.
+        """
+        
+        self.last_written_keys = set()
+        if df.empty:
+            logger.warning("No data to load")
+            self.last_load_stats = self._load_stats('upsert', 0, 0.0)
+            return self.last_load_stats
+        
+        record_count = len(df)
+        logger.info(f"Upserting {record_count} records into crypto_prices")
+        
+        columns = ', '.join(df.columns)
+        key_columns = [column.strip() for column in NATURAL_KEY.split(',')]
+        if update_existing:
+            updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in df.columns if column not in key_columns)
+            # A revised row must be picked up again by the incremental dbt models
+            conflict = f"DO UPDATE SET {updates}, loaded_at = CURRENT_TIMESTAMP"
+            existing = ""
+        else:
+            conflict = "DO NOTHING"
+            # Rows ON CONFLICT would drop still take an id from the sequence; filter stored keys first
+            # so ids only advance for rows actually inserted
+            matches = ' AND '.join(f"p.{column} = s.{column}" for column in key_columns)
+            existing = f"WHERE NOT EXISTS (SELECT 1 FROM crypto_prices p WHERE {matches})"
+        merge_sql = f"""
+        INSERT INTO crypto_prices ({columns})
+        SELECT DISTINCT ON ({NATURAL_KEY}) {columns}
+        FROM crypto_prices_staging s
+        {existing}
+        ORDER BY {NATURAL_KEY}
+        ON CONFLICT ({NATURAL_KEY}) {conflict}
+        RETURNING crypto_id, vs_currency
+        """
+        
+        start = time.perf_counter()
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                deleted = 0
+                if replace_keys is not None and not replace_keys.empty:
+                    deleted = self._delete_snapshots(cursor, replace_keys)
+                # The batch's columns only: no id, so staging never draws from the id sequence
+                cursor.execute(f"""
+                    CREATE TEMP TABLE crypto_prices_staging ON COMMIT DROP AS
+                    SELECT {columns} FROM crypto_prices WITH NO DATA
+                """)
+                self._copy_frame(cursor, df, 'crypto_prices_staging', chunk_size)
+                cursor.execute(merge_sql)
+                written = cursor.fetchall()
+                inserted = len(written)
+                self._refresh_latest(cursor, df)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to upsert data: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        self.last_written_keys = set(written)
+        self.last_load_stats = self._load_stats('upsert', inserted, time.perf_counter() - start)
+        self.last_load_stats['duplicates_skipped'] = record_count - inserted
+        if replace_keys is not None:
+            self.last_load_stats['replaced'] = deleted
+        logger.info(
+            f"Successfully loaded {inserted} records, skipped {record_count - inserted} duplicates "
+            f"({self.last_load_stats['rows_per_second']:.0f} rows/sec)"
+        )
+        return self.last_load_stats
+    
+    def _append_to_store(self, df: pd.DataFrame) -> None:
+        """Committed rows go to the price store; a store failure never fails the load"""
+        
+        if self.store is None:
+            return
+        try:
+            self.store.append(df)
+        except Exception as e:
+            logger.warning(f"Failed to append to price store: {e}")
+    
+    def _refresh_latest(self, cursor, df: pd.DataFrame) -> None:
+        """Upsert each coin's newest row per currency into crypto_latest (older snapshots never win)"""
+        
+        key = [column for column in ('crypto_id', 'vs_currency') if column in df.columns]
+        latest = df.sort_values(['last_updated', 'extracted_at']).drop_duplicates(key, keep='last')
+        columns = [column for column in TABLE_COLUMNS if column in latest.columns]
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns if column not in key)
+        
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS crypto_latest_staging
+            (LIKE crypto_latest INCLUDING DEFAULTS)
+            ON COMMIT DROP
+        """)
+        self._copy_frame(cursor, latest[columns], 'crypto_latest_staging', LOAD_CHUNK_SIZE)
+        cursor.execute(f"""
+            INSERT INTO crypto_latest ({', '.join(columns)})
+            SELECT {', '.join(columns)} FROM crypto_latest_staging
+            ON CONFLICT (crypto_id, vs_currency) DO UPDATE SET {updates}
+            WHERE crypto_latest.last_updated IS NULL
+               OR EXCLUDED.last_updated >= crypto_latest.last_updated
+        """)
+        cursor.execute("DROP TABLE crypto_latest_staging")
+    
+    def _drop_single_currency_latest(self) -> None:
+        """crypto_latest keyed on crypto_id alone predates vs_currency; drop it to be re-seeded"""
+        
+        with self.engine.connect() as conn:
+            stale = conn.execute(text("""
+                SELECT 1 FROM information_schema.tables t
+                WHERE t.table_name = 'crypto_latest' AND t.table_schema = current_schema()
+                  AND NOT EXISTS (
+                      SELECT 1 FROM information_schema.columns c
+                      WHERE c.table_name = 'crypto_latest' AND c.table_schema = current_schema()
+                        AND c.column_name = 'vs_currency'
+                  )
+            """)).scalar()
+            if stale:
+                conn.execute(text("DROP TABLE crypto_latest"))
+                conn.commit()
+                logger.info("Rebuilding crypto_latest per quote currency")
+    
+    def _seed_latest(self) -> None:
+        """Fill an empty crypto_latest from existing history (first run after upgrade)"""
+        
+        columns = ', '.join(TABLE_COLUMNS)
+        with self.engine.connect() as conn:
+            result = conn.execute(text(f"""
+                INSERT INTO crypto_latest ({columns})
+                SELECT DISTINCT ON (crypto_id, vs_currency) {columns}
+                FROM crypto_prices
+                WHERE NOT EXISTS (SELECT 1 FROM crypto_latest)
+                ORDER BY crypto_id, vs_currency, last_updated DESC NULLS LAST, extracted_at DESC
+            """))
+            conn.commit()
+        
+        if result.rowcount:
+            logger.info(f"Seeded crypto_latest with {result.rowcount} coins")
+    
+    def _copy_frame(self, cursor, df: pd.DataFrame, table: str, chunk_size: int) -> None:
+        """COPY a frame into table in CSV chunks on an open cursor"""
+        
+        copy_sql = f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)"
+        for offset in range(0, len(df), chunk_size):
+            chunk = self._prepare_copy_chunk(df.iloc[offset:offset + chunk_size])
+            buffer = io.StringIO()
+            chunk.to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+    
+    def _prepare_copy_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Cast float-typed integer columns to nullable ints for COPY"""
+        
+        chunk = chunk.copy()
+        for column in INTEGER_COLUMNS:
+            if column in chunk.columns:
+                chunk[column] = pd.to_numeric(chunk[column], errors='coerce').round().astype('Int64')
+        return chunk
+    
+    def _load_stats(self, method: str, records: int, duration: float) -> Dict:
+        self.metrics.increment('rows_loaded_total', records, method=method)
+        return {
+            'method': method,
+            'records': records,
+            'duration_seconds': round(duration, 3),
+            'rows_per_second': round(records / duration, 1) if duration > 0 else 0.0
+        }
+    
+    def get_latest_stats(self, vs_currency: str = VS_CURRENCIES[0]) -> Dict:
+        """Data Statistics (prices and market caps in vs_currency), from the price store when attached"""
         
-        stats_query = """
+        if self.store is not None and len(self.store):
+            return self.store.stats(vs_currency)
+        return self._query_latest_stats(vs_currency)
+    
+    @timed('db_call', operation='get_latest_stats')
+    def _query_latest_stats(self, vs_currency: str) -> Dict:
+        # crypto_latest holds one row per coin and currency, so this is O(#coins) regardless of history
+        stats_query = text("""
         SELECT 
             COUNT(*) as total_records,
             COUNT(DISTINCT crypto_id) as unique_cryptos,
             MAX(extracted_date) as latest_date,
             AVG(current_price) as avg_price,
             SUM(market_cap_billions) as total_market_cap_billions
-        FROM crypto_prices
-        WHERE extracted_date = (SELECT MAX(extracted_date) FROM crypto_prices)
-        """
+        FROM crypto_latest
+        WHERE vs_currency = :vs_currency
+          AND extracted_date = (SELECT MAX(extracted_date) FROM crypto_latest WHERE vs_currency = :vs_currency)
+        """)
         
         try:
-            result = pd.read_sql(stats_query, self.engine)
+            with self.engine.connect() as conn:
+                result = pd.read_sql(stats_query, conn, params={'vs_currency': vs_currency})
             return result.iloc[0].to_dict()
         except Exception as e:
             logger.warning(f"No stats: {e}")
             return {}
     
+    def iter_recent_prices(self, since: datetime) -> Iterator[pd.DataFrame]:
+        """crypto_prices rows updated after since, oldest first, in LOAD_CHUNK_SIZE frames"""
+        
+        query = text("""
+        SELECT crypto_id, vs_currency, last_updated, current_price, market_cap,
+               volume_24h, price_change_24h, rank
+        FROM crypto_prices
+        WHERE extracted_date >= :since_date AND last_updated > :since
+        ORDER BY last_updated
+        """)
+        
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            # extracted_date is local time, last_updated UTC: prune partitions with a day of slack
+            params = {'since': since, 'since_date': since.date() - timedelta(days=1)}
+            yield from pd.read_sql(query, conn, params=params, chunksize=LOAD_CHUNK_SIZE)
+    
+    @timed('db_call', operation='get_latest_versions')
+    def get_latest_versions(self) -> pd.DataFrame:
+        """Key, last_updated, price and market cap of every stored snapshot (from crypto_latest)"""
+        
+        columns = ['crypto_id', 'vs_currency', 'last_updated', 'current_price', 'market_cap']
+        try:
+            return pd.read_sql(f"SELECT {', '.join(columns)} FROM crypto_latest", self.engine)
+        except Exception as e:
+            logger.warning(f"No latest versions: {e}")
+            return pd.DataFrame(columns=columns)
+    
+    @timed('db_call', operation='save_quarantine')
+    def save_quarantine(self, df: pd.DataFrame) -> int:
+        """Append rows that failed validation to crypto_prices_quarantine"""
+        
+        if df.empty:
+            return 0
+        
+        columns = [column for column in (*TABLE_COLUMNS, 'quarantine_reason') if column in df.columns]
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                self._copy_frame(cursor, df[columns], 'crypto_prices_quarantine', LOAD_CHUNK_SIZE)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to save quarantined rows: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        self.metrics.increment('rows_total', len(df), stage='quarantine')
+        logger.info(f"Quarantined {len(df)} rows in crypto_prices_quarantine")
+        return len(df)
+    
+    @timed('db_call', operation='save_indicators')
+    def save_indicators(self, indicators: pd.DataFrame, state: pd.DataFrame) -> int:
+        """Append indicator rows and upsert the per-coin state in one transaction"""
+        
+        if indicators.empty:
+            return 0
+        
+        state = state.copy()
+        for column in ('returns', 'intervals'):
+            # Postgres array literals; NaN marks window slots not filled yet
+            state[column] = ['{' + ','.join(map(repr, values.tolist())) + '}' for values in state[column]]
+        
+        state_columns = ', '.join(state.columns)
+        updates = ', '.join(
+            f"{column} = EXCLUDED.{column}" for column in state.columns if column not in ('crypto_id', 'vs_currency')
+        )
+        
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TEMP TABLE crypto_indicators_staging
+                    (LIKE crypto_indicators) ON COMMIT DROP;
+                    CREATE TEMP TABLE crypto_indicators_latest_staging
+                    (LIKE crypto_indicators_latest) ON COMMIT DROP;
+                """)
+                self._copy_frame(cursor, indicators, 'crypto_indicators_staging', LOAD_CHUNK_SIZE)
+                cursor.execute(f"""
+                    INSERT INTO crypto_indicators ({', '.join(indicators.columns)})
+                    SELECT {', '.join(indicators.columns)} FROM crypto_indicators_staging
+                    ON CONFLICT (crypto_id, vs_currency, last_updated) DO NOTHING
+                """)
+                inserted = cursor.rowcount
+                self._copy_frame(cursor, state, 'crypto_indicators_latest_staging', LOAD_CHUNK_SIZE)
+                cursor.execute(f"""
+                    INSERT INTO crypto_indicators_latest ({state_columns})
+                    SELECT {state_columns} FROM crypto_indicators_latest_staging
+                    ON CONFLICT (crypto_id, vs_currency) DO UPDATE SET {updates}
+                    WHERE EXCLUDED.last_updated >= crypto_indicators_latest.last_updated
+                """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to save indicators: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        logger.info(f"Saved {inserted} indicator rows for {len(state)} coins")
+        return inserted
+    
+    @timed('db_call', operation='get_indicator_state')
+    def get_indicator_state(self) -> pd.DataFrame:
+        """Per-coin indicator state to resume IndicatorEngine from"""
+        
+        try:
+            return pd.read_sql("SELECT * FROM crypto_indicators_latest", self.engine)
+        except Exception as e:
+            logger.warning(f"No indicator state: {e}")
+            return pd.DataFrame()
+    
+    @timed('db_call', operation='health_check')
     def health_check(self) -> bool:
         """Check database connection"""
         try:
@@ -111,4 +859,71 @@ class CryptoLoader:
                 conn.execute(text("SELECT 1"))
             return True
         except:
-            return False# Updated: Mon Sep 15 13:54:14 +08 2025
+            return False
+
+class BackgroundLoader:
+    """Load chunks on a worker thread fed through a bounded queue
+
+    submit() blocks once max_pending chunks are waiting, so memory stays
+    bounded while extraction and transformation keep running ahead of the
+    database.
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, loader: CryptoLoader, max_pending: int = LOAD_QUEUE_SIZE, method: str = LOAD_METHOD):
+        self.loader = loader
+        self.method = method
+        self.records_loaded = 0
+        self.chunks_loaded = 0
+        self.load_seconds = 0.0
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="crypto-loader", daemon=True)
+        self._thread.start()
+    
+    def submit(self, df: pd.DataFrame, after: Optional[Callable[[], None]] = None) -> None:
+        """Queue a chunk for loading, re-raising any earlier load failure
+
+        after runs on the worker once the chunk is loaded (not if it failed),
+        for writes that must follow it, such as the chunk's indicators.
+        """
+        self._raise_if_failed()
+        self._queue.put((df, after))
+    
+    def close(self) -> Dict:
+        """Wait for queued chunks to finish loading and return totals"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._raise_if_failed()
+        return {
+            'method': self.method,
+            'records': self.records_loaded,
+            'chunks': self.chunks_loaded,
+            'duration_seconds': round(self.load_seconds, 3),
+            'rows_per_second': round(self.records_loaded / self.load_seconds, 1) if self.load_seconds > 0 else 0.0
+        }
+    
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            if self._error is not None:
+                # Keep draining so producers blocked on put() can finish
+                continue
+            df, after = item
+            try:
+                start = time.perf_counter()
+                self.records_loaded += self.loader.load_data(df, method=self.method)
+                self.load_seconds += time.perf_counter() - start
+                self.chunks_loaded += 1
+                if after is not None:
+                    after()
+            except Exception as e:
+                self._error = e
+    
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+# Updated: Mon Sep 15 13:54:14 +08 2025
@@ -1,37 +1,169 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+import warnings
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import date, datetime
+from typing import Dict, Iterator
+from .config import LOG_LEVEL, LOG_ASYNC, LOG_DIR, LOG_FILE_FORMAT, LOG_MAX_MB, LOG_BACKUP_COUNT
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+# Process-wide fields (run_id) and fields scoped to the current context (stage)
+_run_fields = {}
+_scoped_fields = contextvars.ContextVar('log_fields', default={})
+
+_handlers_lock = threading.Lock()
+_handlers = []
+
+def set_log_context(**fields) -> None:
+    """Attach fields such as run_id to every record from now on (all threads)"""
+    _run_fields.update(fields)
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Attach fields such as stage to records logged inside the block"""
+    token = _scoped_fields.set({**_scoped_fields.get(), **fields})
+    try:
+        yield
+    finally:
+        _scoped_fields.reset(token)
+
+@lru_cache(maxsize=None)
+def parse_log_levels(spec: str = LOG_LEVEL) -> Dict[str, int]:
+    """'INFO,etl.extract=DEBUG' -> {'': INFO, 'etl.extract': DEBUG}"""
+    levels = {'': logging.INFO}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        module, _, level = part.rpartition('=')
+        value = logging.getLevelName(level.strip().upper())
+        if not isinstance(value, int):
+            # Unknown names come back as 'Level X', which setLevel rejects
+            warnings.warn(f"Unknown log level {level.strip()!r} in LOG_LEVEL, using INFO")
+            value = logging.INFO
+        levels[module.strip()] = value
+    return levels
+
+def _level_for(name: str, levels: Dict[str, int]) -> int:
+    """Most specific configured prefix of the logger name wins"""
+    matches = [module for module in levels if not module or name == module or name.startswith(module + '.')]
+    return levels[max(matches, key=len)]
+
+class _ContextFilter(logging.Filter):
+    """Copy run/stage fields onto records in the logging thread (before any queue hop)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in {**_run_fields, **_scoped_fields.get()}.items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with context fields and any `extra` (e.g. timings)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DailyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """<prefix>_YYYYMMDD.log, a new file each day and .1, .2, ... once max_bytes is reached
+
+    The directory and file are created on the first record, not at import.
+    """
+
+    def __init__(self, directory: str, prefix: str = 'pipeline', max_bytes: int = 0, backup_count: int = 0):
+        self.directory = directory
+        self.prefix = prefix
+        self._day = date.today()
+        super().__init__(self._path(self._day), maxBytes=max_bytes, backupCount=backup_count, delay=True)
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{self.prefix}_{day:%Y%m%d}.log")
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        return date.today() != self._day or super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        today = date.today()
+        if today == self._day:
+            return super().doRollover()
+
+        # New day: switch to that day's file and keep the old one as is
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self._day = today
+        self.baseFilename = os.path.abspath(self._path(today))
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return super()._open()
+
+def _build_handlers() -> list:
+    """File and console handlers, shared by every module logger
+
+    In async mode both sit behind one QueueListener thread, so logging
+    never blocks the caller on disk or terminal I/O.
+    """
+
+    text_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    file_handler = DailyRotatingFileHandler(
+        LOG_DIR, max_bytes=int(LOG_MAX_MB * 1024 * 1024), backup_count=LOG_BACKUP_COUNT
+    )
+    file_handler.setFormatter(JsonFormatter() if LOG_FILE_FORMAT == 'json' else text_formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(text_formatter)
+
+    if not LOG_ASYNC:
+        handlers = [file_handler, console_handler]
+    else:
+        records = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, file_handler, console_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        handlers = [logging.handlers.QueueHandler(records)]
+
+    context_filter = _ContextFilter()
+    for handler in handlers:
+        handler.addFilter(context_filter)
+    return handlers
 
 def setup_logger(name="crypto_etl"):
     """Logging/Monitoring for Crypto ETL Pipeline"""
-    
-    # Create logs directory
-    os.makedirs('logs', exist_ok=True)
-    
+
     # Create logger
     logger = logging.getLogger(name)
-    
+
     if logger.handlers:
         return logger
-    
-    logger.setLevel(logging.INFO)
-    
-    # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
-    # File handler
-    file_handler = logging.FileHandler(
-        f'logs/pipeline_{datetime.now().strftime("%Y%m%d")}.log'
-    )
-    file_handler.setFormatter(formatter)
-    
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger# Updated: Mon Sep 15 13:54:14 +08 2025
+
+    logger.setLevel(_level_for(name, parse_log_levels()))
+
+    with _handlers_lock:
+        if not _handlers:
+            _handlers.extend(_build_handlers())
+
+    for handler in _handlers:
+        logger.addHandler(handler)
+
+    return logger
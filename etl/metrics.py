@@ -0,0 +1,149 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from .config import METRICS_DIR, METRICS_EXPORT
+from .logger import log_context, setup_logger
+
+logger = setup_logger(__name__)
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_key(key: LabelKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+def timed(name: str, **labels) -> Callable:
+    """Method decorator recording call time in the instance's `metrics`"""
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(name, **labels):
+                return method(self, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+class PipelineMetrics:
+    """Thread-safe timers and counters for one pipeline run"""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Time a block and record it under name/labels
+
+        Stage timers also tag every log record inside the block with the stage.
+        """
+        context = {'stage': labels['stage']} if 'stage' in labels else {}
+        start = time.perf_counter()
+        try:
+            with log_context(**context):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            if context:
+                logger.debug(f"Stage {labels['stage']} took {elapsed:.3f}s",
+                             extra={**context, 'duration_seconds': round(elapsed, 4)})
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            timer = self._timers.setdefault(key, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            timer['count'] += 1
+            timer['total_seconds'] += seconds
+            timer['max_seconds'] = max(timer['max_seconds'], seconds)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'run_id': self.run_id,
+                'timers': {
+                    _format_key(key): {
+                        'count': t['count'],
+                        'total_seconds': round(t['total_seconds'], 4),
+                        'max_seconds': round(t['max_seconds'], 4)
+                    }
+                    for key, t in sorted(self._timers.items())
+                },
+                'counters': {_format_key(key): value for key, value in sorted(self._counters.items())}
+            }
+
+    def to_prometheus(self, prefix: str = "crypto_etl") -> str:
+        """Prometheus text exposition format (for the node_exporter textfile collector)"""
+
+        lines = []
+        with self._lock:
+            timer_names = sorted({name for name, _ in self._timers})
+            for name in timer_names:
+                metric = f"{prefix}_{name}_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                for key, t in sorted(self._timers.items()):
+                    if key[0] != name:
+                        continue
+                    labels = _format_key(("", key[1]))
+                    lines.append(f"{metric}_sum{labels} {t['total_seconds']:.6f}")
+                    lines.append(f"{metric}_count{labels} {t['count']}")
+                lines.append(f"# TYPE {metric}_max gauge")
+                for key, t in sorted(self._timers.items()):
+                    if key[0] == name:
+                        lines.append(f"{metric}_max{_format_key(('', key[1]))} {t['max_seconds']:.6f}")
+
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                for key, value in sorted(self._counters.items()):
+                    if key[0] == name:
+                        lines.append(f"{metric}{_format_key(('', key[1]))} {value}")
+
+        lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{prefix}_last_run_timestamp_seconds {self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str = METRICS_DIR, fmt: str = METRICS_EXPORT,
+               basename: str = "crypto_etl") -> List[str]:
+        """Write run metrics as JSON (one file per run) and/or a Prometheus textfile"""
+
+        if fmt == 'none':
+            return []
+
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+
+        if fmt in ('json', 'both'):
+            path = os.path.join(directory, f"{basename}_{self.run_id}.json")
+            with open(path, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2, default=str)
+            paths.append(path)
+
+        if fmt in ('prometheus', 'both'):
+            path = os.path.join(directory, f"{basename}.prom")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(self.to_prometheus(prefix=basename))
+            os.replace(tmp_path, path)
+            paths.append(path)
+
+        return paths
@@ -1,16 +1,32 @@
 import time
-from typing import Dict
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
 from .extract import CryptoExtractor
 from .transform import CryptoTransformer
-from .load import CryptoLoader
-from .logger import setup_logger
+from .load import CryptoLoader, BackgroundLoader
+from .landing import RawLandingZone
+from .indicators import IndicatorEngine
+from .validation import DataValidator
+from .price_store import PriceStore, open_price_store
+from .config import (
+    ETL_COIN_LIMIT, ETL_STREAMING, LANDING_ENABLED, INDICATORS_ENABLED, STORE_ENABLED, VALIDATION_ENABLED
+)
+from .metrics import PipelineMetrics
+from .logger import set_log_context, setup_logger
 
 logger = setup_logger(__name__)
 
-def run_etl_pipeline() -> Dict:
-    """Run ETL pipeline with logging/monitoring"""
+def run_etl_pipeline(limit: Optional[int] = ETL_COIN_LIMIT, streaming: bool = ETL_STREAMING) -> Dict:
+    """Run ETL pipeline with logging/monitoring
+
+    With streaming=True pages are transformed as they arrive and loaded on a
+    background thread, so memory stays flat regardless of limit (None = all coins).
+    """
     
     start_time = time.time()
+    metrics = PipelineMetrics()
+    set_log_context(run_id=metrics.run_id)
+    extractor = None
     
     try:
         logger.info("="*50)
@@ -18,39 +34,94 @@ def run_etl_pipeline() -> Dict:
         logger.info("="*50)
         
         # Initialize components
-        extractor = CryptoExtractor()
-        transformer = CryptoTransformer()
-        loader = CryptoLoader()
+        extractor = CryptoExtractor(metrics=metrics)
+        validator = DataValidator() if VALIDATION_ENABLED else None
+        transformer = CryptoTransformer(validator=validator)
+        loader = CryptoLoader(metrics=metrics)
+        landing = RawLandingZone() if LANDING_ENABLED else None
         
         # Health checks
         logger.info("Running health checks...")
-        if not extractor.health_check():
-            raise Exception("CoinGecko API health check failed")
-        
-        if not loader.health_check():
-            raise Exception("Database health check failed")
+        with metrics.timer('stage', stage='health_checks'):
+            if not extractor.health_check():
+                raise Exception("CoinGecko API health check failed")
+            
+            if not loader.health_check():
+                raise Exception("Database health check failed")
         
         logger.info("All health checks passed")
         
-        # Step 1: Extract
-        logger.info("Step 1: Extracting data")
-        raw_data = extractor.extract_top_coins(limit=50)
+        with metrics.timer('stage', stage='create_tables'):
+            loader.create_tables()
+        
+        if validator is not None:
+            # Price jumps and market cap moves are checked against the stored latest snapshots
+            validator.seed(loader.get_latest_versions())
+        
+        if STORE_ENABLED:
+            with metrics.timer('stage', stage='price_store'):
+                loader.store = open_price_store(loader)
         
-        # Step 2: Transform  
-        logger.info("Step 2: Transforming data")
-        clean_data = transformer.transform(raw_data)
-        quality_report = transformer.get_data_quality_report(clean_data)
+        indicators = IndicatorEngine.from_state(loader.get_indicator_state()) if INDICATORS_ENABLED else None
         
-        # Step 3: Load
-        logger.info("Step 3: Loading data")
-        loader.create_tables()
-        records_loaded = loader.load_data(clean_data)
+        if streaming:
+            logger.info("Streaming extract, transform and load")
+            with metrics.timer('stage', stage='stream'):
+                records_loaded, quality_report, transform_stats, load_stats = _run_streaming(
+                    extractor, transformer, loader, limit, metrics, landing, indicators
+                )
+        else:
+            # Step 1: Extract
+            logger.info("Step 1: Extracting data")
+            with metrics.timer('stage', stage='extract'):
+                raw_data = extractor.extract_top_coins(limit=limit)
+            extracted_at = pd.Timestamp.now()
+            
+            if landing:
+                with metrics.timer('stage', stage='landing'):
+                    landing.write(raw_data, extracted_at)
+            
+            # Step 2: Transform  
+            logger.info("Step 2: Transforming data")
+            with metrics.timer('stage', stage='transform'):
+                clean_data = transformer.transform(raw_data, extracted_at=extracted_at)
+                quality_report = transformer.get_data_quality_report(clean_data)
+            transform_stats = transformer.last_batch_stats
+            quarantined = transformer.last_quarantine
+            
+            # Step 3: Load
+            logger.info("Step 3: Loading data")
+            with metrics.timer('stage', stage='load'):
+                records_loaded = loader.load_data(clean_data)
+            load_stats = loader.last_load_stats
+            
+            if not quarantined.empty:
+                with metrics.timer('stage', stage='quarantine'):
+                    loader.save_quarantine(quarantined)
+            
+            if indicators is not None:
+                with metrics.timer('stage', stage='indicators'):
+                    indicator_rows = indicators.update(clean_data)
+                with metrics.timer('stage', stage='save_indicators'):
+                    loader.save_indicators(indicator_rows, indicators.state_frame(indicator_rows))
+        
+        metrics.increment('rows_total', transform_stats['records_in'], stage='extract')
+        metrics.increment('rows_total', transform_stats['records_out'], stage='transform')
+        metrics.increment('rows_total', records_loaded, stage='load')
+        
+        with metrics.timer('stage', stage='retention'):
+            loader.apply_retention()
         
         # Get stats
-        db_stats = loader.get_latest_stats()
+        with metrics.timer('stage', stage='get_latest_stats'):
+            db_stats = loader.get_latest_stats()
+        
+        if loader.store is not None:
+            _snapshot_store(loader.store)
         
         # Calculate duration
         duration = time.time() - start_time
+        metrics.observe('pipeline', duration, status='success')
         
         # Success metrics
         result = {
@@ -58,12 +129,18 @@ def run_etl_pipeline() -> Dict:
             'records_processed': records_loaded,
             'duration_seconds': round(duration, 2),
             'data_quality': quality_report,
-            'database_stats': db_stats
+            'database_stats': db_stats,
+            'api_stats': extractor.get_request_stats(),
+            'transform_stats': transform_stats,
+            'load_stats': load_stats,
+            'metrics': metrics.to_dict(),
+            'metrics_files': _export_metrics(metrics)
         }
         
         logger.info("="*50)
         logger.info("PIPELINE COMPLETED")
         logger.info(f"Records processed: {records_loaded}")
+        logger.info(f"API requests: {result['api_stats']['requests']} ({result['api_stats']['retries']} retries)")
         logger.info(f"Duration: {duration:.2f} seconds")
         logger.info("="*50)
         
@@ -71,6 +148,7 @@ def run_etl_pipeline() -> Dict:
         
     except Exception as e:
         duration = time.time() - start_time
+        metrics.observe('pipeline', duration, status='failed')
         
         logger.error("="*50)
         logger.error("PIPELINE FAILED")
@@ -81,8 +159,108 @@ def run_etl_pipeline() -> Dict:
         return {
             'success': False,
             'error': str(e),
-            'duration_seconds': round(duration, 2)
+            'duration_seconds': round(duration, 2),
+            'metrics': metrics.to_dict(),
+            'metrics_files': _export_metrics(metrics)
         }
+    
+    finally:
+        if extractor is not None:
+            extractor.close()
+
+def _export_metrics(metrics: PipelineMetrics) -> List[str]:
+    """Export without letting a metrics write failure mask the pipeline error"""
+    try:
+        return metrics.export()
+    except Exception as e:
+        logger.warning(f"Failed to export metrics: {e}")
+        return []
+
+def _snapshot_store(store: PriceStore) -> None:
+    """Persist the price store for the next process (and the dashboard); never fails the run"""
+    try:
+        store.snapshot()
+    except Exception as e:
+        logger.warning(f"Failed to snapshot price store: {e}")
+
+def _run_streaming(extractor: CryptoExtractor, transformer: CryptoTransformer,
+                   loader: CryptoLoader, limit: Optional[int],
+                   metrics: PipelineMetrics,
+                   landing: Optional[RawLandingZone] = None,
+                   indicators: Optional[IndicatorEngine] = None
+                   ) -> Tuple[int, Dict, Dict, Dict]:
+    """Transform each extracted page and hand it to a background loader
+    
+    Indicators advance page by page. Each page's indicator rows and
+    quarantined rows are saved by the loader thread once the page's prices
+    are loaded, and the quality report is combined as pages arrive, so
+    nothing is held per page after it is loaded.
+    """
+    
+    background = BackgroundLoader(loader)
+    quality_report = transformer.combine_quality_reports([])
+    transform_stats = {
+        'records_in': 0, 'records_out': 0, 'quarantined': 0, 'chunks': 0, 'estimated_frame_bytes': 0
+    }
+    
+    try:
+        for page in extractor.iter_market_pages(max_coins=limit or None):
+            extracted_at = pd.Timestamp.now()
+            if landing:
+                with metrics.timer('stage', stage='landing'):
+                    landing.write(page, extracted_at)
+            
+            with metrics.timer('stage', stage='transform'):
+                clean_chunk = transformer.transform(page, extracted_at=extracted_at)
+                quality_report = transformer.combine_quality_reports(
+                    [quality_report, transformer.get_data_quality_report(clean_chunk)]
+                )
+            
+            batch = transformer.last_batch_stats
+            transform_stats['records_in'] += batch['records_in']
+            transform_stats['records_out'] += batch['records_out']
+            transform_stats['quarantined'] += batch['quarantined']
+            transform_stats['chunks'] += 1
+            transform_stats['estimated_frame_bytes'] = max(transform_stats['estimated_frame_bytes'],
+                                                      batch['estimated_frame_bytes'])
+            quarantined = transformer.last_quarantine
+            
+            indicator_rows = indicator_state = None
+            if indicators is not None:
+                with metrics.timer('stage', stage='indicators'):
+                    indicator_rows = indicators.update(clean_chunk)
+                    # Taken now: the engine moves on with the next page while this one loads
+                    indicator_state = indicators.state_frame(indicator_rows)
+            
+            del page
+            background.submit(
+                clean_chunk, after=_page_writer(loader, metrics, quarantined, indicator_rows, indicator_state)
+            )
+    except Exception as e:
+        # The extract or transform error is the one to report; a load failure behind it is only logged
+        try:
+            background.close()
+        except Exception as close_error:
+            if close_error is not e:
+                logger.error(f"Background loader failed while stopping: {close_error}")
+        raise
+    
+    load_stats = background.close()
+    return load_stats['records'], quality_report, transform_stats, load_stats
+
+def _page_writer(loader: CryptoLoader, metrics: PipelineMetrics, quarantined: pd.DataFrame,
+                 indicator_rows: Optional[pd.DataFrame], indicator_state: Optional[pd.DataFrame]):
+    """Writes that follow a streamed page's load: its quarantined rows and indicators"""
+    
+    def write() -> None:
+        if not quarantined.empty:
+            with metrics.timer('stage', stage='quarantine'):
+                loader.save_quarantine(quarantined)
+        if indicator_rows is not None:
+            with metrics.timer('stage', stage='save_indicators'):
+                loader.save_indicators(indicator_rows, indicator_state)
+    
+    return write
 
 if __name__ == "__main__":
     result = run_etl_pipeline()
@@ -0,0 +1,231 @@
+import argparse
+import signal
+import threading
+import time
+import pandas as pd
+from typing import Dict, List, Optional
+from .extract import CryptoExtractor
+from .transform import CryptoTransformer
+from .load import CryptoLoader
+from .landing import RawLandingZone
+from .indicators import IndicatorEngine
+from .validation import DataValidator
+from .price_store import open_price_store
+from .config import (
+    ETL_COIN_LIMIT, LANDING_ENABLED, LANDING_POLL_FLUSH_SECONDS, INDICATORS_ENABLED, STORE_ENABLED,
+    STORE_SNAPSHOT_SECONDS, VALIDATION_ENABLED, POLL_INTERVAL_SECONDS, POLL_MIN_INTERVAL_SECONDS
+)
+from .metrics import PipelineMetrics
+from .logger import set_log_context, setup_logger
+
+logger = setup_logger(__name__)
+
+# Partitions are premade and expired this often (loads also create a missing month on demand)
+PARTITION_MAINTENANCE_SECONDS = 24 * 3600
+
+# Values whose change is worth a new row even when last_updated did not move
+HASH_COLUMNS = ['current_price', 'market_cap', 'rank', 'volume_24h', 'price_change_24h', 'circulating_supply']
+
+def _as_utc_naive(values: pd.Series) -> pd.Series:
+    """API strings end in Z, the database hands back naive UTC; compare them on one footing"""
+    return pd.to_datetime(values, utc=True, errors='coerce').dt.tz_localize(None)
+
+class ChangeDetector:
+    """Last seen last_updated and value hash per (crypto_id, vs_currency)"""
+
+    def __init__(self):
+        self._seen = {}
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def seed(self, versions: pd.DataFrame) -> None:
+        """Start from stored snapshots so a restart doesn't rewrite every coin (hash unknown)"""
+        keys = zip(versions['crypto_id'], versions['vs_currency'])
+        for key, updated in zip(keys, _as_utc_naive(versions['last_updated'])):
+            self._seen[key] = (updated, None)
+
+    def changes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Rows that are new coins, have a newer last_updated or changed values"""
+
+        if df.empty:
+            return df
+
+        updated = _as_utc_naive(df['last_updated'])
+        hashes = pd.util.hash_pandas_object(df[HASH_COLUMNS], index=False).to_numpy()
+
+        changed = []
+        for key, last_updated, value_hash in zip(zip(df['crypto_id'], df['vs_currency']), updated, hashes):
+            previous = self._seen.get(key)
+            changed.append(
+                previous is None
+                or previous[0] != last_updated
+                or (previous[1] is not None and previous[1] != value_hash)
+            )
+        return df[changed]
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Remember rows once they have been written"""
+
+        if df.empty:
+            return
+        updated = _as_utc_naive(df['last_updated'])
+        hashes = pd.util.hash_pandas_object(df[HASH_COLUMNS], index=False).to_numpy()
+        self._seen.update(zip(zip(df['crypto_id'], df['vs_currency']), zip(updated, hashes)))
+
+class CryptoPoller:
+    """Long-running snapshot loop that only writes coins whose data changed"""
+
+    def __init__(self, interval: float = POLL_INTERVAL_SECONDS, limit: int = ETL_COIN_LIMIT):
+        if interval < POLL_MIN_INTERVAL_SECONDS:
+            raise ValueError(f"Poll interval must be at least {POLL_MIN_INTERVAL_SECONDS} seconds")
+
+        self.interval = interval
+        self.limit = limit
+        self.metrics = PipelineMetrics(run_id=f"poller_{time.strftime('%Y%m%dT%H%M%S')}")
+        set_log_context(run_id=self.metrics.run_id)
+        self.extractor = CryptoExtractor(metrics=self.metrics)
+        self.validator = DataValidator() if VALIDATION_ENABLED else None
+        self.transformer = CryptoTransformer(validator=self.validator)
+        self.loader = CryptoLoader(metrics=self.metrics)
+        # Snapshots are landed in batches rather than as one small file per poll
+        self.landing = RawLandingZone(flush_seconds=LANDING_POLL_FLUSH_SECONDS) if LANDING_ENABLED else None
+        self.detector = ChangeDetector()
+        # A coin stuck failing validation is quarantined once, not on every poll
+        self.quarantine_detector = ChangeDetector()
+        self.indicators = None
+        self.stats = {'polls': 0, 'failed_polls': 0, 'rows_seen': 0, 'rows_written': 0}
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self, max_polls: Optional[int] = None) -> Dict:
+        """Poll every interval seconds until stop() (or max_polls); a failed poll is retried next tick"""
+
+        logger.info("="*50)
+        logger.info(f"STARTING POLLER (every {self.interval:g}s, top {self.limit} coins)")
+        logger.info("="*50)
+
+        self.loader.create_tables()
+        versions = self.loader.get_latest_versions()
+        self.detector.seed(versions)
+        if self.validator is not None:
+            self.validator.seed(versions)
+        logger.info(f"Change detector seeded with {len(self.detector)} stored coins")
+        if STORE_ENABLED:
+            self.loader.store = open_price_store(self.loader)
+        last_snapshot = time.monotonic()
+        if INDICATORS_ENABLED:
+            # Kept in memory between polls; only the state of changed coins is written back
+            self.indicators = IndicatorEngine.from_state(self.loader.get_indicator_state())
+
+        last_maintenance = None
+        next_poll = time.monotonic()
+        while not self._stop.is_set():
+            if last_maintenance is None or time.monotonic() - last_maintenance >= PARTITION_MAINTENANCE_SECONDS:
+                self._maintain_partitions()
+                last_maintenance = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.stats['failed_polls'] += 1
+                logger.error(f"Poll failed: {e}")
+
+            self._export_metrics()
+            if self.loader.store is not None and time.monotonic() - last_snapshot >= STORE_SNAPSHOT_SECONDS:
+                self._snapshot_store()
+                last_snapshot = time.monotonic()
+            if max_polls is not None and self.stats['polls'] + self.stats['failed_polls'] >= max_polls:
+                break
+
+            # Fixed schedule: a slow poll shortens the wait instead of drifting
+            next_poll += self.interval
+            self._stop.wait(max(0.0, next_poll - time.monotonic()))
+            next_poll = max(next_poll, time.monotonic())
+
+        self.extractor.close()
+        if self.landing:
+            self.landing.flush()
+        if self.loader.store is not None:
+            self._snapshot_store()
+        logger.info(
+            f"Poller stopped after {self.stats['polls']} polls: "
+            f"{self.stats['rows_written']}/{self.stats['rows_seen']} rows written"
+        )
+        return self.stats
+
+    def poll_once(self) -> int:
+        """Take one snapshot and write the changed rows; returns rows written"""
+
+        with self.metrics.timer('stage', stage='poll'):
+            raw_data = self.extractor.extract_top_coins(limit=self.limit)
+            extracted_at = pd.Timestamp.now()
+            if self.landing:
+                self.landing.write(raw_data, extracted_at)
+
+            clean_data = self.transformer.transform(raw_data, extracted_at=extracted_at)
+            changed = self.detector.changes(clean_data)
+            written = 0
+            if not changed.empty:
+                # A value change under the same last_updated revises the stored row rather than being skipped
+                written = self.loader.load_data(changed, method='upsert', update_existing=True)
+                # Only rows that reached the table count as seen; anything else is retried next poll
+                keys = pd.Series(list(zip(changed['crypto_id'], changed['vs_currency'])), index=changed.index)
+                self.detector.update(changed[keys.isin(self.loader.last_written_keys)])
+            
+            quarantined = self.quarantine_detector.changes(self.transformer.last_quarantine)
+            if not quarantined.empty:
+                self.loader.save_quarantine(quarantined)
+                self.quarantine_detector.update(quarantined)
+            
+            if self.indicators is not None and not changed.empty:
+                indicator_rows = self.indicators.update(changed)
+                self.loader.save_indicators(indicator_rows, self.indicators.state_frame(indicator_rows))
+
+        self.stats['polls'] += 1
+        self.stats['rows_seen'] += len(clean_data)
+        self.stats['rows_written'] += written
+        self.metrics.increment('rows_total', len(clean_data), stage='poll_seen')
+        self.metrics.increment('rows_total', written, stage='poll_written')
+
+        logger.info(f"Poll {self.stats['polls']}: {len(changed)}/{len(clean_data)} coins changed")
+        return written
+
+    def _maintain_partitions(self) -> None:
+        """Premake upcoming months and apply retention; a failure is retried the next day"""
+        try:
+            self.loader.ensure_partitions()
+            self.loader.apply_retention()
+        except Exception as e:
+            logger.warning(f"Partition maintenance failed: {e}")
+
+    def _snapshot_store(self) -> None:
+        try:
+            self.loader.store.snapshot()
+        except Exception as e:
+            logger.warning(f"Failed to snapshot price store: {e}")
+
+    def _export_metrics(self) -> None:
+        try:
+            self.metrics.export()
+        except Exception as e:
+            logger.warning(f"Failed to export metrics: {e}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Poll CoinGecko and ingest only changed coins")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL_SECONDS,
+                        help=f"Seconds between polls (minimum {POLL_MIN_INTERVAL_SECONDS})")
+    parser.add_argument("--limit", type=int, default=ETL_COIN_LIMIT, help="Number of top coins per poll")
+    parser.add_argument("--max-polls", type=int, help="Stop after this many polls")
+    args = parser.parse_args(argv)
+
+    poller = CryptoPoller(interval=args.interval, limit=args.limit)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: poller.stop())
+
+    stats = poller.run(max_polls=args.max_polls)
+    return 0 if stats['polls'] else 1
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,81 +1,273 @@
 from prefect import flow, task
-from prefect.task_runners import SequentialTaskRunner
-import subprocess
+from prefect.runtime import flow_run
+from prefect.task_runners import ConcurrentTaskRunner
+import math
+import threading
 import time
-from .pipeline import run_etl_pipeline
-from .logger import setup_logger
+import pandas as pd
+from typing import Dict, List, Optional
+from .extract import CryptoExtractor
+from .transform import CryptoTransformer
+from .load import CryptoLoader
+from .landing import RawLandingZone
+from .indicators import IndicatorEngine
+from .validation import DataValidator
+from .price_store import open_price_store
+from .dbt_runner import get_dbt_runner
+from .config import (
+    ETL_COIN_LIMIT, VS_CURRENCIES, COINGECKO_MAX_PER_PAGE, LANDING_ENABLED, INDICATORS_ENABLED,
+    VALIDATION_ENABLED, STORE_ENABLED
+)
+from .metrics import PipelineMetrics
+from .logger import set_log_context, setup_logger
 
 logger = setup_logger(__name__)
 
+# Components shared by the mapped tasks of one flow run (one rate limiter and session), keyed by
+# flow run id so concurrent runs in the same worker process never share an extractor or loader
+_runs = {}
+_run_lock = threading.Lock()
+
+def _components() -> Dict:
+    run_id = flow_run.id or 'local'
+    with _run_lock:
+        if run_id not in _runs:
+            metrics = PipelineMetrics()
+            set_log_context(run_id=metrics.run_id)
+            _runs[run_id] = dict(
+                metrics=metrics,
+                extractor=CryptoExtractor(metrics=metrics),
+                loader=CryptoLoader(metrics=metrics),
+                landing=RawLandingZone() if LANDING_ENABLED else None,
+                validator=DataValidator() if VALIDATION_ENABLED else None,
+                # (crypto_id, vs_currency) already claimed by a shard of this run
+                loaded_keys=set()
+            )
+        return _runs[run_id]
+
+def _release_components() -> None:
+    with _run_lock:
+        components = _runs.pop(flow_run.id or 'local', None)
+    if components is not None:
+        components['extractor'].close()
+
 @task(retries=2, retry_delay_seconds=60, log_prints=True)
-def extract_transform_load_task():
-    
-    logger.info("Starting ETL task with Prefect")
-    result = run_etl_pipeline()
-    
-    if not result['success']:
-        raise Exception(f"ETL failed: {result.get('error', 'Unknown error')}")
-    
-    logger.info(f"ETL completed: {result['records_processed']} records in {result['duration_seconds']}s")
-    return result
+def prepare_database_task() -> None:
+    """Health checks, DDL and the price store, once per run before any shard loads"""
+
+    components = _components()
+    if not components['extractor'].health_check():
+        raise Exception("CoinGecko API health check failed")
+    if not components['loader'].health_check():
+        raise Exception("Database health check failed")
+    components['loader'].create_tables()
+    if components['validator'] is not None:
+        components['validator'].seed(components['loader'].get_latest_versions())
+    if STORE_ENABLED:
+        # Every shard's committed rows are appended to it, as in run_etl_pipeline
+        with components['metrics'].timer('stage', stage='price_store'):
+            components['loader'].store = open_price_store(components['loader'])
+
+@task(log_prints=True)
+def plan_shards_task(limit: int, vs_currencies: List[str]) -> List[Dict]:
+    """One shard per /coins/markets page and quote currency"""
+
+    if limit is None or limit < 1:
+        raise ValueError(f"Coin limit must be at least 1, got {limit!r}")
+
+    per_page = min(limit, COINGECKO_MAX_PER_PAGE)
+    pages = math.ceil(limit / per_page)
+    shards = [
+        {'vs_currency': currency, 'page': page, 'per_page': per_page,
+         'limit': min(per_page, limit - (page - 1) * per_page)}
+        for currency in vs_currencies
+        for page in range(1, pages + 1)
+    ]
+    logger.info(f"Planned {len(shards)} shards ({pages} pages x {len(vs_currencies)} currencies)")
+    return shards
+
+@task(retries=2, retry_delay_seconds=30, log_prints=True)
+def extract_shard_task(shard: Dict) -> Dict:
+
+    components = _components()
+    raw = components['extractor'].extract_markets_page(shard['page'], shard['per_page'], shard['vs_currency'])
+    raw = raw.head(shard['limit'])
+    extracted_at = pd.Timestamp.now()
+    if components['landing']:
+        components['landing'].write(raw, extracted_at)
+    return {'raw': raw, 'extracted_at': extracted_at}
+
+@task(log_prints=True)
+def transform_shard_task(extracted: Dict) -> pd.DataFrame:
+    # A transformer per shard (it keeps per-batch stats on the instance); the validator is shared
+    components = _components()
+    transformer = CryptoTransformer(validator=components['validator'])
+    clean = transformer.transform(extracted['raw'], extracted_at=extracted['extracted_at'])
+    components['loader'].save_quarantine(transformer.last_quarantine)
+    return clean
+
+@task(retries=2, retry_delay_seconds=30, log_prints=True)
+def load_shard_task(clean: pd.DataFrame) -> int:
+    """Load a shard's coins not already loaded by another shard of this run
+
+    A coin that moves rank between page fetches shows up on two pages; only
+    the first shard to claim it loads it. The default upsert is idempotent,
+    so a retried shard never duplicates rows.
+    """
+
+    components = _components()
+    keys = pd.Series(list(zip(clean['crypto_id'], clean['vs_currency'])), index=clean.index)
+    with _run_lock:
+        fresh = ~keys.isin(components['loaded_keys']) & ~keys.duplicated()
+        components['loaded_keys'].update(keys[fresh])
+    if not fresh.all():
+        logger.info(f"Skipping {int((~fresh).sum())} coins already loaded from another page")
+
+    try:
+        return components['loader'].load_data(clean[fresh])
+    except Exception:
+        # Let the retry claim them again
+        with _run_lock:
+            components['loaded_keys'].difference_update(keys[fresh])
+        raise
+
+@task(retries=1, retry_delay_seconds=30, log_prints=True)
+def update_indicators_task(clean: List[pd.DataFrame]) -> int:
+    """Advance the per-coin indicators with every shard's snapshot, resuming from stored state"""
+
+    loader, metrics = _components()['loader'], _components()['metrics']
+    with metrics.timer('stage', stage='indicators'):
+        indicators = IndicatorEngine.from_state(loader.get_indicator_state())
+        indicator_rows = indicators.update(pd.concat(clean, ignore_index=True))
+        return loader.save_indicators(indicator_rows, indicators.state_frame(indicator_rows))
+
+@task(log_prints=True)
+def finalize_load_task(records: List[int]) -> Dict:
+    """Retention, stats and the price store snapshot once every shard is loaded"""
+
+    components = _components()
+    loader, metrics = components['loader'], components['metrics']
+    records_loaded = sum(records)
+    metrics.increment('rows_total', records_loaded, stage='load')
+
+    with metrics.timer('stage', stage='retention'):
+        loader.apply_retention()
+    with metrics.timer('stage', stage='get_latest_stats'):
+        db_stats = loader.get_latest_stats()
+
+    if loader.store is not None:
+        try:
+            loader.store.snapshot()
+        except Exception as e:
+            logger.warning(f"Failed to snapshot price store: {e}")
+
+    try:
+        metrics.export()
+    except Exception as e:
+        logger.warning(f"Failed to export metrics: {e}")
+
+    return {
+        'records_processed': records_loaded,
+        'database_stats': db_stats,
+        'api_stats': components['extractor'].get_request_stats(),
+        'metrics': metrics.to_dict()
+    }
 
 @task(retries=1, retry_delay_seconds=30, log_prints=True)
-def run_dbt_transformations_task():
-    
-    logger.info("Starting dbt transformations with Prefect")
-    
-    result = subprocess.run(
-        ["dbt", "run", "--select", "staging", "intermediate", "marts"], 
-        cwd="dbt", 
-        capture_output=True, 
-        text=True
+def run_dbt_transformations_task(changed_sources: List[str]):
+
+    if not changed_sources:
+        logger.info("No sources changed, skipping dbt")
+        return {"success": True, "skipped": True, "models": [], "duration_seconds": 0.0}
+
+    logger.info(f"Starting dbt transformations downstream of {', '.join(changed_sources)}")
+
+    runner = get_dbt_runner()
+    metrics = PipelineMetrics()
+    with metrics.timer('stage', stage='dbt'):
+        result = runner.run(runner.selection(changed_sources))
+
+    for model in result['models']:
+        metrics.observe('dbt_model', model['execution_seconds'], model=model['model'], status=model['status'])
+        if model['rows_affected'] is not None:
+            metrics.increment('dbt_rows_affected', model['rows_affected'], model=model['model'])
+    metrics.observe('dbt_parse', result['parse_seconds'])
+    metrics.increment('dbt_runs_total', status='success' if result['success'] else 'failed')
+    metrics.export(basename="crypto_dbt")
+
+    if not result['success']:
+        failed = [m['model'] for m in result['models'] if m['status'] not in ('success', 'skipped')]
+        logger.error(f"dbt failed: {failed}")
+        raise Exception(f"dbt transformations failed for models: {', '.join(failed)}")
+
+    duration = metrics.to_dict()['timers']['stage{stage="dbt"}']['total_seconds']
+    logger.info(
+        f"dbt transformations completed in {duration:.2f}s "
+        f"({len(result['models'])} models, {result['rows_affected']} rows)"
     )
-    
-    if result.returncode != 0:
-        logger.error(f"dbt failed: {result.stderr}")
-        raise Exception(f"dbt transformations failed: {result.stderr}")
-    
-    logger.info("dbt transformations completed")
-    return {"success": True, "output": result.stdout}
+    return {
+        "success": True,
+        "skipped": False,
+        "models": result['models'],
+        "rows_affected": result['rows_affected'],
+        "parse_seconds": result['parse_seconds'],
+        "duration_seconds": duration
+    }
 
 @flow(
     name="crypto-etl-pipeline",
     description="Complete crypto data pipeline with Prefect orchestration",
-    task_runner=SequentialTaskRunner(),
+    task_runner=ConcurrentTaskRunner(),
     log_prints=True
 )
-def crypto_prefect_flow():
-        
+def crypto_prefect_flow(limit: int = ETL_COIN_LIMIT, vs_currencies: Optional[List[str]] = None):
+
     logger.info("="*50)
     logger.info("STARTING PREFECT ORCHESTRATION CRYPTO PIPELINE")
     logger.info("="*50)
-    
+
     start_time = time.time()
-    
+
     try:
-        # Step 1: ETL Pipeline
-        etl_result = extract_transform_load_task()
-        
-        # Step 2: dbt Transformations  
-        dbt_result = run_dbt_transformations_task()
-        
+        # Step 1: ETL, one mapped extract -> transform -> load chain per page and currency
+        prepared = prepare_database_task.submit()
+        shards = plan_shards_task(limit, vs_currencies or VS_CURRENCIES)
+        raw = extract_shard_task.map(shards)
+        # Transforms wait for the DDL too: the validator is seeded there and quarantined rows are written
+        clean = transform_shard_task.map(raw, wait_for=[prepared])
+        loaded = load_shard_task.map(clean)
+        if INDICATORS_ENABLED:
+            update_indicators_task(clean, wait_for=[loaded])
+        etl_result = finalize_load_task(loaded)
+        etl_duration = time.time() - start_time
+
+        # Step 2: dbt, only downstream of the raw tables this run wrote to
+        changed_sources = ['crypto_prices', 'crypto_latest'] if etl_result['records_processed'] else []
+        dbt_result = run_dbt_transformations_task(changed_sources)
+
         # Success metrics
         duration = time.time() - start_time
-        
+
         result = {
             "success": True,
             "etl_records": etl_result['records_processed'],
+            "etl_shards": len(shards),
             "dbt_success": dbt_result['success'],
+            "dbt_skipped": dbt_result['skipped'],
+            "etl_duration": round(etl_duration, 2),
+            "dbt_duration": dbt_result['duration_seconds'],
+            "dbt_models": dbt_result['models'],
+            "etl_metrics": etl_result['metrics'],
             "total_duration": round(duration, 2)
         }
-        
+
         logger.info("="*50)
         logger.info("PREFECT PIPELINE COMPLETED")
         logger.info(f"Total duration: {duration:.2f} seconds")
         logger.info("="*50)
-        
+
         return result
-        
+
     except Exception as e:
         duration = time.time() - start_time
         logger.error("="*50)
@@ -85,6 +277,9 @@ def crypto_prefect_flow():
         logger.error("="*50)
         raise
 
+    finally:
+        _release_components()
+
 if __name__ == "__main__":
     result = crypto_prefect_flow()
-    print(f"Pipeline completed: {result}")# Updated: Mon Sep 15 13:54:14 +08 2025
+    print(f"Pipeline completed: {result}")
@@ -0,0 +1,304 @@
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from .config import STORE_DEPTH, STORE_DIR, STORE_WARM_DAYS, VS_CURRENCIES
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# crypto_prices column -> ring buffer dtype (NaN marks missing values and empty slots)
+FIELDS = {
+    'last_updated': 'float64',   # epoch seconds
+    'current_price': 'float64',
+    'market_cap': 'float32',
+    'volume_24h': 'float32',
+    'price_change_24h': 'float32',
+    'rank': 'float32'
+}
+
+EPOCH = pd.Timestamp(0, tz='UTC')
+
+META_FILE = 'meta.json'
+
+# Names the complete snapshot version directory readers should open
+CURRENT_FILE = 'CURRENT'
+
+def _epoch_seconds(values: pd.Series) -> np.ndarray:
+    times = pd.to_datetime(pd.Series(values), utc=True, errors='coerce')
+    return ((times - EPOCH) / pd.Timedelta(seconds=1)).to_numpy(dtype='float64', na_value=np.nan)
+
+class PriceStore:
+    """In-memory ring buffers of the most recent snapshots per (crypto_id, vs_currency)
+
+    Each field is one preallocated (coins x depth) NumPy array; a coin's row
+    comes from a dict lookup and its next slot from head, so appends, latest
+    values, window slices and top-N are array indexing with no database
+    round trip. Coins beyond the capacity grow the arrays (doubling).
+    """
+
+    def __init__(self, depth: int = STORE_DEPTH, capacity: int = 1024):
+        self.depth = depth
+        self._index = {}
+        self._keys = []
+        self._currencies = {}
+        self._lock = threading.Lock()
+        self._arrays = {}
+        self._allocate(capacity)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _allocate(self, capacity: int) -> None:
+        arrays = {field: np.full((capacity, self.depth), np.nan, dtype=dtype) for field, dtype in FIELDS.items()}
+        arrays['head'] = np.zeros(capacity, dtype=np.int64)
+        arrays['count'] = np.zeros(capacity, dtype=np.int64)
+        arrays['currency'] = np.full(capacity, -1, dtype=np.int32)
+
+        used = len(self._keys)
+        for name, values in self._arrays.items():
+            arrays[name][:used] = values[:used]
+        self._arrays = arrays
+
+    def _rows_for(self, crypto_ids: np.ndarray, currencies: np.ndarray) -> np.ndarray:
+        pairs = list(zip(crypto_ids, currencies))
+        new = [pair for pair in dict.fromkeys(pairs) if pair not in self._index]
+        if new:
+            needed = len(self._keys) + len(new)
+            capacity = len(self._arrays['head'])
+            if needed > capacity:
+                self._allocate(max(needed, 2 * capacity))
+            for pair in new:
+                row = len(self._keys)
+                self._index[pair] = row
+                self._keys.append(pair)
+                self._arrays['currency'][row] = self._currencies.setdefault(pair[1], len(self._currencies))
+        return np.fromiter((self._index[pair] for pair in pairs), dtype=np.int64, count=len(pairs))
+
+    def append(self, df: pd.DataFrame) -> int:
+        """Add snapshots (crypto_prices columns); rows not newer than a coin's latest are ignored"""
+
+        if df.empty:
+            return 0
+
+        frame = pd.DataFrame({
+            'crypto_id': df['crypto_id'].astype(str).to_numpy(),
+            'vs_currency': df['vs_currency'].astype(str).to_numpy(),
+            **{field: pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=dtype, na_value=np.nan)
+               for field, dtype in FIELDS.items() if field != 'last_updated' and field in df.columns},
+            'last_updated': _epoch_seconds(df['last_updated'])
+        })
+        frame = frame[frame['last_updated'].notna()].sort_values('last_updated', kind='stable')
+
+        with self._lock:
+            rows = self._rows_for(frame['crypto_id'].to_numpy(), frame['vs_currency'].to_numpy())
+            arrays = self._arrays
+
+            # Out-of-order and already stored snapshots (e.g. a warm start overlapping a load)
+            latest = arrays['last_updated'][rows, (arrays['head'][rows] - 1) % self.depth]
+            keep = ~(frame['last_updated'].to_numpy() <= latest)
+            frame, rows = frame[keep], rows[keep]
+            if frame.empty:
+                return 0
+
+            # Several snapshots of one coin are written in turn; each turn is one vectorized write
+            steps = frame.groupby(rows).cumcount().to_numpy()
+            for step in range(steps.max() + 1):
+                selected = steps == step
+                step_rows = rows[selected]
+                slots = arrays['head'][step_rows]
+                for field in FIELDS:
+                    values = frame[field].to_numpy()[selected] if field in frame.columns else np.nan
+                    arrays[field][step_rows, slots] = values
+                arrays['head'][step_rows] = (slots + 1) % self.depth
+                arrays['count'][step_rows] = np.minimum(arrays['count'][step_rows] + 1, self.depth)
+
+        return len(frame)
+
+    def newest(self) -> Optional[pd.Timestamp]:
+        """Most recent last_updated across all coins (naive UTC)"""
+
+        if not self._keys:
+            return None
+        seconds = np.nanmax(self._arrays['last_updated'][:len(self._keys)], initial=-np.inf)
+        return pd.Timestamp(seconds, unit='s') if np.isfinite(seconds) else None
+
+    def latest_value(self, crypto_id: str, field: str = 'current_price',
+                     vs_currency: str = VS_CURRENCIES[0]) -> Optional[float]:
+        """Newest value of one field for one coin, or None if the coin is not stored"""
+
+        row = self._index.get((crypto_id, vs_currency))
+        if row is None or not self._arrays['count'][row]:
+            return None
+        return float(self._arrays[field][row, (self._arrays['head'][row] - 1) % self.depth])
+
+    def latest(self, vs_currency: str = VS_CURRENCIES[0], crypto_ids: Optional[List[str]] = None) -> pd.DataFrame:
+        """Newest snapshot of every stored coin (or of crypto_ids) in vs_currency"""
+
+        with self._lock:
+            rows = self._currency_rows(vs_currency, crypto_ids)
+            return self._frame(rows, (self._arrays['head'][rows] - 1) % self.depth)
+
+    def window(self, crypto_id: str, vs_currency: str = VS_CURRENCIES[0],
+               since: Optional[pd.Timestamp] = None, points: Optional[int] = None) -> pd.DataFrame:
+        """One coin's stored snapshots, oldest first, optionally from since or the last points only"""
+
+        with self._lock:
+            row = self._index.get((crypto_id, vs_currency))
+            if row is None:
+                return self._frame(np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+
+            count = int(self._arrays['count'][row])
+            if points is not None:
+                count = min(count, points)
+            slots = (self._arrays['head'][row] - count + np.arange(count)) % self.depth
+            if since is not None:
+                times = self._arrays['last_updated'][row, slots]
+                slots = slots[times >= _epoch_seconds([since])[0]]
+            return self._frame(np.full(len(slots), row), slots)
+
+    def top_n(self, n: int, by: str = 'market_cap', vs_currency: str = VS_CURRENCIES[0],
+              ascending: bool = False) -> pd.DataFrame:
+        """n coins with the largest (or smallest) latest value of by"""
+
+        with self._lock:
+            rows = self._currency_rows(vs_currency)
+            slots = (self._arrays['head'][rows] - 1) % self.depth
+            values = self._arrays[by][rows, slots].astype('float64')
+            values = np.where(np.isnan(values), np.inf if ascending else -np.inf, values)
+            keys = values if ascending else -values
+
+            # Partial selection first; only the n winners are sorted
+            if len(keys) > n:
+                selected = np.argpartition(keys, n)[:n]
+            else:
+                selected = np.arange(len(keys))
+            selected = selected[np.argsort(keys[selected], kind='stable')]
+            return self._frame(rows[selected], slots[selected])
+
+    def stats(self, vs_currency: str = VS_CURRENCIES[0]) -> Dict:
+        """get_latest_stats from memory: coins whose newest snapshot is from the latest date"""
+
+        latest = self.latest(vs_currency)
+        if latest.empty:
+            return {}
+        dates = latest['last_updated'].dt.date
+        current = latest[dates == dates.max()]
+        return {
+            'total_records': len(current),
+            'unique_cryptos': current['crypto_id'].nunique(),
+            'latest_date': dates.max(),
+            'avg_price': current['current_price'].mean(),
+            'total_market_cap_billions': current['market_cap'].sum() / 1e9
+        }
+
+    def _currency_rows(self, vs_currency: str, crypto_ids: Optional[List[str]] = None) -> np.ndarray:
+        if crypto_ids is not None:
+            rows = [self._index.get((crypto_id, vs_currency)) for crypto_id in crypto_ids]
+            rows = np.array([row for row in rows if row is not None], dtype=np.int64)
+        else:
+            code = self._currencies.get(vs_currency, -2)
+            rows = np.flatnonzero(self._arrays['currency'][:len(self._keys)] == code)
+        return rows[self._arrays['count'][rows] > 0]
+
+    def _frame(self, rows: np.ndarray, slots: np.ndarray) -> pd.DataFrame:
+        seconds = self._arrays['last_updated'][rows, slots]
+        # int64 min is NaT; a plain view avoids pd.to_datetime on the query path
+        millis = np.where(np.isnan(seconds), np.iinfo(np.int64).min, np.round(seconds * 1000)).astype(np.int64)
+        return pd.DataFrame({
+            'crypto_id': [self._keys[row][0] for row in rows],
+            'vs_currency': [self._keys[row][1] for row in rows],
+            'last_updated': millis.view('datetime64[ms]'),
+            **{field: self._arrays[field][rows, slots] for field in FIELDS if field != 'last_updated'}
+        })
+
+    def snapshot(self, directory: str = STORE_DIR) -> str:
+        """Write the store as a new version directory of .npy files plus key metadata
+
+        Readers find the current version through CURRENT, which is replaced
+        atomically once the version is complete, so they never see a missing
+        or mixed snapshot. The previous version is kept for readers that
+        resolved CURRENT just before the switch; older ones are removed.
+        """
+
+        os.makedirs(directory, exist_ok=True)
+        version = f"v{time.time_ns()}"
+        version_dir = os.path.join(directory, version)
+        os.makedirs(version_dir)
+
+        with self._lock:
+            used = len(self._keys)
+            for name, values in self._arrays.items():
+                np.save(os.path.join(version_dir, f"{name}.npy"), values[:used])
+            meta = {'depth': self.depth, 'keys': self._keys, 'currencies': list(self._currencies)}
+
+        with open(os.path.join(version_dir, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+        previous = _current_version(directory)
+        pointer_tmp = os.path.join(directory, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+        with open(pointer_tmp, 'w') as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(directory, CURRENT_FILE))
+
+        for name in os.listdir(directory):
+            if name.startswith('v') and name not in (version, previous):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+        logger.debug(f"Snapshotted {used} coins to {version_dir}")
+        return version_dir
+
+    @classmethod
+    def open(cls, directory: str = STORE_DIR) -> Optional['PriceStore']:
+        """Store memory-mapped from the current snapshot (copy-on-write, pages load on first touch), or None"""
+
+        version = _current_version(directory)
+        meta_path = os.path.join(directory, version or '', META_FILE)
+        if version is None or not os.path.exists(meta_path):
+            return None
+        version_dir = os.path.dirname(meta_path)
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        store = cls(depth=meta['depth'], capacity=0)
+        store._arrays = {
+            name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='c')
+            for name in (*FIELDS, 'head', 'count', 'currency')
+        }
+        store._keys = [tuple(key) for key in meta['keys']]
+        store._index = {key: row for row, key in enumerate(store._keys)}
+        store._currencies = {currency: code for code, currency in enumerate(meta['currencies'])}
+
+        logger.info(f"Price store opened from {version_dir} ({len(store)} coins)")
+        return store
+
+def _current_version(directory: str) -> Optional[str]:
+    """Snapshot version CURRENT points at, or None before the first snapshot"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def open_price_store(loader, directory: str = STORE_DIR, warm_days: int = STORE_WARM_DAYS) -> PriceStore:
+    """Store from the last snapshot (or empty), caught up from crypto_prices
+
+    Only rows newer than the snapshot are read back, so a restart with a
+    recent snapshot costs one small query; without one, the last warm_days
+    of history are loaded.
+    """
+
+    store = PriceStore.open(directory) or PriceStore()
+    since = pd.Timestamp.now(tz='UTC').tz_localize(None) - pd.Timedelta(days=warm_days)
+    newest = store.newest()
+    if newest is not None:
+        since = max(since, newest)
+
+    appended = sum(store.append(chunk) for chunk in loader.iter_recent_prices(since.to_pydatetime()))
+    logger.info(f"Price store warm: {len(store)} coins ({appended} snapshots read since {since:%Y-%m-%d %H:%M})")
+    return store
@@ -1,51 +1,178 @@
+import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, List, Optional, Union
+from .validation import DataValidator
 from .logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Price category bins: [0, 1) Low, [1, 100) Medium, [100, inf) High
+PRICE_BINS = [-np.inf, 1, 100, np.inf]
+PRICE_LABELS = ["Low", "Medium", "High"]
+
+# Raw API columns used downstream and their crypto_prices names
+RAW_COLUMN_MAP = {
+    'id': 'crypto_id',
+    'symbol': 'symbol', 
+    'name': 'name',
+    'current_price': 'current_price',
+    'market_cap': 'market_cap',
+    'market_cap_rank': 'rank',
+    'total_volume': 'volume_24h',
+    'price_change_percentage_24h': 'price_change_24h',
+    'circulating_supply': 'circulating_supply',
+    'last_updated': 'last_updated',
+    'vs_currency': 'vs_currency'
+}
+
+# Frames without a quote currency (history landed before multi-currency support) are USD
+DEFAULT_VS_CURRENCY = 'usd'
+
+# Compact dtypes; current_price stays float64 to keep DECIMAL(20,8) precision
+COLUMN_DTYPES = {
+    'symbol': 'category',
+    'name': 'category',
+    'vs_currency': 'category',
+    'current_price': 'float64',
+    'market_cap': 'Int64',
+    'rank': 'Int32',
+    'volume_24h': 'Int64',
+    'price_change_24h': 'float32',
+    'circulating_supply': 'Int64'
+}
+
 class CryptoTransformer:
-    """Crypto data transformation and data cleaning"""
+    """Crypto data transformation and data cleaning
+    
+    With a validator, rows failing validation are kept in last_quarantine
+    (with a quarantine_reason) for the loader instead of being dropped.
+    """
     
-    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
-                
+    def __init__(self, validator: Optional[DataValidator] = None):
+        self.validator = validator
+        self.last_batch_stats = {}
+        self.last_quarantine = pd.DataFrame()
+    
+    def transform(self, df: pd.DataFrame,
+                  extracted_at: Optional[Union[pd.Timestamp, pd.Series]] = None) -> pd.DataFrame:
+        """Select, clean and enrich a /coins/markets frame
+        
+        extracted_at defaults to now; pass the extraction time (a timestamp, or a
+        Series aligned with df when reprocessing landed files).
+        """
+        
         logger.info(f"Data transformation of {len(df)} records")
         
         try:
+            input_bytes = int(df.memory_usage(deep=True).sum())
+            
             # Columns selection and rename
-            df_clean = self._select_columns(df)
+            df_renamed = self._rename_columns(df)
+            df_clean = self._coerce_dtypes(df_renamed)
+            selected_bytes = int(df_clean.memory_usage(deep=True).sum())
             
-            # Clean data
-            df_clean = self._clean_data(df_clean)
+            # Validate (quarantine) or clean (drop)
+            if self.validator is not None:
+                df_clean, quarantined = self.validator.validate(df_clean, original=df_renamed)
+                self.last_quarantine = self._add_calculated_fields(quarantined, extracted_at=extracted_at)
+            else:
+                df_clean = self._clean_data(df_clean)
+            del df_renamed
             
             # Add calculated fields
-            df_clean = self._add_calculated_fields(df_clean)
+            df_clean = self._add_calculated_fields(df_clean, extracted_at=extracted_at)
+            output_bytes = int(df_clean.memory_usage(deep=True).sum())
+            
+            # Estimated from frame sizes, not measured: the raw frame stays alive for the
+            # whole batch alongside the largest derived frame (peak RSS is in the benchmarks)
+            self.last_batch_stats = {
+                'records_in': len(df),
+                'records_out': len(df_clean),
+                'input_bytes': input_bytes,
+                'output_bytes': output_bytes,
+                'estimated_frame_bytes': input_bytes + max(selected_bytes, output_bytes),
+                'quarantined': len(self.last_quarantine) if self.validator is not None else 0
+            }
             
-            logger.info(f"Transformation completed: {len(df_clean)} records ready")
+            logger.info(
+                f"Transformation completed: {len(df_clean)} records ready "
+                f"(frames ~{self.last_batch_stats['estimated_frame_bytes'] / 1e6:.1f} MB)"
+            )
             return df_clean
             
         except Exception as e:
             logger.error(f"Transformation failed: {e}")
             raise
     
+    def transform_market_chart(self, chart: pd.DataFrame, coin: Dict,
+                               vs_currency: str = DEFAULT_VS_CURRENCY) -> pd.DataFrame:
+        """Normalise a /market_chart/range history into the crypto_prices schema
+        
+        Each point becomes a snapshot extracted at its own timestamp; the 24h
+        change is taken against the point nearest to 24 hours earlier.
+        """
+        
+        if chart.empty:
+            return pd.DataFrame()
+        
+        chart = chart.sort_values('timestamp').reset_index(drop=True)
+        
+        # Subtracting a Timedelta can change the datetime unit; merge_asof needs both keys in the same one
+        lookup = (chart['timestamp'] - pd.Timedelta(hours=24)).astype(chart['timestamp'].dtype)
+        lookup = pd.DataFrame({'lookup': lookup})
+        reference = chart[['timestamp', 'price']].rename(columns={'timestamp': 'lookup', 'price': 'price_24h_ago'})
+        previous = pd.merge_asof(lookup, reference, on='lookup', direction='nearest', tolerance=pd.Timedelta(hours=2))
+        
+        raw = pd.DataFrame({
+            'id': coin['id'],
+            'symbol': coin['symbol'],
+            'name': coin['name'],
+            'current_price': chart['price'],
+            'market_cap': chart['market_cap'],
+            'market_cap_rank': None,
+            'total_volume': chart['total_volume'],
+            'price_change_percentage_24h': (chart['price'] / previous['price_24h_ago'] - 1) * 100,
+            'circulating_supply': None,
+            'last_updated': chart['timestamp'],
+            'vs_currency': vs_currency
+        })
+        
+        df_clean = self._select_columns(raw)
+        df_clean = self._clean_data(df_clean)
+        return self._add_calculated_fields(df_clean, extracted_at=df_clean['last_updated'])
+    
     def _select_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Columns selection and rename for database"""
-        
-        columns_map = {
-            'id': 'crypto_id',
-            'symbol': 'symbol', 
-            'name': 'name',
-            'current_price': 'current_price',
-            'market_cap': 'market_cap',
-            'market_cap_rank': 'rank',
-            'total_volume': 'volume_24h',
-            'price_change_percentage_24h': 'price_change_24h',
-            'circulating_supply': 'circulating_supply',
-            'last_updated': 'last_updated'
-        }
+        """Columns selection and rename for database, with compact dtypes"""
+        return self._coerce_dtypes(self._rename_columns(df))
+    
+    def _rename_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Raw API columns renamed to crypto_prices names, values untouched"""
         
-        df_selected = df[list(columns_map.keys())].copy()
-        df_selected = df_selected.rename(columns=columns_map)
+        if 'vs_currency' in df.columns:
+            df_selected = df[list(RAW_COLUMN_MAP.keys())].rename(columns=RAW_COLUMN_MAP)
+            df_selected['vs_currency'] = df_selected['vs_currency'].fillna(DEFAULT_VS_CURRENCY)
+        else:
+            columns = [column for column in RAW_COLUMN_MAP if column != 'vs_currency']
+            df_selected = df[columns].rename(columns=RAW_COLUMN_MAP)
+            df_selected['vs_currency'] = DEFAULT_VS_CURRENCY
+        return df_selected
+    
+    def _coerce_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Compact dtypes (rounded first so fractional supplies fit integer columns)
+        
+        Values that don't parse or don't fit their integer column become
+        missing; the validator compares against the renamed frame to report
+        them as type or range failures.
+        """
+        
+        df_selected = df.copy(deep=False)
+        for column, dtype in COLUMN_DTYPES.items():
+            values = pd.to_numeric(df_selected[column], errors='coerce') if dtype != 'category' else df_selected[column]
+            if dtype.startswith('Int'):
+                # One coin reporting 1e20 must not fail the cast (and the batch)
+                limit = np.iinfo(dtype.lower()).max
+                values = values.round().astype('float64').where(lambda v: v.abs() < limit)
+            df_selected[column] = values.astype(dtype)
         
         return df_selected
     
@@ -54,12 +181,12 @@ class CryptoTransformer:
         
         initial_count = len(df)
         
-        # Remove records with missing critical data
-        df_clean = df.dropna(subset=['current_price', 'market_cap'])
-        
-        # Remove negative prices (data quality issue)
-        df_clean = df_clean[df_clean['current_price'] > 0]
-        df_clean = df_clean[df_clean['market_cap'] > 0]
+        # Remove records with missing, zero or negative price/market cap in one pass
+        # (comparisons against NA evaluate to NA, which fillna turns into a drop), and
+        # records without last_updated, which have no natural key to load under
+        valid = ((df['current_price'] > 0) & (df['market_cap'] > 0)).fillna(False).to_numpy(dtype=bool)
+        valid &= df['last_updated'].notna().to_numpy()
+        df_clean = df[valid]
         
         cleaned_count = len(df_clean)
         removed_count = initial_count - cleaned_count
@@ -69,39 +196,61 @@ class CryptoTransformer:
         
         return df_clean
     
-    def _add_calculated_fields(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _add_calculated_fields(self, df: pd.DataFrame,
+                               extracted_at: Optional[Union[pd.Timestamp, pd.Series]] = None) -> pd.DataFrame:
         """Add calculated fields"""
         
+        df = df.copy()
+        
         # Price category
-        df['price_category'] = df['current_price'].apply(self._categorize_price)
+        df['price_category'] = pd.cut(df['current_price'], bins=PRICE_BINS, labels=PRICE_LABELS, right=False)
         
         # Market cap in billions
-        df['market_cap_billions'] = df['market_cap'] / 1e9
+        df['market_cap_billions'] = (df['market_cap'].to_numpy(dtype='float64', na_value=np.nan) / 1e9).astype('float32')
         
-        # Processing timestamp
-        df['extracted_at'] = pd.Timestamp.now()
-        df['extracted_date'] = pd.Timestamp.now().date()
+        # Processing timestamp (historical snapshots keep their own time)
+        if extracted_at is None:
+            now = pd.Timestamp.now()
+            df['extracted_at'] = now
+            df['extracted_date'] = now.date()
+        else:
+            df['extracted_at'] = pd.to_datetime(extracted_at)
+            df['extracted_date'] = df['extracted_at'].dt.date
         
         return df
     
-    def _categorize_price(self, price: float) -> str:
-        """Categorize price into bins"""
-        if price < 1:
-            return "Low"
-        elif price < 100:
-            return "Medium"
-        else:
-            return "High"
-    
     def get_data_quality_report(self, df: pd.DataFrame) -> Dict:
         """Data quality report"""
         return {
             'total_records': len(df),
             'null_prices': df['current_price'].isna().sum(),
             'null_market_caps': df['market_cap'].isna().sum(),
-            'price_categories': df['price_category'].value_counts().to_dict(),
+            'price_categories': df['price_category'].value_counts().loc[lambda counts: counts > 0].to_dict(),
             'date_range': {
                 'min': str(df['last_updated'].min()),
                 'max': str(df['last_updated'].max())
             }
-        }# Updated: Mon Sep 15 13:54:14 +08 2025
+        }
+    
+    def combine_quality_reports(self, reports: List[Dict]) -> Dict:
+        """Merge per-chunk data quality reports into one batch report"""
+        
+        categories = {}
+        for report in reports:
+            for category, count in report['price_categories'].items():
+                categories[category] = categories.get(category, 0) + count
+        
+        date_mins = [r['date_range']['min'] for r in reports if r['total_records']]
+        date_maxs = [r['date_range']['max'] for r in reports if r['total_records']]
+        
+        return {
+            'total_records': sum(r['total_records'] for r in reports),
+            'null_prices': sum(r['null_prices'] for r in reports),
+            'null_market_caps': sum(r['null_market_caps'] for r in reports),
+            'price_categories': categories,
+            'date_range': {
+                'min': min(date_mins) if date_mins else 'nan',
+                'max': max(date_maxs) if date_maxs else 'nan'
+            }
+        }
+# Updated: Mon Sep 15 13:54:14 +08 2025
@@ -0,0 +1,211 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from .config import VALIDATION_MAX_PRICE_JUMP, VALIDATION_MARKET_CAP_ZSCORE
+from .logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Declarative schema for transformed crypto_prices rows, mirroring the table's types and constraints
+VALIDATION_SCHEMA = {
+    'crypto_id': {'type': 'string', 'nullable': False, 'max_length': 50},
+    'symbol': {'type': 'string', 'nullable': False, 'max_length': 10},
+    'name': {'type': 'string', 'nullable': False, 'max_length': 100},
+    'vs_currency': {'type': 'string', 'nullable': False, 'max_length': 10},
+    'current_price': {'type': 'numeric', 'nullable': False, 'min': 0, 'min_exclusive': True, 'max': 1e12},
+    'market_cap': {'type': 'numeric', 'nullable': False, 'min': 0, 'min_exclusive': True, 'max': 1e17},
+    'rank': {'type': 'numeric', 'min': 1, 'max': 2**31 - 1},
+    'volume_24h': {'type': 'numeric', 'min': 0, 'max': 1e17},
+    'price_change_24h': {'type': 'numeric', 'min': -100, 'max': 999999},
+    'circulating_supply': {'type': 'numeric', 'min': 0, 'max': 1e17},
+    # Part of the natural key: without it a retried snapshot can't be recognised
+    'last_updated': {'type': 'datetime', 'nullable': False}
+}
+
+# Coins needed in a batch before its market cap moves are z-scored
+ZSCORE_MIN_COINS = 20
+
+# Floor for the robust spread of log market cap changes (1%), so a flat market doesn't flag every tick
+ZSCORE_MIN_SCALE = 0.01
+
+class DataValidator:
+    """Vectorized checks of a transformed batch; failing rows are returned for quarantine
+
+    Schema checks (types, nulls, ranges, lengths), crypto_id uniqueness per
+    snapshot, and two checks against each coin's previous accepted snapshot:
+    a price jump beyond max_price_jump x (either way), and a robust z-score of
+    the log market cap change across the batch. Every check is one array
+    operation over the batch; only failing rows are touched row by row.
+
+    A jump confirmed by the coin's next snapshot (close to the quarantined
+    price) is accepted, so a genuine repricing is quarantined once, not forever.
+    """
+
+    def __init__(self, schema: Dict = VALIDATION_SCHEMA, max_price_jump: float = VALIDATION_MAX_PRICE_JUMP,
+                 market_cap_zscore: float = VALIDATION_MARKET_CAP_ZSCORE):
+        self.schema = schema
+        self.max_log_jump = np.log(max_price_jump)
+        self.market_cap_zscore = market_cap_zscore
+        # Per quote currency: crypto_id index and previous price/market cap/pending price arrays
+        self._previous = {}
+        self._lock = threading.Lock()
+        self.last_report = {}
+
+    def seed(self, latest: pd.DataFrame) -> None:
+        """Previous snapshots from stored data (crypto_latest), so the first batch is checked too"""
+
+        if latest.empty:
+            return
+        with self._lock:
+            self._remember(latest, np.ones(len(latest), dtype=bool), np.zeros(len(latest), dtype=bool))
+
+    def validate(self, df: pd.DataFrame,
+                 original: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Split a batch into (valid, quarantined); quarantined rows get a quarantine_reason
+
+        original is the same rows before dtype coercion. Numeric checks use
+        its values: one that doesn't parse failed its type check, and one
+        too large for its integer column fails its range check.
+        """
+
+        start = time.perf_counter()
+        checks = {}
+        if df.empty:
+            self.last_report = {'rows_checked': 0, 'rows_quarantined': 0, 'failures': {}, 'duration_ms': 0.0}
+            return df, df.assign(quarantine_reason=pd.Series(dtype='object'))
+
+        for column, rule in self.schema.items():
+            values = df[column]
+            missing = values.isna().to_numpy()
+
+            if rule['type'] == 'numeric':
+                # Checked on the values as sent: integer columns lose what doesn't fit their dtype
+                numbers = values.to_numpy(dtype='float64', na_value=np.nan)
+                if original is not None and column in original.columns:
+                    sent = original[column]
+                    numbers = pd.to_numeric(sent, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+                    missing = np.isnan(numbers)
+                    checks[f"type:{column}"] = missing & sent.notna().to_numpy()
+            elif rule['type'] == 'datetime':
+                # Timestamps stay as the API sent them; they only have to parse
+                parsed = pd.to_datetime(values, utc=True, errors='coerce', format='ISO8601')
+                checks[f"type:{column}"] = parsed.isna().to_numpy() & ~missing
+            if not rule.get('nullable', True):
+                checks[f"null:{column}"] = missing
+            if rule['type'] == 'numeric':
+                out_of_range = np.zeros(len(df), dtype=bool)
+                if 'min' in rule:
+                    out_of_range |= numbers <= rule['min'] if rule.get('min_exclusive') else numbers < rule['min']
+                if 'max' in rule:
+                    out_of_range |= numbers > rule['max']
+                checks[f"range:{column}"] = out_of_range
+            if 'max_length' in rule:
+                # .str on a categorical measures each category once
+                strings = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('string')
+                too_long = strings.str.len() > rule['max_length']
+                checks[f"length:{column}"] = too_long.fillna(False).to_numpy(dtype=bool)
+
+        checks['duplicate:crypto_id'] = df.duplicated(['crypto_id', 'vs_currency'], keep='first').to_numpy()
+
+        with self._lock:
+            static_ok = ~np.logical_or.reduce(list(checks.values()))
+            jump, zscore = self._previous_snapshot_checks(df)
+            checks['price_jump'] = jump & static_ok
+            checks['market_cap_zscore'] = zscore & static_ok
+
+            failures = np.column_stack(list(checks.values()))
+            failed = failures.any(axis=1)
+            # Jumps (usually with their market cap) become pending prices; other failures leave history untouched
+            self._remember(df, ~failed, checks['price_jump'])
+
+        names = np.array(list(checks), dtype=object)
+        valid = df[~failed]
+        quarantined = df[failed].assign(
+            quarantine_reason=[','.join(names[row]) for row in failures[failed]]
+        )
+
+        self.last_report = {
+            'rows_checked': len(df),
+            'rows_quarantined': int(failed.sum()),
+            'failures': {str(name): int(count) for name, count in zip(names, failures.sum(axis=0)) if count},
+            'duration_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
+        if len(quarantined):
+            logger.warning(f"Quarantined {len(quarantined)} of {len(df)} records: {self.last_report['failures']}")
+        return valid, quarantined
+
+    def _previous_snapshot_checks(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Price jump and market cap z-score flags against each coin's previous accepted snapshot"""
+
+        price = df['current_price'].to_numpy(dtype='float64', na_value=np.nan)
+        market_cap = df['market_cap'].to_numpy(dtype='float64', na_value=np.nan)
+        previous_price = np.full(len(df), np.nan)
+        previous_cap = np.full(len(df), np.nan)
+        pending = np.full(len(df), np.nan)
+
+        currencies = df['vs_currency'].astype(str).to_numpy()
+        unique_currencies = pd.unique(currencies)
+        for currency in unique_currencies:
+            state = self._previous.get(currency)
+            if state is None:
+                continue
+            rows = np.arange(len(df)) if len(unique_currencies) == 1 else np.flatnonzero(currencies == currency)
+            positions = state['index'].get_indexer(df['crypto_id'].to_numpy()[rows])
+            known = positions >= 0
+            previous_price[rows[known]] = state['price'][positions[known]]
+            previous_cap[rows[known]] = state['market_cap'][positions[known]]
+            pending[rows[known]] = state['pending'][positions[known]]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_jump = np.abs(np.log(price / previous_price))
+            confirmed = np.abs(np.log(price / pending)) <= self.max_log_jump
+            jump = (log_jump > self.max_log_jump) & ~confirmed
+
+            cap_change = np.log(market_cap / previous_cap)
+        comparable = np.isfinite(cap_change)
+        zscore = np.zeros(len(df), dtype=bool)
+        if comparable.sum() >= ZSCORE_MIN_COINS:
+            changes = cap_change[comparable]
+            median = np.median(changes)
+            scale = max(1.4826 * np.median(np.abs(changes - median)), ZSCORE_MIN_SCALE)
+            zscore[comparable] = np.abs(changes - median) / scale > self.market_cap_zscore
+            # A confirmed repricing moves the market cap with it
+            zscore &= ~confirmed
+        return jump, zscore
+
+    def _remember(self, df: pd.DataFrame, accepted: np.ndarray, pending: np.ndarray) -> None:
+        """Accepted rows become the previous snapshot; jumps are held as pending prices"""
+
+        update = accepted | pending
+        if not update.any():
+            return
+
+        frame = df[update]
+        price = frame['current_price'].to_numpy(dtype='float64', na_value=np.nan)
+        market_cap = frame['market_cap'].to_numpy(dtype='float64', na_value=np.nan)
+        accepted = accepted[update]
+
+        currencies = frame['vs_currency'].astype(str).to_numpy()
+        for currency in pd.unique(currencies):
+            rows = np.flatnonzero(currencies == currency)
+            ids = frame['crypto_id'].to_numpy()[rows]
+            state = self._previous.setdefault(currency, {
+                'index': pd.Index([], dtype=object), 'price': np.empty(0), 'market_cap': np.empty(0), 'pending': np.empty(0)
+            })
+
+            positions = state['index'].get_indexer(ids)
+            new = positions < 0
+            if new.any():
+                new_ids = pd.unique(ids[new])
+                state['index'] = state['index'].append(pd.Index(new_ids, dtype=object))
+                for name in ('price', 'market_cap', 'pending'):
+                    state[name] = np.concatenate([state[name], np.full(len(new_ids), np.nan)])
+                positions = state['index'].get_indexer(ids)
+
+            kept = accepted[rows]
+            state['price'][positions[kept]] = price[rows][kept]
+            state['market_cap'][positions[kept]] = market_cap[rows][kept]
+            state['pending'][positions[kept]] = np.nan
+            state['pending'][positions[~kept]] = price[rows][~kept]
@@ -0,0 +1,102 @@
+import functools
+import json
+import tempfile
+from datetime import datetime
+from unittest import mock
+from benchmarks.fake_coingecko import FakeCoinGeckoServer
+from etl.backfill import BackfillCheckpoint, run_backfill
+from etl.extract import CryptoExtractor
+from etl.logger import setup_logger
+
+logger = setup_logger("test_backfill")
+
+class RecordingLoader:
+    """CryptoLoader stand-in recording loaded coins, failing the coins in fail_coins"""
+    
+    def __init__(self, fail_coins=()):
+        self.fail_coins = set(fail_coins)
+        self.loaded = []
+        self.partitions = []
+    
+    def create_tables(self):
+        pass
+    
+    def ensure_partitions(self, start=None, end=None):
+        self.partitions.append((start, end))
+    
+    def load_data(self, df, ensure_partitions=True):
+        assert not ensure_partitions
+        coin_id = df['crypto_id'].iloc[0]
+        if coin_id in self.fail_coins:
+            raise RuntimeError(f"{coin_id} load failed")
+        # Points a day into the window have a 24h change
+        assert df['price_change_24h'].notna().any()
+        self.loaded.append(coin_id)
+        return len(df)
+
+def backfill(server, directory, loader, start, end=None):
+    def extractor(workers=None):
+        instance = CryptoExtractor(workers=2, calls_per_minute=0, cache_mode='off')
+        instance.base_url = server.base_url
+        return instance
+    
+    with mock.patch('etl.backfill.CryptoExtractor', extractor), \
+            mock.patch('etl.backfill.CryptoLoader', lambda: loader), \
+            mock.patch('etl.backfill.BackfillCheckpoint', functools.partial(BackfillCheckpoint, directory=directory)):
+        return run_backfill(start, end, top=5)
+
+try:
+    logger.info("Testing backfill checkpoints and resume...")
+    
+    start = datetime(2025, 9, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        # Progress survives a restart; only coins marked done are skipped
+        checkpoint = BackfillCheckpoint(start, datetime(2025, 9, 3), directory=directory)
+        checkpoint.mark('bitcoin', 'done', records=48)
+        checkpoint.mark('ethereum', 'failed', error="timeout")
+        reopened = BackfillCheckpoint(start, datetime(2025, 9, 3), directory=directory)
+        assert reopened.is_done('bitcoin') and not reopened.is_done('ethereum')
+        assert reopened.coins['ethereum']['error'] == "timeout"
+        assert not BackfillCheckpoint(start, datetime(2025, 9, 4), directory=directory).coins
+        logger.info("✓ Checkpoint persists per-coin status for its range")
+        
+        # Without an end, the first run's resolved end is kept for resumes on later days
+        with mock.patch('etl.backfill._today', return_value=datetime(2025, 9, 3)):
+            open_ended = BackfillCheckpoint(start, directory=directory)
+            open_ended.mark('bitcoin', 'done')
+        assert open_ended.path.endswith("backfill_202509010000_open.json") and open_ended.end == datetime(2025, 9, 3)
+        with mock.patch('etl.backfill._today', return_value=datetime(2025, 9, 5)):
+            resumed = BackfillCheckpoint(start, directory=directory)
+            assert resumed.end == datetime(2025, 9, 3) and resumed.is_done('bitcoin')
+            resumed.finish(complete=True)
+            fresh = BackfillCheckpoint(start, directory=directory)
+            assert fresh.end == datetime(2025, 9, 5) and not fresh.coins
+        logger.info("✓ Open-ended checkpoint keeps its end until the window completes")
+    
+    with FakeCoinGeckoServer(coins=20) as server, tempfile.TemporaryDirectory() as directory:
+        # A failed coin is recorded and the run reports failure
+        loader = RecordingLoader(fail_coins=['coin-3'])
+        with mock.patch('etl.backfill._today', return_value=datetime(2025, 9, 3)):
+            result = backfill(server, directory, loader, start)
+        assert not result['success'] and result['coins_failed'] == ['coin-3']
+        assert result['coins_total'] == 5 and len(loader.loaded) == 4 and result['records_processed'] > 0
+        assert loader.partitions == [(start.date(), datetime(2025, 9, 3).date())]
+        with open(result['checkpoint']) as f:
+            state = json.load(f)
+        assert state['end'] == "2025-09-03T00:00:00" and not state['complete']
+        assert state['coins']['coin-3']['status'] == 'failed'
+        logger.info("✓ Backfill loads each coin and checkpoints failures")
+        
+        # Rerun a day later without --end: only the failed coin, over the original window
+        loader = RecordingLoader()
+        with mock.patch('etl.backfill._today', return_value=datetime(2025, 9, 4)):
+            result = backfill(server, directory, loader, start)
+        assert result['success'] and loader.loaded == ['coin-3'] and result['coins_backfilled'] == 1
+        assert loader.partitions == [(start.date(), datetime(2025, 9, 3).date())]
+        with open(result['checkpoint']) as f:
+            assert json.load(f)['complete']
+        logger.info("✓ Resume retries only unfinished coins over the stored window")
+
+except Exception as e:
+    logger.error(f"✗ Backfill test failed: {e!r}")
+    exit(1)
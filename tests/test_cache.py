@@ -0,0 +1,36 @@
+import tempfile
+from etl.cache import ResponseCache
+from etl.logger import setup_logger
+
+logger = setup_logger("test_cache")
+
+try:
+    logger.info("Testing API response cache...")
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(directory=cache_dir, ttl_seconds=60, max_bytes=10_000)
+        params = {"vs_currency": "usd", "page": 1}
+        payload = [{"id": "bitcoin", "current_price": 60000.0}]
+        
+        # Record and read back (param order must not matter)
+        cache.put("/coins/markets", payload, params)
+        assert cache.get("/coins/markets", {"page": 1, "vs_currency": "usd"}) == payload
+        assert cache.get("/coins/markets", {"vs_currency": "usd", "page": 2}) is None
+        logger.info("✓ Record and lookup by endpoint and params")
+        
+        # Expired entries are still served when replaying
+        expired = ResponseCache(directory=cache_dir, ttl_seconds=-1)
+        assert expired.get("/coins/markets", params) is None
+        assert expired.get("/coins/markets", params, ignore_ttl=True) == payload
+        logger.info("✓ TTL expiry and replay")
+        
+        # Size bound evicts least recently used entries
+        for page in range(2, 100):
+            cache.put("/coins/markets", payload * 10, {"page": page})
+        assert cache.get("/coins/markets", {"page": 99}) is not None
+        assert cache.get("/coins/markets", params) is None
+        logger.info("✓ LRU eviction under size bound")
+    
+except Exception as e:
+    logger.error(f"✗ Cache test failed: {e!r}")
+    exit(1)
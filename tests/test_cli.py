@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+from etl.logger import setup_logger
+
+logger = setup_logger("test_cli")
+
+# Cold-start budget for `python -m etl --help` style invocations (import of etl.cli)
+IMPORT_BUDGET_SECONDS = 0.25
+HEAVY_MODULES = ['pandas', 'numpy', 'sqlalchemy', 'requests', 'prefect', 'dbt', 'pyarrow']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import etl.cli
+etl.cli.build_parser()
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'modules': sorted({m.split('.')[0] for m in sys.modules})}))
+"""
+
+try:
+    logger.info("Testing CLI import budget...")
+    
+    # Fresh interpreter so nothing imported by this test leaks into the measurement
+    completed = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    probe = json.loads(completed.stdout.strip().splitlines()[-1])
+    
+    loaded = [module for module in HEAVY_MODULES if module in probe['modules']]
+    assert not loaded, f"etl.cli imports heavy dependencies eagerly: {loaded}"
+    logger.info("✓ No heavy dependencies imported by the CLI entry point")
+    
+    assert probe['seconds'] < IMPORT_BUDGET_SECONDS, \
+        f"etl.cli import took {probe['seconds']:.3f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+    logger.info(f"✓ CLI import in {probe['seconds'] * 1000:.1f} ms")
+    
+    # Subcommand help must not need the heavy modules either
+    completed = subprocess.run([sys.executable, "-m", "etl", "health", "--help"], capture_output=True, text=True)
+    assert completed.returncode == 0 and "--api-only" in completed.stdout
+    logger.info("✓ Subcommand help")
+    
+except Exception as e:
+    logger.error(f"✗ CLI test failed: {e}")
+    exit(1)
@@ -0,0 +1,105 @@
+from unittest import mock
+import pandas as pd
+from dashboard import queries
+from etl.config import DASHBOARD_POOL_SIZE, DASHBOARD_MAX_OVERFLOW
+from etl.logger import setup_logger
+
+logger = setup_logger("test_dashboard_queries")
+
+class RecordingRead:
+    """_read stand-in returning a canned frame and keeping the SQL and parameters sent"""
+    
+    def __init__(self, frame):
+        self.frame = frame
+        self.calls = []
+    
+    def __call__(self, sql, params=None):
+        self.calls.append((sql, params or {}))
+        return self.frame
+
+def breakdown_rows():
+    # One row per group of each grouping set; GROUPING() flags the columns not grouped on
+    rows = [
+        ('Buy', None, None, None, 0b0111, 3, 2.5, 40.0),
+        ('Sell', None, None, None, 0b0111, 2, -1.0, 10.0),
+        (None, 'High', None, None, 0b1011, 4, 1.0, 45.0),
+        (None, None, 'Large Cap', None, 0b1101, 1, 1.5, 30.0),
+        (None, None, 'Small Cap', None, 0b1101, 4, 0.5, 20.0),
+        (None, None, None, '$1-$10', 0b1110, 5, 0.0, 50.0)
+    ]
+    return pd.DataFrame(rows, columns=['signal_type', 'liquidity_status', 'category', 'price_range', 'grouping_id',
+                                       'count', 'avg_price_change_24h', 'avg_market_cap_billions'])
+
+try:
+    logger.info("Testing dashboard query layer...")
+    
+    # Every breakdown comes from one GROUPING SETS query, split by GROUPING() bits
+    read = RecordingRead(breakdown_rows())
+    with mock.patch('dashboard.queries._read', read):
+        queries.load_performance_breakdowns.clear()
+        breakdowns = queries.load_performance_breakdowns(days=7)
+    assert len(read.calls) == 1
+    sql, params = read.calls[0]
+    assert 'GROUP BY GROUPING SETS ((signal_type), (liquidity_status), (category), (price_range))' in sql
+    assert params == {'days': 7}
+    assert set(breakdowns) == {'signal_type', 'liquidity_status', 'category', 'price_range'}
+    assert breakdowns['signal_type'].to_dict('list') == {'signal_type': ['Buy', 'Sell'], 'count': [3, 2]}
+    assert breakdowns['liquidity_status'].to_dict('list') == {'liquidity_status': ['High'], 'count': [4]}
+    assert breakdowns['price_range'].to_dict('list') == {'price_range': ['$1-$10'], 'count': [5]}
+    assert list(breakdowns['category'].columns) == ['category', 'avg_price_change_24h', 'avg_market_cap_billions']
+    assert list(breakdowns['category']['category']) == ['Large Cap', 'Small Cap']
+    logger.info("✓ GROUPING SETS rows split into one frame per breakdown")
+    
+    # Sets missing from the window come back as empty frames, not errors
+    read = RecordingRead(breakdown_rows().iloc[:2])
+    with mock.patch('dashboard.queries._read', read):
+        queries.load_performance_breakdowns.clear()
+        breakdowns = queries.load_performance_breakdowns(days=1)
+    assert len(breakdowns['signal_type']) == 2 and breakdowns['category'].empty
+    logger.info("✓ Empty grouping sets handled")
+    
+    # Sidebar filters become bind parameters; "All" adds no condition
+    cte, params = queries._filtered_summary_cte(10, "All", "All", (0.5, 100.0))
+    assert 'LIMIT :top_n' in cte and 'market_tier' not in cte and 'performance_24h' not in cte
+    assert params == {'top_n': 10, 'price_min': 0.5, 'price_max': 100.0}
+    cte, params = queries._filtered_summary_cte(25, "Large Cap", "Strong Gain", (0.0, 1e6))
+    assert 'market_tier = :tier' in cte and 'performance_24h = :performance' in cte
+    assert params['tier'] == "Large Cap" and params['performance'] == "Strong Gain"
+    assert "Large Cap" not in cte
+    logger.info("✓ Filters bound as parameters, never interpolated")
+    
+    # Headline metrics are aggregated server-side over the same filtered CTE
+    read = RecordingRead(pd.DataFrame([{'cryptocurrencies': 3, 'total_market_cap_billions': 12.5,
+                                        'avg_price_change_24h': 1.2, 'gainers': 2}]))
+    with mock.patch('dashboard.queries._read', read):
+        queries.load_headline_metrics.clear()
+        metrics = queries.load_headline_metrics(25, "Large Cap", "All", (0.0, 1e6))
+    assert metrics == {'cryptocurrencies': 3, 'total_market_cap_billions': 12.5,
+                       'avg_price_change_24h': 1.2, 'gainers': 2}
+    sql, params = read.calls[0]
+    assert 'FROM filtered' in sql and 'COUNT(*) FILTER (WHERE latest_price_change_24h > 0)' in sql
+    assert params == {'top_n': 25, 'price_min': 0.0, 'price_max': 1e6, 'tier': "Large Cap"}
+    logger.info("✓ Headline metrics aggregated in Postgres")
+    
+    
+    # Every session and query thread shares one pooled engine
+    with mock.patch('dashboard.queries.create_engine') as create_engine:
+        queries.get_engine.clear()
+        engine = queries.get_engine()
+        assert queries.get_engine() is engine and create_engine.call_count == 1
+        kwargs = create_engine.call_args.kwargs
+        assert kwargs['pool_size'] == DASHBOARD_POOL_SIZE and kwargs['max_overflow'] == DASHBOARD_MAX_OVERFLOW
+        assert kwargs['pool_pre_ping']
+        
+        # Each query checks a connection out of the pool and returns it
+        with mock.patch('dashboard.queries.pd.read_sql', return_value=pd.DataFrame()) as read_sql:
+            queries._read("SELECT 1", {'a': 1})
+        connection = engine.connect.return_value.__enter__.return_value
+        assert read_sql.call_args.args[1] is connection and read_sql.call_args.kwargs['params'] == {'a': 1}
+        assert engine.connect.return_value.__exit__.called
+        queries.get_engine.clear()
+    logger.info("✓ One pooled engine shared by every query")
+
+except Exception as e:
+    logger.error(f"✗ Dashboard query test failed: {e!r}")
+    exit(1)
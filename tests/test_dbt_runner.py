@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+from etl.dbt_runner import DbtProjectRunner
+from etl.logger import setup_logger
+
+logger = setup_logger("test_dbt_runner")
+
+class FakeDbtRunner:
+    """dbtRunner stand-in: parse returns a manifest, run writes target/manifest.json"""
+    
+    invocations = []
+    fail_run = False
+    
+    def __init__(self, manifest=None):
+        self.manifest = manifest
+    
+    def invoke(self, args):
+        FakeDbtRunner.invocations.append((args[0], self.manifest))
+        project_dir = args[args.index("--project-dir") + 1]
+        if args[0] == "parse":
+            return SimpleNamespace(success=True, exception=None, result=object())
+        
+        os.makedirs(os.path.join(project_dir, "target"), exist_ok=True)
+        with open(os.path.join(project_dir, "target", "manifest.json"), "w") as f:
+            f.write('{"run": %d}' % len(FakeDbtRunner.invocations))
+        node = SimpleNamespace(
+            node=SimpleNamespace(name="fct_prices"), status="success", execution_time=0.5,
+            adapter_response={'rows_affected': 42}, message="INSERT 0 42"
+        )
+        return SimpleNamespace(success=not FakeDbtRunner.fail_run, exception=None, result=[node])
+
+def touch(path, offset):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime + offset, stat.st_mtime + offset))
+
+try:
+    logger.info("Testing dbt runner manifest and state reuse...")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        project_dir = os.path.join(tmp, "project")
+        shutil.copytree("dbt", project_dir, ignore=shutil.ignore_patterns("target", "logs", "dbt_packages", "state"))
+        runner = DbtProjectRunner(project_dir=project_dir, state_dir=os.path.join(project_dir, "state"))
+        model = next(os.path.join(root, name) for root, _, names in os.walk(os.path.join(project_dir, "models"))
+                     for name in names if name.endswith(".sql"))
+        
+        # The fingerprint follows project files only, not build output
+        fingerprint = runner._project_fingerprint()
+        assert fingerprint and all(path.startswith(project_dir) for path, _ in fingerprint)
+        os.makedirs(os.path.join(project_dir, "target"))
+        with open(os.path.join(project_dir, "target", "compiled.sql"), "w") as f:
+            f.write("select 1")
+        assert runner._project_fingerprint() == fingerprint
+        touch(model, 10)
+        assert runner._project_fingerprint() != fingerprint
+        logger.info("✓ Fingerprint changes with project files and ignores target/")
+        
+        # No saved state: build everything; afterwards select from changed sources and modified nodes
+        assert runner.selection(["crypto_prices"]) == []
+        
+        with mock.patch("dbt.cli.main.dbtRunner", FakeDbtRunner):
+            result = runner.run()
+            assert result['success'] and result['rows_affected'] == 42
+            assert result['models'][0]['model'] == "fct_prices"
+            assert os.path.exists(os.path.join(runner.state_dir, "manifest.json"))
+            logger.info("✓ Successful run saves the manifest as state")
+            
+            selection = runner.selection(["crypto_prices"])
+            assert selection == ["--select", "source:crypto_raw.crypto_prices+", "state:modified+",
+                                 "--state", runner.state_dir]
+            logger.info("✓ Later runs select downstream of changed sources against saved state")
+            
+            # The parsed manifest is reused until a project file changes
+            runner.run(selection)
+            assert [kind for kind, _ in FakeDbtRunner.invocations] == ["parse", "run", "run"]
+            first_manifest = FakeDbtRunner.invocations[1][1]
+            assert first_manifest is not None and FakeDbtRunner.invocations[2][1] is first_manifest
+            touch(model, 20)
+            runner.run()
+            assert [kind for kind, _ in FakeDbtRunner.invocations][-2:] == ["parse", "run"]
+            assert FakeDbtRunner.invocations[-1][1] is not first_manifest
+            logger.info("✓ Manifest reused between runs and re-parsed after an edit")
+            
+            # A failed run keeps the previous state as the comparison baseline
+            with open(os.path.join(runner.state_dir, "manifest.json")) as f:
+                saved = f.read()
+            FakeDbtRunner.fail_run = True
+            assert not runner.run()['success']
+            with open(os.path.join(runner.state_dir, "manifest.json")) as f:
+                assert f.read() == saved
+            logger.info("✓ Failed runs leave saved state untouched")
+
+except Exception as e:
+    logger.error(f"✗ dbt runner test failed: {e!r}")
+    exit(1)
@@ -0,0 +1,73 @@
+import pandas as pd
+from etl.transform import CryptoTransformer
+from etl.logger import setup_logger
+
+logger = setup_logger("test_dtypes")
+
+def markets(**overrides):
+    """Four raw /coins/markets rows with per-column overrides"""
+    rows = pd.DataFrame({
+        'id': ['bitcoin', 'ethereum', 'tether', 'shiba'],
+        'symbol': ['btc', 'eth', 'usdt', 'shib'],
+        'name': ['Bitcoin', 'Ethereum', 'Tether', 'Shiba Inu'],
+        'current_price': [60000.12345678, 3000.5, 1.0001, 0.00001234],
+        'market_cap': [1.2e12, 4e11, 1.1e11, 7e9],
+        'market_cap_rank': [1, 2, 3, 15],
+        'total_volume': [3e10, 1.5e10, 5e10, 2e8],
+        'price_change_percentage_24h': [1.5, -0.25, 0.01, 12.75],
+        'circulating_supply': [19.7e6, 120e6, 110e9, 589e12],
+        'last_updated': "2025-09-15T12:00:00.000Z",
+        'vs_currency': 'usd'
+    })
+    for column, values in overrides.items():
+        rows[column] = values
+    return rows
+
+try:
+    logger.info("Testing transformer dtype coercion...")
+    
+    transformer = CryptoTransformer()
+    
+    # Compact dtypes, with current_price kept at full precision
+    df = transformer.transform(markets())
+    expected = {
+        'symbol': 'category', 'name': 'category', 'vs_currency': 'category',
+        'current_price': 'float64', 'market_cap': 'Int64', 'rank': 'Int32',
+        'volume_24h': 'Int64', 'price_change_24h': 'float32', 'circulating_supply': 'Int64',
+        'market_cap_billions': 'float32'
+    }
+    for column, dtype in expected.items():
+        assert str(df[column].dtype) == dtype, (column, df[column].dtype)
+    assert df.loc[0, 'current_price'] == 60000.12345678
+    assert list(df['symbol'].cat.categories) == sorted(['btc', 'eth', 'usdt', 'shib'])
+    assert list(df['price_category'].astype(str)) == ['High', 'High', 'Medium', 'Low']
+    logger.info("✓ Columns stored in compact dtypes")
+    
+    # Fractional values are rounded into integer columns
+    df = transformer.transform(markets(circulating_supply=[19.7e6 + 0.6, 120e6 + 0.4, 110e9, 589e12]))
+    assert list(df['circulating_supply'][:2]) == [19_700_001, 120_000_000]
+    logger.info("✓ Fractional supplies rounded")
+    
+    # Values beyond their integer dtype become missing instead of failing the batch
+    df = transformer.transform(markets(circulating_supply=[1e20, 120e6, 110e9, 589e12],
+                                       market_cap_rank=[1, 2, 2 ** 31, None],
+                                       total_volume=[3e10, -1e19, 5e10, 2e8]))
+    assert len(df) == 4
+    assert pd.isna(df.loc[0, 'circulating_supply']) and df.loc[1, 'circulating_supply'] == 120_000_000
+    assert pd.isna(df.loc[2, 'rank']) and pd.isna(df.loc[3, 'rank']) and df.loc[1, 'rank'] == 2
+    assert pd.isna(df.loc[1, 'volume_24h'])
+    logger.info("✓ Out-of-range integers (1e20 supply, rank 2**31) become NA")
+    
+    # Unparseable values become missing; rows without a usable price or market cap are dropped
+    df = transformer.transform(markets(total_volume=['n/a', 1.5e10, None, 2e8],
+                                       current_price=[60000.0, 'abc', 1.0, 0.00001234],
+                                       market_cap=[1.2e12, 4e11, 1.1e11, '']))
+    assert list(df['crypto_id']) == ['bitcoin', 'tether']
+    assert df['volume_24h'].isna().tolist() == [True, True]
+    df = transformer.transform(markets(last_updated=[None, "2025-09-15T12:00:00.000Z", None, None]))
+    assert list(df['crypto_id']) == ['ethereum']
+    logger.info("✓ Unparseable values coerced to NA and invalid or unkeyed rows dropped")
+
+except Exception as e:
+    logger.error(f"✗ Dtype test failed: {e!r}")
+    exit(1)
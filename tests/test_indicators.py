@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from etl.indicators import IndicatorEngine, SECONDS_PER_YEAR
+from etl.logger import setup_logger
+
+logger = setup_logger("test_indicators")
+
+def history(coins=3, snapshots=60, seed=7):
+    """Random-walk prices, one snapshot per coin every 5 minutes"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2025-09-15", periods=snapshots, freq="5min")
+    frames = []
+    for coin in range(coins):
+        prices = 10.0 ** coin * np.exp(np.cumsum(rng.normal(0, 0.01, snapshots)))
+        frames.append(pd.DataFrame({
+            'crypto_id': f"coin{coin}",
+            'vs_currency': 'usd',
+            'current_price': prices,
+            'last_updated': times.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def reference(prices, span=20, period=14, window=24, interval=300.0):
+    """Plain pandas versions of each indicator for one coin"""
+    returns = np.log(prices).diff()
+    change = prices.diff()
+    gain, loss = change.clip(lower=0), (-change).clip(lower=0)
+    avg_gain, avg_loss = np.full(len(prices), np.nan), np.full(len(prices), np.nan)
+    for i in range(period, len(prices)):
+        if i == period:
+            avg_gain[i], avg_loss[i] = gain[1:period + 1].mean(), loss[1:period + 1].mean()
+        else:
+            avg_gain[i] = (avg_gain[i - 1] * (period - 1) + gain[i]) / period
+            avg_loss[i] = (avg_loss[i - 1] * (period - 1) + loss[i]) / period
+    squared = (returns ** 2).rolling(window, min_periods=2).sum()
+    elapsed = returns.notna().astype(float).rolling(window, min_periods=2).sum() * interval
+    return pd.DataFrame({
+        'log_return': returns,
+        'volatility': np.sqrt(squared / elapsed * SECONDS_PER_YEAR),
+        'ema': prices.ewm(span=span, adjust=False).mean(),
+        'rsi': 100 - 100 / (1 + avg_gain / avg_loss),
+        'drawdown': prices / prices.cummax() - 1
+    })
+
+try:
+    logger.info("Testing incremental indicator engine...")
+
+    data = history()
+    columns = ['log_return', 'volatility', 'ema', 'rsi', 'drawdown']
+
+    # Whole history at once matches the pandas reference per coin
+    batch = IndicatorEngine().update(data)
+    assert len(batch) == len(data)
+    for coin, rows in batch.groupby('crypto_id'):
+        expected = reference(rows['current_price'].reset_index(drop=True))
+        np.testing.assert_allclose(rows[columns].to_numpy(), expected[columns].to_numpy(), rtol=1e-9, equal_nan=True)
+    logger.info("✓ Batch results match pandas reference")
+
+    # One snapshot at a time, resuming from persisted state halfway, gives the same rows
+    engine = IndicatorEngine()
+    incremental = []
+    for step, snapshot in data.groupby('last_updated', sort=True):
+        if step == sorted(data['last_updated'].unique())[30]:
+            engine = IndicatorEngine.from_state(engine.state_frame())
+        incremental.append(engine.update(snapshot))
+    incremental = pd.concat(incremental).sort_values(['crypto_id', 'last_updated']).reset_index(drop=True)
+    expected = batch.sort_values(['crypto_id', 'last_updated']).reset_index(drop=True)
+    np.testing.assert_allclose(incremental[columns].to_numpy(), expected[columns].to_numpy(), rtol=1e-9, equal_nan=True)
+    logger.info("✓ Incremental updates from saved state match batch")
+
+    # Snapshots already applied are skipped; a new coin starts fresh
+    assert engine.update(data.tail(3)).empty
+    late = pd.DataFrame({'crypto_id': ['newcoin'], 'vs_currency': ['usd'], 'current_price': [2.0],
+                         'last_updated': ["2025-09-15T06:00:00.000Z"]})
+    row = engine.update(late).iloc[0]
+    assert row['drawdown'] == 0.0 and np.isnan(row['log_return']) and len(engine) == 4
+    logger.info("✓ Replayed snapshots are skipped")
+
+    # 5,000 coins per snapshot stays cheap
+    many = IndicatorEngine()
+    snapshot = pd.DataFrame({'crypto_id': [f"c{i}" for i in range(5000)], 'vs_currency': 'usd',
+                             'current_price': 1.0, 'last_updated': pd.Timestamp("2025-09-15")})
+    many.update(snapshot)
+    snapshot['last_updated'] += pd.Timedelta(minutes=1)
+    snapshot['current_price'] = 1.01
+    start = pd.Timestamp.now()
+    many.update(snapshot)
+    logger.info(f"✓ 5000-coin snapshot update in {(pd.Timestamp.now() - start).total_seconds() * 1000:.1f} ms")
+
+except Exception as e:
+    logger.error(f"✗ Indicator test failed: {e}")
+    exit(1)
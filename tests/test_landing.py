@@ -0,0 +1,179 @@
+import functools
+import glob
+import os
+import tempfile
+from datetime import datetime
+from unittest import mock
+import pandas as pd
+from etl.landing import RawLandingZone, EXTRACTED_AT_COLUMN
+from etl.reprocess import run_reprocess
+from etl.logger import setup_logger
+
+logger = setup_logger("test_landing")
+
+def markets(ids, price=1.0, vs_currency='usd'):
+    """Raw /coins/markets rows, as the extractor returns them"""
+    frame = pd.DataFrame({
+        'id': ids,
+        'symbol': [i[:3] for i in ids],
+        'name': [i.title() for i in ids],
+        'current_price': price,
+        'market_cap': [10 ** 9 * (n + 1) for n in range(len(ids))],
+        'market_cap_rank': list(range(1, len(ids) + 1)),
+        'total_volume': 1e6,
+        'price_change_percentage_24h': 1.5,
+        'circulating_supply': 1e9,
+        'last_updated': "2025-09-15T12:00:00.000Z",
+        'roi': [{'times': 2.5}] + [None] * (len(ids) - 1)
+    })
+    if vs_currency is not None:
+        frame['vs_currency'] = vs_currency
+    return frame
+
+class RecordingLoader:
+    """CryptoLoader stand-in recording deletes and loads"""
+    
+    def __init__(self, fail_on_batch=None):
+        self.deleted = []
+        self.loaded = []
+        self.quarantined = []
+        self.fail_on_batch = fail_on_batch
+        self.last_load_stats = {}
+    
+    def create_tables(self):
+        pass
+    
+    def delete_snapshots(self, keys):
+        self.deleted.append(keys)
+        return len(keys)
+    
+    def load_data(self, df, method='upsert', replace_keys=None, **kwargs):
+        # Deleting replace_keys and loading df is one transaction: a failure does neither
+        if self.fail_on_batch == len(self.loaded):
+            raise RuntimeError("reload failed")
+        if replace_keys is not None:
+            self.deleted.append(replace_keys)
+        self.loaded.append(df)
+        self.last_load_stats = {'records': len(df), 'replaced': 0 if replace_keys is None else len(replace_keys)}
+        return len(df)
+    
+    def save_quarantine(self, df):
+        self.quarantined.append(df)
+        return len(df)
+
+def files(directory):
+    return sorted(glob.glob(os.path.join(directory, '**', '*.parquet'), recursive=True))
+
+try:
+    logger.info("Testing raw landing zone...")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        landing = RawLandingZone(directory)
+        landing.write(markets(['bitcoin', 'ethereum'], price=1.0), datetime(2025, 9, 15, 12, 5))
+        landing.write(markets(['bitcoin', 'solana'], price=2.0), datetime(2025, 9, 15, 13, 5))
+        landing.write(markets(['bitcoin'], price=3.0, vs_currency=None), datetime(2025, 9, 16, 0, 5))
+        assert [os.path.relpath(p, directory).split(os.sep)[:2] for p in files(directory)] == [
+            ['date=2025-09-15', 'hour=12'], ['date=2025-09-15', 'hour=13'], ['date=2025-09-16', 'hour=00']
+        ]
+        
+        # Rows come back in extraction order with every API column and their extraction time
+        df = landing.read(datetime(2025, 9, 15), datetime(2025, 9, 17))
+        assert list(df['id']) == ['bitcoin', 'ethereum', 'bitcoin', 'solana', 'bitcoin']
+        assert list(df['current_price']) == [1.0, 1.0, 2.0, 2.0, 3.0]
+        assert df[EXTRACTED_AT_COLUMN].iloc[2] == pd.Timestamp(2025, 9, 15, 13, 5)
+        assert df['roi'].iloc[0] == '{"times": 2.5}' and pd.isna(df['vs_currency'].iloc[4])
+        logger.info("✓ Write/read round trip across date and hour partitions")
+        
+        # The window is half open; coin and column filters are pushed down
+        df = landing.read(datetime(2025, 9, 15, 12, 5), datetime(2025, 9, 15, 13, 5),
+                          columns=['id', 'current_price'], coin_ids=['bitcoin'])
+        assert list(df['id']) == ['bitcoin'] and set(df.columns) == {'id', 'current_price', EXTRACTED_AT_COLUMN}
+        assert landing.read(datetime(2025, 9, 17), datetime(2025, 9, 18)).empty
+        
+        # Only the window's date directories are opened: an unreadable file elsewhere is never touched
+        os.makedirs(os.path.join(directory, 'date=2025-01-01', 'hour=00'))
+        with open(os.path.join(directory, 'date=2025-01-01', 'hour=00', 'markets_broken.parquet'), 'wb') as f:
+            f.write(b'not parquet')
+        assert len(landing.read(datetime(2025, 9, 15, 13), datetime(2025, 9, 16))) == 2
+        assert landing.read(datetime(2025, 9, 16), datetime(2025, 9, 16, 0, 5)).empty
+        logger.info("✓ Time window, coin and column pruning")
+        
+        # --replace deletes exactly the landed snapshots of the window before reloading them
+        loader = RecordingLoader()
+        with mock.patch('etl.reprocess.RawLandingZone', lambda: RawLandingZone(directory)), \
+                mock.patch('etl.reprocess.CryptoLoader', lambda: loader):
+            result = run_reprocess(datetime(2025, 9, 15, 13), datetime(2025, 9, 17), replace=True)
+        keys = pd.concat(loader.deleted, ignore_index=True)
+        assert list(keys.columns) == ['crypto_id', 'vs_currency', 'extracted_at']
+        assert list(keys['crypto_id']) == ['bitcoin', 'solana', 'bitcoin']
+        assert list(keys['vs_currency']) == ['usd', 'usd', 'usd']
+        assert list(keys['extracted_at']) == [pd.Timestamp(2025, 9, 15, 13, 5)] * 2 + [pd.Timestamp(2025, 9, 16, 0, 5)]
+        assert result["records_read"] == result["records_processed"] == result["records_replaced"] == 3, result
+        reloaded = pd.concat(loader.loaded, ignore_index=True)
+        assert list(reloaded['extracted_at']) == list(keys['extracted_at'])
+        logger.info("✓ Reprocess --replace deletes the landed keys and reloads them")
+        
+        # Batches are replaced one transaction at a time: a failed reload deletes nothing more
+        loader = RecordingLoader(fail_on_batch=1)
+        small_batches = RawLandingZone(directory)
+        small_batches.iter_batches = functools.partial(small_batches.iter_batches, batch_rows=1)
+        with mock.patch('etl.reprocess.RawLandingZone', lambda: small_batches), \
+                mock.patch('etl.reprocess.CryptoLoader', lambda: loader):
+            try:
+                run_reprocess(datetime(2025, 9, 15), datetime(2025, 9, 17), replace=True)
+                raise AssertionError("reload failure was swallowed")
+            except RuntimeError:
+                pass
+        assert len(loader.loaded) == 1 and len(loader.deleted) == 1
+        assert list(loader.deleted[0]['crypto_id']) == list(loader.loaded[0]['crypto_id'])
+        logger.info("✓ A failed reload leaves later batches' history in place")
+        
+        # Replayed rows are validated like live loads and failures quarantined
+        invalid = markets(['bitcoin', 'ethereum'], price=1.0)
+        invalid.loc[1, 'market_cap'] = -1
+        landing.write(invalid, datetime(2025, 9, 18, 9, 0))
+        loader = RecordingLoader()
+        with mock.patch('etl.reprocess.RawLandingZone', lambda: RawLandingZone(directory)), \
+                mock.patch('etl.reprocess.CryptoLoader', lambda: loader):
+            result = run_reprocess(datetime(2025, 9, 18), datetime(2025, 9, 19), replace=True)
+        assert result['records_quarantined'] == 1 and result['records_processed'] == 1
+        assert list(loader.quarantined[0]['quarantine_reason']) == ['range:market_cap']
+        assert list(loader.deleted[0]['crypto_id']) == ['bitcoin', 'ethereum']
+        logger.info("✓ Replayed rows pass through validation and quarantine")
+        
+        # Restricted to some coins, only their snapshots are replaced
+        loader = RecordingLoader()
+        with mock.patch('etl.reprocess.RawLandingZone', lambda: RawLandingZone(directory)), \
+                mock.patch('etl.reprocess.CryptoLoader', lambda: loader):
+            run_reprocess(datetime(2025, 9, 15), datetime(2025, 9, 17), coin_ids=['solana'], replace=True)
+        assert list(pd.concat(loader.deleted)['crypto_id']) == ['solana']
+        assert list(pd.concat(loader.loaded)['crypto_id']) == ['solana']
+        logger.info("✓ Replace honours the coin filter")
+    
+    # Buffered writers make one file per flush window instead of one per batch
+    with tempfile.TemporaryDirectory() as directory:
+        landing = RawLandingZone(directory, flush_seconds=900)
+        with mock.patch('etl.landing.time.monotonic', side_effect=[0, 10, 20, 30, 40]):
+            assert landing.write(markets(['bitcoin']), datetime(2025, 9, 15, 12, 0)) is None
+            assert landing.write(markets(['bitcoin']), datetime(2025, 9, 15, 12, 1)) is None
+            assert files(directory) == []
+            
+            # A new hour writes out the previous hour's batches first
+            path = landing.write(markets(['bitcoin']), datetime(2025, 9, 15, 13, 0))
+        assert path is not None and 'hour=12' in path and len(pd.read_parquet(path)) == 2
+        
+        with mock.patch('etl.landing.time.monotonic', side_effect=[950, 950]):
+            path = landing.write(markets(['ethereum']), datetime(2025, 9, 15, 13, 20))
+        assert path is not None and 'hour=13' in path
+        assert list(pd.read_parquet(path)['id']) == ['bitcoin', 'ethereum']
+        
+        landing.write(markets(['solana']), datetime(2025, 9, 15, 13, 30))
+        assert len(files(directory)) == 2
+        assert landing.flush() is not None and landing.flush() is None
+        df = landing.read(datetime(2025, 9, 15), datetime(2025, 9, 16))
+        assert list(df['id']) == ['bitcoin', 'bitcoin', 'bitcoin', 'ethereum', 'solana']
+        logger.info("✓ flush_seconds buffers batches per hour and flush() writes the rest")
+
+except Exception as e:
+    logger.error(f"✗ Landing test failed: {e!r}")
+    exit(1)
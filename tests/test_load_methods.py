@@ -0,0 +1,303 @@
+import io
+from datetime import date
+from unittest import mock
+import pandas as pd
+from etl.transform import CryptoTransformer
+from etl.logger import setup_logger
+
+logger = setup_logger("test_load_methods")
+
+class FakeCursor:
+    """Records SQL and COPY payloads instead of talking to PostgreSQL"""
+    
+    def __init__(self, copy_error=None, written=()):
+        self.statements = []
+        self.copies = []
+        self.copy_error = copy_error
+        self.written = list(written)
+        self.rowcount = 0
+    
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+    
+    def copy_expert(self, sql, buffer):
+        if self.copy_error is not None and 'COPY crypto_prices ' in sql:
+            raise self.copy_error
+        self.copies.append((sql, buffer.read()))
+    
+    def fetchall(self):
+        return self.written
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = self.rolled_back = self.closed = False
+    
+    def cursor(self):
+        return self._cursor
+    
+    def commit(self):
+        self.committed = True
+    
+    def rollback(self):
+        self.rolled_back = True
+    
+    def close(self):
+        self.closed = True
+
+class FakeResult:
+    def __init__(self, rows=(), scalar=None):
+        self._rows = list(rows)
+        self._scalar = scalar
+    
+    def all(self):
+        return self._rows
+    
+    def scalar(self):
+        return self._scalar
+
+class FakeSQLConnection:
+    """SQLAlchemy connection stand-in for partition DDL: records statements, lists partitions"""
+    
+    def __init__(self, partitions=(), existing=()):
+        self.statements = []
+        self.partitions = list(partitions)
+        self.existing = set(existing)
+        self.committed = False
+    
+    def execute(self, clause, params=None):
+        sql = str(clause)
+        self.statements.append(sql)
+        if 'pg_inherits' in sql:
+            return FakeResult(rows=[(name,) for name in self.partitions])
+        if 'to_regclass' in sql:
+            return FakeResult(scalar=params['name'] if params['name'] in self.existing else None)
+        return FakeResult()
+    
+    def commit(self):
+        self.committed = True
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+class FixedDate(date):
+    @classmethod
+    def today(cls):
+        return cls(2025, 9, 15)
+
+def created_partitions(connection):
+    return [sql.split()[5] for sql in connection.statements if sql.startswith('CREATE TABLE IF NOT EXISTS')]
+
+class UniqueViolation(Exception):
+    pgcode = '23505'
+
+def loader_with(cursor):
+    with mock.patch('etl.load.create_engine'):
+        from etl.load import CryptoLoader
+        loader = CryptoLoader()
+    connection = FakeConnection(cursor)
+    loader.engine.raw_connection.return_value = connection
+    return loader, connection
+
+def merge_of(cursor):
+    return next(sql for sql in cursor.statements if 'INSERT INTO crypto_prices ' in sql)
+
+def markets(coins=5):
+    return pd.DataFrame({
+        'id': [f"coin{i}" for i in range(coins)],
+        'symbol': [f"c{i}" for i in range(coins)],
+        'name': [f"Coin {i}" for i in range(coins)],
+        'current_price': [0.5 * (i + 1) for i in range(coins)],
+        'market_cap': [1e9 * (i + 1) for i in range(coins)],
+        'market_cap_rank': list(range(1, coins + 1)),
+        'total_volume': [1234567.6] + [None] * (coins - 1),
+        'price_change_percentage_24h': 1.5,
+        'circulating_supply': 1e9 + 0.4,
+        'last_updated': "2025-09-15T12:00:00.000Z",
+        'vs_currency': 'usd'
+    })
+
+try:
+    logger.info("Testing load methods against a recording connection...")
+    
+    df = CryptoTransformer().transform(markets())
+    
+    # Rows are streamed in chunks into crypto_prices, then crypto_latest is refreshed
+    cursor = FakeCursor()
+    loader, connection = loader_with(cursor)
+    stats = loader.bulk_load(df, chunk_size=2)
+    prices = [payload for sql, payload in cursor.copies if sql.startswith('COPY crypto_prices ')]
+    assert len(prices) == 3, len(prices)
+    assert stats['method'] == 'copy' and stats['records'] == 5
+    assert any('crypto_latest_staging' in sql for sql, _ in cursor.copies)
+    assert connection.committed and connection.closed and not connection.rolled_back
+    logger.info("✓ COPY in chunks and crypto_latest refresh in one transaction")
+    
+    # Integers go out without a decimal point, missing values as empty fields
+    rows = pd.read_csv(io.StringIO(''.join(prices)), header=None, names=list(df.columns), dtype=str,
+                       keep_default_na=False)
+    assert rows.loc[0, 'volume_24h'] == '1234568', rows.loc[0, 'volume_24h']
+    assert rows.loc[1, 'volume_24h'] == ''
+    assert rows.loc[0, 'circulating_supply'] == '1000000000'
+    assert rows.loc[0, 'market_cap'] == '1000000000'
+    logger.info("✓ CSV payload matches the column types")
+    
+    # A retried batch that is partly stored falls back to the upsert merge
+    cursor = FakeCursor(copy_error=UniqueViolation("duplicate key"))
+    loader, connection = loader_with(cursor)
+    loader.load_data(df, method='copy', ensure_partitions=False)
+    assert connection.rolled_back
+    assert any('ON CONFLICT' in sql and 'crypto_prices_staging' in sql for sql in cursor.statements)
+    logger.info("✓ Unique violation during COPY falls back to upsert")
+    
+    # Any other COPY failure rolls back and surfaces
+    cursor = FakeCursor(copy_error=ValueError("bad row"))
+    loader, connection = loader_with(cursor)
+    try:
+        loader.load_data(df, method='copy', ensure_partitions=False)
+        raise AssertionError("COPY failure was swallowed")
+    except ValueError:
+        pass
+    assert connection.rolled_back and not connection.committed
+    logger.info("✓ Other COPY failures roll back and are raised")
+    
+    # Upsert stages the batch's own columns (no id) and merges on the natural key
+    cursor = FakeCursor(written=[('coin0', 'usd'), ('coin3', 'usd')])
+    loader, connection = loader_with(cursor)
+    stats = loader.upsert_load(df)
+    staging = next(sql for sql in cursor.statements if 'CREATE TEMP TABLE crypto_prices_staging' in sql)
+    assert 'WITH NO DATA' in staging and ' id,' not in staging
+    merge = merge_of(cursor)
+    assert 'ON CONFLICT (crypto_id, vs_currency, last_updated, extracted_date) DO NOTHING' in merge
+    assert 'WHERE NOT EXISTS' in merge and 'DISTINCT ON' in merge and 'RETURNING crypto_id, vs_currency' in merge
+    assert connection.committed
+    logger.info("✓ Upsert merges staged rows on the natural key")
+    
+    # Only the rows the merge returned count as written; the rest were already stored
+    assert stats['records'] == 2 and stats['duplicates_skipped'] == 3
+    assert loader.last_written_keys == {('coin0', 'usd'), ('coin3', 'usd')}
+    cursor = FakeCursor(written=[])
+    loader, _ = loader_with(cursor)
+    assert loader.upsert_load(df)['records'] == 0 and loader.last_written_keys == set()
+    logger.info("✓ Re-running a batch writes nothing")
+    
+    # Revised values overwrite the stored snapshot's non-key columns
+    cursor = FakeCursor(written=[('coin1', 'usd')])
+    loader, _ = loader_with(cursor)
+    loader.load_data(df, method='upsert', update_existing=True, ensure_partitions=False)
+    merge = merge_of(cursor)
+    updates = merge.split('DO UPDATE SET', 1)[1].split('RETURNING')[0]
+    assert 'current_price = EXCLUDED.current_price' in updates and 'WHERE NOT EXISTS' not in merge
+    assert 'loaded_at = CURRENT_TIMESTAMP' in updates
+    assert not any(f"{key} = EXCLUDED" in updates
+                   for key in ['crypto_id', 'vs_currency', 'last_updated', 'extracted_date'])
+    assert loader.last_written_keys == {('coin1', 'usd')}
+    logger.info("✓ update_existing overwrites non-key columns")
+    
+    # Replaced snapshots are deleted before the merge, in the same transaction
+    cursor = FakeCursor(written=[('coin0', 'usd')])
+    cursor.rowcount = 5
+    loader, connection = loader_with(cursor)
+    keys = df[['crypto_id', 'vs_currency', 'extracted_at']]
+    loader.load_data(df, method='copy', replace_keys=keys, ensure_partitions=False)
+    delete = next(i for i, sql in enumerate(cursor.statements) if 'DELETE FROM crypto_prices p' in sql)
+    assert delete < cursor.statements.index(merge_of(cursor))
+    assert any(sql.startswith('COPY crypto_prices_delete_keys') for sql, _ in cursor.copies)
+    assert loader.last_load_stats['replaced'] == 5 and connection.committed
+    logger.info("✓ replace_keys delete and reload in one upsert transaction")
+    
+    # crypto_latest gets each coin's newest snapshot per currency, after the merge and in its transaction
+    older = markets(3).assign(current_price=9.0, last_updated="2025-09-15T11:00:00.000Z")
+    older = CryptoTransformer().transform(older)
+    eur = CryptoTransformer().transform(markets(2).assign(vs_currency='eur', current_price=7.0))
+    batch = pd.concat([df, older, eur], ignore_index=True)
+    cursor = FakeCursor(written=[('coin0', 'usd')])
+    loader, connection = loader_with(cursor)
+    loader.upsert_load(batch)
+    latest_sql, payload = next((sql, payload) for sql, payload in cursor.copies if 'crypto_latest_staging' in sql)
+    staged_columns = latest_sql.split('(')[1].split(')')[0].split(', ')
+    staged = pd.read_csv(io.StringIO(payload), header=None, names=staged_columns, keep_default_na=False)
+    assert len(staged) == 7 and not staged.duplicated(['crypto_id', 'vs_currency']).any()
+    assert set(staged.loc[staged['vs_currency'] == 'usd', 'current_price']) == set(df['current_price'])
+    assert set(staged.loc[staged['vs_currency'] == 'eur', 'current_price']) == {7.0}
+    upsert = next(sql for sql in cursor.statements if 'INSERT INTO crypto_latest' in sql)
+    assert 'ON CONFLICT (crypto_id, vs_currency) DO UPDATE' in upsert
+    assert 'EXCLUDED.last_updated >= crypto_latest.last_updated' in upsert
+    assert cursor.statements.index(merge_of(cursor)) < cursor.statements.index(upsert) and connection.committed
+    logger.info("✓ crypto_latest refreshed with the newest snapshot per coin and currency")
+    
+    # A failed merge rolls back and leaves no written keys behind
+    cursor = FakeCursor()
+    cursor.execute = mock.Mock(side_effect=[None, RuntimeError("merge failed")])
+    loader, connection = loader_with(cursor)
+    loader.last_written_keys = {('stale', 'usd')}
+    try:
+        loader.upsert_load(df)
+        raise AssertionError("merge failure was swallowed")
+    except RuntimeError:
+        pass
+    assert connection.rolled_back and loader.last_written_keys == set()
+    logger.info("✓ Failed upsert rolls back")
+    
+    
+    # A backfill batch creates its month's partition and every month since, through the premade ones
+    with mock.patch('etl.load.date', FixedDate), mock.patch('etl.load.PARTITION_PREMAKE_MONTHS', 2):
+        cursor = FakeCursor(written=[('coin0', 'usd')])
+        loader, _ = loader_with(cursor)
+        ddl = FakeSQLConnection()
+        loader.engine.begin.return_value = ddl
+        backfill = df.assign(extracted_date=pd.Timestamp(2025, 6, 10).date())
+        loader.load_data(backfill, method='upsert')
+        assert created_partitions(ddl) == [f"crypto_prices_p2025{month:02d}" for month in range(6, 12)], ddl.statements
+        assert "FOR VALUES FROM ('2025-06-01') TO ('2025-07-01')" in ddl.statements[0]
+        
+        # ...so the current month's batches, and more backfill for those months, run no DDL
+        ddl.statements.clear()
+        loader.load_data(df.assign(extracted_date=FixedDate.today()), method='upsert')
+        loader.load_data(backfill, method='upsert')
+        assert ddl.statements == []
+        
+        # A fresh loader premakes from the current month only
+        loader, _ = loader_with(FakeCursor(written=[('coin0', 'usd')]))
+        ddl = FakeSQLConnection()
+        loader.engine.begin.return_value = ddl
+        loader.load_data(df.assign(extracted_date=FixedDate.today()), method='upsert')
+        assert created_partitions(ddl) == ['crypto_prices_p202509', 'crypto_prices_p202510', 'crypto_prices_p202511']
+    logger.info("✓ Partitions created for backfilled and current months, once per loader")
+    
+    # Retention expires whole months before the cutoff, detaching under a free name or dropping
+    with mock.patch('etl.load.date', FixedDate):
+        partitions = ['crypto_prices_p202502', 'crypto_prices_p202503', 'crypto_prices_p202509',
+                      'crypto_prices_p202502_detached']
+        loader, _ = loader_with(FakeCursor())
+        loader._partition_names.update(partitions)
+        conn = FakeSQLConnection(partitions=partitions, existing=['crypto_prices_p202502_detached'])
+        loader.engine.connect.return_value = conn
+        assert loader.apply_retention(retention_months=6, mode='detach') == ['crypto_prices_p202502']
+        assert 'ALTER TABLE crypto_prices DETACH PARTITION crypto_prices_p202502' in conn.statements
+        assert 'ALTER TABLE crypto_prices_p202502 RENAME TO crypto_prices_p202502_detached_2' in conn.statements
+        assert not any('crypto_prices_p202503' in sql for sql in conn.statements)
+        assert 'crypto_prices_p202502' not in loader._partition_names and conn.committed
+        deletes = [sql for sql in conn.statements if sql.startswith('DELETE')]
+        assert len(deletes) == 2 and all(':cutoff' in sql for sql in deletes)
+        
+        conn = FakeSQLConnection(partitions=partitions)
+        loader.engine.connect.return_value = conn
+        loader.apply_retention(retention_months=6, mode='drop')
+        assert 'DROP TABLE crypto_prices_p202502' in conn.statements
+        assert not any('RENAME' in sql for sql in conn.statements)
+        assert loader.apply_retention(retention_months=0) == []
+    logger.info("✓ Retention detaches or drops partitions before the cutoff month")
+    
+except Exception as e:
+    logger.error(f"✗ Load methods test failed: {e!r}")
+    exit(1)
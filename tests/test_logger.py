@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import tempfile
+import warnings
+from datetime import date
+from unittest import mock
+from etl.logger import (
+    DailyRotatingFileHandler, JsonFormatter, _ContextFilter, _level_for, log_context, parse_log_levels,
+    set_log_context, setup_logger
+)
+
+logger = setup_logger("test_logger")
+
+class Clock(date):
+    """date whose today() the test moves forward"""
+    
+    current = (2025, 9, 15)
+    
+    @classmethod
+    def today(cls):
+        return cls(*cls.current)
+
+def file_logger(name, handler):
+    """A logger writing only to handler, synchronously"""
+    test_logger = logging.getLogger(name)
+    test_logger.handlers = [handler]
+    test_logger.propagate = False
+    test_logger.setLevel(logging.DEBUG)
+    return test_logger
+
+try:
+    logger.info("Testing logger levels, context and rotation...")
+    
+    # Per-module levels: the most specific configured prefix wins
+    levels = parse_log_levels("WARNING, etl.extract=DEBUG,etl.load = error")
+    assert levels == {'': logging.WARNING, 'etl.extract': logging.DEBUG, 'etl.load': logging.ERROR}
+    assert _level_for('etl.extract', levels) == logging.DEBUG
+    assert _level_for('etl.extract.cache', levels) == logging.DEBUG
+    assert _level_for('etl.extractor', levels) == logging.WARNING
+    assert _level_for('dashboard.app', levels) == logging.WARNING
+    assert parse_log_levels("") == {'': logging.INFO}
+    logger.info("✓ LOG_LEVEL parsed with per-module overrides")
+    
+    # Unknown level names fall back to INFO with one warning per spec
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        assert parse_log_levels("etl.load=LOUD") == {'': logging.INFO, 'etl.load': logging.INFO}
+        parse_log_levels("etl.load=LOUD")
+    assert len(caught) == 1 and 'LOUD' in str(caught[0].message)
+    logger.info("✓ Unknown levels warn once and use INFO")
+    
+    with tempfile.TemporaryDirectory() as tmp, mock.patch('etl.logger.date', Clock):
+        directory = os.path.join(tmp, 'logs')
+        Clock.current = (2025, 9, 15)
+        handler = DailyRotatingFileHandler(directory, max_bytes=400, backup_count=2)
+        handler.setFormatter(JsonFormatter())
+        handler.addFilter(_ContextFilter())
+        assert not os.path.exists(directory)
+        test_logger = file_logger("test_logger.rotation", handler)
+        
+        # JSON lines carry run context, scoped stage and extra fields
+        set_log_context(run_id="20250915T120000")
+        with log_context(stage='load'):
+            test_logger.info("loaded %d rows", 5, extra={'rows': 5})
+        test_logger.warning("outside the stage")
+        path = os.path.join(directory, "pipeline_20250915.log")
+        with open(path) as f:
+            first, second = [json.loads(line) for line in f]
+        assert first['message'] == "loaded 5 rows" and first['level'] == 'INFO'
+        assert first['run_id'] == "20250915T120000" and first['stage'] == 'load' and first['rows'] == 5
+        assert 'stage' not in second and second['run_id'] == "20250915T120000"
+        logger.info("✓ JSON records with run, stage and extra fields")
+        
+        # Size rollover keeps backup_count numbered files
+        for n in range(20):
+            test_logger.info(f"filler record {n:02d} " + "x" * 60)
+        names = sorted(os.listdir(directory))
+        assert names == ["pipeline_20250915.log", "pipeline_20250915.log.1", "pipeline_20250915.log.2"], names
+        assert all(os.path.getsize(os.path.join(directory, name)) <= 400 for name in names)
+        
+        # A new day starts that day's file and leaves yesterday's alone
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in names}
+        Clock.current = (2025, 9, 16)
+        test_logger.info("next day")
+        assert {name: os.path.getsize(os.path.join(directory, name)) for name in names} == sizes
+        with open(os.path.join(directory, "pipeline_20250916.log")) as f:
+            assert [json.loads(line)['message'] for line in f] == ["next day"]
+        handler.close()
+        logger.info("✓ Size and daily rotation")
+
+except Exception as e:
+    logger.error(f"✗ Logger test failed: {e!r}")
+    exit(1)
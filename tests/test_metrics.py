@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import threading
+from etl.metrics import PipelineMetrics, timed
+from etl.logger import setup_logger
+
+logger = setup_logger("test_metrics")
+
+class Client:
+    def __init__(self, metrics):
+        self.metrics = metrics
+    
+    @timed('db_call', operation='ping')
+    def ping(self, fail=False):
+        if fail:
+            raise RuntimeError("down")
+        return "pong"
+
+def exposition(text):
+    """Prometheus sample lines as {metric{labels}: value}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+try:
+    logger.info("Testing metrics collection and export...")
+    
+    metrics = PipelineMetrics(run_id="20250915T120000")
+    metrics.observe('stage', 0.5, stage='extract')
+    metrics.observe('stage', 1.5, stage='extract')
+    metrics.observe('stage', 0.25, stage='load')
+    with metrics.timer('stage', stage='transform'):
+        pass
+    client = Client(metrics)
+    assert client.ping() == "pong"
+    try:
+        client.ping(fail=True)
+        raise AssertionError("failure was swallowed")
+    except RuntimeError:
+        pass
+    
+    # Counters from many threads add up exactly
+    def count_rows():
+        for _ in range(1000):
+            metrics.increment('rows_total', 1, stage='load')
+    
+    threads = [threading.Thread(target=count_rows) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.increment('http_requests_total', endpoint='/coins/markets', status='ok')
+    
+    summary = metrics.to_dict()
+    assert summary['run_id'] == "20250915T120000"
+    assert summary['timers']['stage{stage="extract"}'] == {'count': 2, 'total_seconds': 2.0, 'max_seconds': 1.5}
+    assert summary['timers']['stage{stage="transform"}']['count'] == 1
+    assert summary['timers']['db_call{operation="ping"}']['count'] == 2
+    assert summary['counters']['rows_total{stage="load"}'] == 4000
+    assert summary['counters']['http_requests_total{endpoint="/coins/markets",status="ok"}'] == 1
+    logger.info("✓ Timers (including failed calls) and thread-safe counters")
+    
+    # Prometheus text: a summary per timer, a max gauge, a gauge per counter and the run timestamp
+    text = metrics.to_prometheus()
+    samples = exposition(text)
+    assert '# TYPE crypto_etl_stage_seconds summary' in text
+    assert '# TYPE crypto_etl_stage_seconds_max gauge' in text
+    assert samples['crypto_etl_stage_seconds_sum{stage="extract"}'] == 2.0
+    assert samples['crypto_etl_stage_seconds_count{stage="extract"}'] == 2
+    assert samples['crypto_etl_stage_seconds_max{stage="extract"}'] == 1.5
+    assert samples['crypto_etl_rows_total{stage="load"}'] == 4000
+    assert samples['crypto_etl_last_run_timestamp_seconds'] == round(metrics.started_at)
+    assert 'crypto_dbt_stage_seconds_sum{stage="load"}' in metrics.to_prometheus(prefix="crypto_dbt")
+    logger.info("✓ Prometheus exposition format")
+    
+    # Export writes a JSON file per run and replaces one .prom textfile
+    with tempfile.TemporaryDirectory() as directory:
+        paths = metrics.export(directory=directory, fmt='both')
+        assert [os.path.basename(p) for p in paths] == ["crypto_etl_20250915T120000.json", "crypto_etl.prom"]
+        with open(paths[0]) as f:
+            assert json.load(f) == summary
+        with open(paths[1]) as f:
+            assert exposition(f.read()) == samples
+        
+        later = PipelineMetrics(run_id="20250915T130000")
+        later.increment('rows_total', 10, stage='load')
+        assert later.export(directory=directory, fmt='prometheus') == [paths[1]]
+        with open(paths[1]) as f:
+            assert exposition(f.read())['crypto_etl_rows_total{stage="load"}'] == 10
+        assert sorted(os.listdir(directory)) == ["crypto_etl.prom", "crypto_etl_20250915T120000.json"]
+        
+        assert metrics.export(directory=os.path.join(directory, 'unused'), fmt='none') == []
+        assert not os.path.exists(os.path.join(directory, 'unused'))
+        assert metrics.export(directory=directory, fmt='json', basename="crypto_dbt")[0].endswith(
+            "crypto_dbt_20250915T120000.json"
+        )
+    logger.info("✓ JSON and Prometheus export, none writes nothing")
+
+except Exception as e:
+    logger.error(f"✗ Metrics test failed: {e!r}")
+    exit(1)
@@ -0,0 +1,59 @@
+from unittest import mock
+from benchmarks.fake_coingecko import FakeCoinGeckoServer
+from etl.extract import CryptoExtractor
+from etl.transform import CryptoTransformer
+from etl.validation import DataValidator
+from etl.logger import setup_logger
+
+logger = setup_logger("test_multi_currency")
+
+def requested_currencies(session_get):
+    return [call.kwargs['params']['vs_currency'] for call in session_get.call_args_list]
+
+try:
+    logger.info("Testing multi-currency extraction...")
+    
+    with FakeCoinGeckoServer(coins=300) as server:
+        extractor = CryptoExtractor(workers=4, calls_per_minute=0, cache_mode='off')
+        extractor.base_url = server.base_url
+        
+        # One row per coin and quote currency, each currency crawled to the same limit
+        with mock.patch.object(extractor.session, 'get', wraps=extractor.session.get) as session_get:
+            df = extractor.extract_top_coins(limit=100, vs_currencies=['usd', 'eur', 'btc'])
+        assert len(df) == 300
+        assert df.groupby('vs_currency')['id'].nunique().to_dict() == {'btc': 100, 'eur': 100, 'usd': 100}
+        assert not df.duplicated(['id', 'vs_currency']).any()
+        assert sorted(requested_currencies(session_get)) == ['btc', 'eur', 'usd']
+        logger.info("✓ Top coins extracted once per quote currency")
+        
+        # Unbounded crawls paginate each currency to its own end
+        with mock.patch.object(extractor.session, 'get', wraps=extractor.session.get) as session_get:
+            df = extractor.extract_all_coins(max_coins=None, per_page=100, vs_currencies=['usd', 'eur'])
+        assert df.groupby('vs_currency').size().to_dict() == {'eur': 300, 'usd': 300}
+        currencies = requested_currencies(session_get)
+        assert currencies.count('usd') >= 4 and currencies.count('eur') >= 4
+        logger.info("✓ Each currency paginates until its last page")
+        
+        # A single currency keeps the one-request path and is still tagged
+        with mock.patch.object(extractor.session, 'get', wraps=extractor.session.get) as session_get:
+            df = extractor.extract_top_coins(limit=10, vs_currencies=['eur'])
+        assert len(df) == 10 and set(df['vs_currency']) == {'eur'}
+        assert session_get.call_count == 1
+        logger.info("✓ Single currency tagged with vs_currency")
+        
+        # Coins repeat across currencies without being flagged as duplicates
+        raw = extractor.extract_top_coins(limit=50, vs_currencies=['usd', 'eur'])
+        validator = DataValidator()
+        transformer = CryptoTransformer(validator=validator)
+        clean = transformer.transform(raw)
+        reasons = transformer.last_quarantine.get('quarantine_reason', [])
+        assert not any('duplicate' in reason for reason in reasons)
+        assert len(clean) + len(transformer.last_quarantine) == 100
+        assert set(clean['vs_currency'].astype(str)) == {'usd', 'eur'}
+        assert clean['crypto_id'].duplicated().any()
+        extractor.close()
+        logger.info("✓ Transform and validation key rows by coin and currency")
+
+except Exception as e:
+    logger.error(f"✗ Multi-currency test failed: {e!r}")
+    exit(1)
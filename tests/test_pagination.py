@@ -0,0 +1,47 @@
+from benchmarks.fake_coingecko import FakeCoinGeckoServer
+from etl.extract import CryptoExtractor
+from etl.logger import setup_logger
+
+logger = setup_logger("test_pagination")
+
+def extractor_for(server, workers=4):
+    extractor = CryptoExtractor(workers=workers, calls_per_minute=0, cache_mode='off')
+    extractor.base_url = server.base_url
+    return extractor
+
+try:
+    logger.info("Testing paginated market extraction...")
+    
+    with FakeCoinGeckoServer(coins=620) as server:
+        extractor = extractor_for(server)
+        
+        # Every listed coin, in rank order, each exactly once
+        df = extractor.extract_all_coins(max_coins=None, per_page=250, vs_currencies=['usd'])
+        assert len(df) == 620, len(df)
+        assert df['id'].is_unique
+        assert list(df['market_cap_rank']) == list(range(1, 621))
+        logger.info("✓ Unbounded crawl returns every coin once, in order")
+        
+        # max_coins trims the last page and requests no page beyond it
+        served = server.requests_served
+        df = extractor.extract_all_coins(max_coins=300, per_page=100, vs_currencies=['usd'])
+        assert len(df) == 300 and df['id'].is_unique
+        assert server.requests_served - served == 3, server.requests_served - served
+        logger.info("✓ max_coins bounds the page count")
+        
+        # limit=None routes through the paginated crawl
+        assert len(extractor.extract_top_coins(limit=None, vs_currencies=['usd'])) == 620
+        extractor.close()
+    
+    # A universe that ends on a page boundary stops at the first empty page
+    with FakeCoinGeckoServer(coins=200) as server:
+        extractor = extractor_for(server, workers=1)
+        df = extractor.extract_all_coins(max_coins=None, per_page=100, vs_currencies=['usd'])
+        assert len(df) == 200
+        assert server.requests_served == 3, server.requests_served
+        extractor.close()
+    logger.info("✓ Crawl terminates on a short or empty page")
+
+except Exception as e:
+    logger.error(f"✗ Pagination test failed: {e!r}")
+    exit(1)
@@ -0,0 +1,46 @@
+import pandas as pd
+from etl.poller import ChangeDetector
+from etl.logger import setup_logger
+
+logger = setup_logger("test_poller")
+
+def snapshot(prices, last_updated="2025-09-15T12:00:00.000Z"):
+    return pd.DataFrame({
+        'crypto_id': ['bitcoin', 'ethereum'],
+        'vs_currency': ['usd', 'usd'],
+        'last_updated': [last_updated] * 2,
+        'current_price': prices,
+        'market_cap': pd.array([1_200_000_000_000, 400_000_000_000], dtype='Int64'),
+        'rank': pd.array([1, 2], dtype='Int32'),
+        'volume_24h': pd.array([30_000_000_000, None], dtype='Int64'),
+        'price_change_24h': [1.5, -0.5],
+        'circulating_supply': pd.array([19_700_000, 120_000_000], dtype='Int64')
+    })
+
+try:
+    logger.info("Testing poller change detection...")
+    
+    detector = ChangeDetector()
+    
+    # Coins stored before a restart are skipped until their last_updated moves
+    detector.seed(pd.DataFrame({
+        'crypto_id': ['bitcoin'], 'vs_currency': ['usd'], 'last_updated': [pd.Timestamp("2025-09-15 12:00")]
+    }))
+    first = detector.changes(snapshot([60000.0, 3000.0]))
+    assert list(first['crypto_id']) == ['ethereum']
+    detector.update(first)
+    logger.info("✓ Seeded coins are not rewritten")
+    
+    # Unchanged snapshot writes nothing
+    assert detector.changes(snapshot([60000.0, 3000.0])).empty
+    logger.info("✓ Unchanged coins are skipped")
+    
+    # A value change or a newer last_updated is picked up
+    assert list(detector.changes(snapshot([60000.0, 3100.0]))['crypto_id']) == ['ethereum']
+    newer = detector.changes(snapshot([60000.0, 3000.0], last_updated="2025-09-15T12:01:00.000Z"))
+    assert list(newer['crypto_id']) == ['bitcoin', 'ethereum']
+    logger.info("✓ Changed values and newer snapshots are detected")
+    
+except Exception as e:
+    logger.error(f"✗ Poller test failed: {e}")
+    exit(1)
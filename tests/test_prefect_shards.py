@@ -0,0 +1,49 @@
+from etl.config import COINGECKO_MAX_PER_PAGE
+from etl.prefect_flow import plan_shards_task
+from etl.logger import setup_logger
+
+logger = setup_logger("test_prefect_shards")
+
+def plan(limit, currencies=('usd',)):
+    # The task's own function: no flow run or Prefect server needed
+    return plan_shards_task.fn(limit, list(currencies))
+
+try:
+    logger.info("Testing Prefect shard planning...")
+    
+    # A limit within one page is a single shard of exactly that size
+    assert plan(50) == [{'vs_currency': 'usd', 'page': 1, 'per_page': 50, 'limit': 50}]
+    assert plan(COINGECKO_MAX_PER_PAGE) == [
+        {'vs_currency': 'usd', 'page': 1, 'per_page': COINGECKO_MAX_PER_PAGE, 'limit': COINGECKO_MAX_PER_PAGE}
+    ]
+    logger.info("✓ Small limits plan one page")
+    
+    # Larger limits use full pages and trim the last one
+    limit = COINGECKO_MAX_PER_PAGE * 2 + 10
+    shards = plan(limit)
+    assert [shard['page'] for shard in shards] == [1, 2, 3]
+    assert all(shard['per_page'] == COINGECKO_MAX_PER_PAGE for shard in shards)
+    assert [shard['limit'] for shard in shards] == [COINGECKO_MAX_PER_PAGE, COINGECKO_MAX_PER_PAGE, 10]
+    assert sum(shard['limit'] for shard in shards) == limit
+    logger.info("✓ Pages cover the limit exactly")
+    
+    # Every page is planned once per quote currency
+    shards = plan(COINGECKO_MAX_PER_PAGE + 1, currencies=['usd', 'eur'])
+    assert [(shard['vs_currency'], shard['page']) for shard in shards] == [
+        ('usd', 1), ('usd', 2), ('eur', 1), ('eur', 2)
+    ]
+    assert plan(100, currencies=[]) == []
+    logger.info("✓ One shard per page and currency")
+    
+    # Limits below one fail clearly instead of dividing by zero
+    for bad in (0, -5, None):
+        try:
+            plan(bad)
+            raise AssertionError(f"limit {bad!r} was accepted")
+        except ValueError as e:
+            assert "at least 1" in str(e)
+    logger.info("✓ Limits below 1 rejected")
+
+except Exception as e:
+    logger.error(f"✗ Prefect shard test failed: {e!r}")
+    exit(1)
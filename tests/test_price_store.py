@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+from etl.price_store import PriceStore
+from etl.logger import setup_logger
+
+logger = setup_logger("test_price_store")
+
+def snapshot(minute, coins=5, currency='usd'):
+    return pd.DataFrame({
+        'crypto_id': [f"coin{i}" for i in range(coins)],
+        'vs_currency': currency,
+        'current_price': [100.0 * (i + 1) + minute for i in range(coins)],
+        'market_cap': pd.array([1_000_000 * (i + 1) for i in range(coins)], dtype='Int64'),
+        'volume_24h': pd.array([None] + [10] * (coins - 1), dtype='Int64'),
+        'price_change_24h': 0.5,
+        'rank': pd.array(list(range(coins, 0, -1)), dtype='Int32'),
+        'last_updated': (pd.Timestamp("2025-09-15") + pd.Timedelta(minutes=minute)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    })
+
+directory = tempfile.mkdtemp()
+
+try:
+    logger.info("Testing ring-buffer price store...")
+
+    store = PriceStore(depth=4, capacity=2)
+    for minute in range(6):
+        store.append(snapshot(minute))
+    assert len(store) == 5
+
+    # Ring wrapped: only the newest depth snapshots remain, oldest first
+    window = store.window('coin0')
+    assert list(window['current_price']) == [102.0, 103.0, 104.0, 105.0]
+    assert list(store.window('coin0', points=2)['current_price']) == [104.0, 105.0]
+    assert len(store.window('coin0', since=pd.Timestamp("2025-09-15 00:04"))) == 2
+    assert store.latest_value('coin4') == 505.0
+    assert store.latest_value('missing') is None
+    logger.info("✓ Ring buffer wraps and windows are ordered")
+
+    # Replayed and older snapshots are ignored; several snapshots of a coin in one frame all land
+    assert store.append(snapshot(3)) == 0
+    assert store.append(pd.concat([snapshot(6, coins=1), snapshot(7, coins=1)])) == 2
+    assert store.latest_value('coin0') == 107.0
+    logger.info("✓ Stale snapshots are skipped")
+
+    # Top-N by latest value, per currency
+    store.append(snapshot(0, coins=2, currency='eur'))
+    top = store.top_n(2)
+    assert list(top['crypto_id']) == ['coin4', 'coin3']
+    assert list(store.top_n(1, by='current_price', ascending=True)['crypto_id']) == ['coin0']
+    assert list(store.latest('eur')['crypto_id']) == ['coin0', 'coin1']
+    assert store.stats()['unique_cryptos'] == 5
+    logger.info("✓ Latest, top-N and stats")
+
+    # Memory-mapped snapshot round trip
+    store.snapshot(directory)
+    reopened = PriceStore.open(directory)
+    pd.testing.assert_frame_equal(reopened.latest(), store.latest())
+    reopened.append(snapshot(8))
+    assert reopened.latest_value('coin1') == 208.0 and store.latest_value('coin1') == 205.0
+    assert PriceStore.open(directory + "_missing") is None
+
+    # A new snapshot switches CURRENT in one step and keeps only the previous version
+    first = store.snapshot(directory)
+    second = store.snapshot(directory)
+    assert PriceStore.open(directory)._keys == store._keys
+    assert sorted(name for name in os.listdir(directory) if name.startswith('v')) == sorted(
+        os.path.basename(path) for path in (first, second))
+    logger.info("✓ Snapshot reopens memory-mapped and stays writable")
+
+    # Query latency on a few thousand coins
+    big = PriceStore(depth=288)
+    big.append(snapshot(0, coins=5000))
+    start = time.perf_counter()
+    for _ in range(1000):
+        big.latest_value('coin42')
+    latest_us = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    big.top_n(10)
+    top_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"✓ latest_value {latest_us:.2f} µs, top_n(10) of 5000 coins {top_ms:.2f} ms")
+
+except Exception as e:
+    logger.error(f"✗ Price store test failed: {e}")
+    exit(1)
+
+finally:
+    shutil.rmtree(directory, ignore_errors=True)
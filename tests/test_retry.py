@@ -0,0 +1,80 @@
+from email.utils import formatdate
+from time import time
+from unittest import mock
+import requests
+from benchmarks.fake_coingecko import FakeCoinGeckoServer
+from etl.config import API_BACKOFF_BASE, API_BACKOFF_MAX, API_RETRY_AFTER_MAX
+from etl.extract import CryptoExtractor
+from etl.logger import setup_logger
+
+logger = setup_logger("test_retry")
+
+def response(status, headers=None, body=b'[]'):
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers or {})
+    r._content = body
+    r.url = "http://fake/api/v3/coins/markets"
+    return r
+
+def run(responses, max_retries=5):
+    """Serve canned responses to _get and return (result or error, sleeps)"""
+    extractor = CryptoExtractor(workers=1, calls_per_minute=0, max_retries=max_retries, cache_mode='off')
+    extractor.session.get = mock.Mock(side_effect=responses)
+    with mock.patch('etl.extract.time.sleep') as sleep:
+        try:
+            result = extractor._get("/coins/markets")
+        except requests.exceptions.RequestException as e:
+            result = e
+    return result, [call.args[0] for call in sleep.call_args_list], extractor
+
+try:
+    logger.info("Testing retry, backoff and Retry-After handling...")
+    
+    # Retry-After is honoured as sent, even beyond the backoff ceiling
+    wait = API_BACKOFF_MAX * 2
+    result, sleeps, extractor = run([response(429, {'Retry-After': str(int(wait))}), response(200)])
+    assert result.status_code == 200
+    assert sleeps == [wait], sleeps
+    assert extractor.stats.summary()['retries'] == 1
+    logger.info("✓ Retry-After seconds honoured above API_BACKOFF_MAX")
+    
+    # ...up to its own ceiling, and as an HTTP date
+    _, sleeps, _ = run([response(503, {'Retry-After': str(int(API_RETRY_AFTER_MAX * 10))}), response(200)])
+    assert sleeps == [API_RETRY_AFTER_MAX], sleeps
+    _, sleeps, _ = run([response(429, {'Retry-After': formatdate(time() + 30, usegmt=True)}), response(200)])
+    assert 25 <= sleeps[0] <= 30, sleeps
+    _, sleeps, _ = run([response(429, {'Retry-After': '0'}), response(200)])
+    assert sleeps == [0.0], sleeps
+    logger.info("✓ Retry-After capped at API_RETRY_AFTER_MAX, parsed from HTTP dates and 0 honoured")
+    
+    # Without Retry-After the jittered backoff grows and stays under API_BACKOFF_MAX
+    errors = [response(500), requests.exceptions.ConnectionError("reset"), response(502), response(504)]
+    result, sleeps, _ = run(errors + [response(200)])
+    assert result.status_code == 200 and len(sleeps) == 4
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(API_BACKOFF_MAX, API_BACKOFF_BASE * 2 ** attempt), (attempt, delay)
+    logger.info("✓ Exponential backoff with jitter for errors and dropped connections")
+    
+    # Retries are bounded; the last error surfaces and client errors are not retried
+    result, sleeps, extractor = run([response(503)] * 3, max_retries=2)
+    assert isinstance(result, requests.exceptions.HTTPError) and len(sleeps) == 2
+    assert extractor.stats.summary()['failures'] == 1
+    result, sleeps, _ = run([response(404)])
+    assert isinstance(result, requests.exceptions.HTTPError) and sleeps == []
+    logger.info("✓ Retries bounded by max_retries, 4xx not retried")
+    
+    # A throttling server still yields every page
+    with FakeCoinGeckoServer(coins=500, throttle_rate=0.3, error_rate=0.1) as server:
+        extractor = CryptoExtractor(workers=4, calls_per_minute=0, max_retries=10, cache_mode='off')
+        extractor.base_url = server.base_url
+        with mock.patch('etl.extract.time.sleep'):
+            df = extractor.extract_all_coins(max_coins=500, per_page=100, vs_currencies=['usd'])
+        assert len(df) == 500 and df['id'].is_unique
+        assert extractor.stats.summary()['retries'] > 0
+        extractor.close()
+    logger.info("✓ Extraction completes through injected 429s and 500s")
+
+except Exception as e:
+    logger.error(f"✗ Retry test failed: {e!r}")
+    exit(1)
@@ -0,0 +1,142 @@
+from unittest import mock
+import pandas as pd
+from benchmarks.fake_coingecko import FakeCoinGeckoServer
+from etl.extract import CryptoExtractor
+from etl.transform import CryptoTransformer
+from etl.pipeline import run_etl_pipeline
+from etl.logger import setup_logger
+
+logger = setup_logger("test_streaming")
+
+# Run-dependent columns (the fake API stamps last_updated per request)
+VOLATILE_COLUMNS = ['last_updated', 'extracted_at', 'extracted_date']
+
+# The real transform, for wrappers patched over it
+TRANSFORM = CryptoTransformer.transform
+
+class RecordingLoader:
+    """CryptoLoader stand-in that keeps every loaded chunk in memory"""
+    
+    instances = []
+    
+    def __init__(self, metrics=None, store=None, fail_on_chunk=None):
+        self.metrics = metrics
+        self.store = store
+        self.fail_on_chunk = fail_on_chunk
+        self.chunks = []
+        self.writes = []
+        self.last_load_stats = {}
+        RecordingLoader.instances.append(self)
+    
+    def health_check(self):
+        return True
+    
+    def create_tables(self):
+        pass
+    
+    def get_latest_versions(self):
+        return pd.DataFrame(columns=['crypto_id', 'vs_currency', 'last_updated', 'current_price', 'market_cap'])
+    
+    def load_data(self, df, method='upsert', **kwargs):
+        if self.fail_on_chunk == len(self.chunks):
+            raise RuntimeError("database went away")
+        self.chunks.append(df)
+        self.writes.append('prices')
+        self.last_load_stats = {'method': method, 'records': len(df)}
+        return len(df)
+    
+    def save_quarantine(self, df):
+        self.writes.append('quarantine')
+        return len(df)
+    
+    def get_indicator_state(self):
+        return pd.DataFrame()
+    
+    def save_indicators(self, indicators, state):
+        assert len(state) == len(indicators)
+        self.writes.append('indicators')
+        return len(indicators)
+    
+    def apply_retention(self):
+        pass
+    
+    def get_latest_stats(self):
+        return {}
+
+class ClosingExtractor(CryptoExtractor):
+    """CryptoExtractor recording whether the pipeline closed it"""
+    
+    closed = False
+    
+    def close(self):
+        ClosingExtractor.closed = True
+        super().close()
+
+def quarantining_first_row(self, df, **kwargs):
+    clean = TRANSFORM(self, df, **kwargs)
+    self.last_quarantine = clean.head(1)
+    return clean
+
+def run(server, streaming, limit, indicators=False, validation=False, **loader_options):
+    def extractor(metrics=None):
+        instance = ClosingExtractor(calls_per_minute=0, cache_mode='off', metrics=metrics)
+        instance.base_url = server.base_url
+        return instance
+    
+    ClosingExtractor.closed = False
+    with mock.patch.multiple('etl.pipeline', CryptoExtractor=extractor,
+                             CryptoLoader=lambda metrics=None: RecordingLoader(metrics, **loader_options),
+                             LANDING_ENABLED=False, STORE_ENABLED=False, INDICATORS_ENABLED=indicators,
+                             VALIDATION_ENABLED=validation, _export_metrics=lambda metrics: []):
+        result = run_etl_pipeline(limit=limit, streaming=streaming)
+    return result, RecordingLoader.instances[-1]
+
+def loaded(loader):
+    # Chunks carry their own categories; compare the values
+    chunks = [chunk.astype({c: str for c in chunk.select_dtypes('category').columns}) for chunk in loader.chunks]
+    df = pd.concat(chunks, ignore_index=True).drop(columns=VOLATILE_COLUMNS)
+    return df.sort_values('crypto_id').reset_index(drop=True)
+
+try:
+    logger.info("Testing streaming against batch pipeline runs...")
+    
+    with FakeCoinGeckoServer(coins=700) as server:
+        batch, batch_loader = run(server, streaming=False, limit=600)
+        stream, stream_loader = run(server, streaming=True, limit=600)
+        
+        # Same rows, values and dtypes whether loaded at once or page by page
+        assert batch['success'] and stream['success'], (batch.get('error'), stream.get('error'))
+        assert len(batch_loader.chunks) == 1 and len(stream_loader.chunks) == 3
+        pd.testing.assert_frame_equal(loaded(batch_loader), loaded(stream_loader))
+        logger.info("✓ Streaming loads the same rows as a batch run")
+        
+        # Run summaries agree
+        assert batch['records_processed'] == stream['records_processed'] == 600
+        for key in ['records_in', 'records_out']:
+            assert batch['transform_stats'][key] == stream['transform_stats'][key] == 600
+        assert stream['transform_stats']['chunks'] == 3
+        assert stream['load_stats']['chunks'] == 3
+        quality = ['total_records', 'null_prices', 'null_market_caps', 'price_categories']
+        assert {k: batch['data_quality'][k] for k in quality} == {k: stream['data_quality'][k] for k in quality}
+        logger.info("✓ Record counts and quality reports match")
+        
+        # A background load failure fails the run
+        failed, _ = run(server, streaming=True, limit=600, fail_on_chunk=1)
+        assert not failed['success'] and 'database went away' in failed['error']
+        assert ClosingExtractor.closed
+        logger.info("✓ Background load failure surfaces as a failed run")
+        
+        # Each page's quarantined rows and indicators are written right after its prices
+        _, loader = run(server, streaming=True, limit=600, indicators=True)
+        assert loader.writes == ['prices', 'indicators'] * 3, loader.writes
+        assert ClosingExtractor.closed
+        with mock.patch.object(CryptoTransformer, 'transform', quarantining_first_row):
+            _, loader = run(server, streaming=True, limit=600)
+        assert loader.writes == ['prices', 'quarantine'] * 3, loader.writes
+        _, loader = run(server, streaming=False, limit=600, indicators=True)
+        assert loader.writes == ['prices', 'indicators'] and ClosingExtractor.closed
+        logger.info("✓ Quarantine and indicators saved per page; extractor closed on both paths")
+
+except Exception as e:
+    logger.error(f"✗ Streaming test failed: {e!r}")
+    exit(1)
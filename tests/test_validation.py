@@ -0,0 +1,104 @@
+import time
+import pandas as pd
+from etl.transform import CryptoTransformer
+from etl.validation import DataValidator
+from etl.logger import setup_logger
+
+logger = setup_logger("test_validation")
+
+def markets(minute, coins=50, price_factor=1.0):
+    """Raw /coins/markets rows, as the extractor returns them"""
+    return pd.DataFrame({
+        'id': [f"coin{i}" for i in range(coins)],
+        'symbol': [f"c{i}" for i in range(coins)],
+        'name': [f"Coin {i}" for i in range(coins)],
+        'current_price': [price_factor * (i + 1) for i in range(coins)],
+        'market_cap': [price_factor * 1e9 * (i + 1) for i in range(coins)],
+        'market_cap_rank': list(range(coins, 0, -1)),
+        'total_volume': 1e6,
+        'price_change_percentage_24h': 1.5,
+        'circulating_supply': 1e9,
+        'last_updated': f"2025-09-15T12:{minute:02d}:00.000Z",
+        'vs_currency': 'usd'
+    })
+
+try:
+    logger.info("Testing validation and quarantine...")
+
+    validator = DataValidator(max_price_jump=5, market_cap_zscore=8)
+    transformer = CryptoTransformer(validator=validator)
+    assert len(transformer.transform(markets(0))) == 50
+    assert transformer.last_quarantine.empty
+
+    # Schema failures and duplicates are quarantined with every failing check named
+    bad = markets(1, price_factor=1.01)
+    bad['current_price'] = bad['current_price'].astype(object)
+    bad.loc[0, 'current_price'] = 'n/a'
+    bad.loc[1, 'market_cap'] = -5.0
+    bad.loc[2, 'symbol'] = 'x' * 11
+    bad.loc[3, 'last_updated'] = 'yesterday'
+    bad.loc[4, 'id'] = 'coin5'
+    bad.loc[6, 'last_updated'] = None
+    clean = transformer.transform(bad)
+    reasons = transformer.last_quarantine['quarantine_reason']
+    assert reasons[0] == 'type:current_price,null:current_price'
+    assert reasons[1] == 'range:market_cap'
+    assert reasons[2] == 'length:symbol'
+    assert reasons[3] == 'type:last_updated'
+    # coin4's values under coin5's id: first occurrence fails against coin5's history, the second is a duplicate
+    assert reasons[4] == 'market_cap_zscore' and reasons[5] == 'duplicate:crypto_id'
+    # Without last_updated a snapshot has no natural key to be loaded idempotently under
+    assert reasons[6] == 'null:last_updated'
+    assert len(clean) == 43 and transformer.last_batch_stats['quarantined'] == 7
+    assert 'extracted_date' in transformer.last_quarantine.columns
+    logger.info(f"✓ Schema checks: {validator.last_report['failures']}")
+
+    # A 100x jump is quarantined once, then accepted when the next snapshot confirms it
+    jump = markets(2, price_factor=1.02)
+    jump.loc[10, ['current_price', 'market_cap']] *= 100
+    transformer.transform(jump)
+    assert list(transformer.last_quarantine['crypto_id']) == ['coin10']
+    assert 'price_jump' in transformer.last_quarantine['quarantine_reason'].iloc[0]
+    confirmed = markets(3, price_factor=1.03)
+    confirmed.loc[10, ['current_price', 'market_cap']] *= 100
+    assert len(transformer.transform(confirmed)) == 50 and transformer.last_quarantine.empty
+    logger.info("✓ Price jumps are quarantined until confirmed")
+
+    # Market cap outlier within the price limit, and a seeded validator checks the first batch
+    seeded = DataValidator()
+    seeded.seed(pd.DataFrame({'crypto_id': ['coin7'], 'vs_currency': ['usd'], 'last_updated': [None],
+                              'current_price': [8.0], 'market_cap': [8e9]}))
+    outlier = markets(4, price_factor=1.04)
+    outlier.loc[10, ['current_price', 'market_cap']] *= 100
+    outlier.loc[20, 'market_cap'] *= 4
+    transformer.transform(outlier)
+    assert list(transformer.last_quarantine['quarantine_reason']) == ['market_cap_zscore']
+    first = markets(0)
+    first.loc[7, 'current_price'] = 800.0
+    CryptoTransformer(validator=seeded).transform(first)
+    assert seeded.last_report['failures'] == {'price_jump': 1}
+    logger.info("✓ Market cap z-score and seeded history")
+
+    # Values too large for their BIGINT column are range failures, not a failed batch
+    huge = markets(5, price_factor=1.04)
+    huge.loc[10, ['current_price', 'market_cap']] *= 100
+    huge.loc[30, 'circulating_supply'] = 1e20
+    huge.loc[31, 'total_volume'] = 1e19
+    assert len(transformer.transform(huge)) == 48
+    reasons = transformer.last_quarantine.set_index('crypto_id')['quarantine_reason']
+    assert reasons['coin30'] == 'range:circulating_supply' and reasons['coin31'] == 'range:volume_24h'
+    logger.info("✓ Out-of-range integers are quarantined")
+
+    # Vectorized: 10,000 rows validate in milliseconds
+    big = DataValidator()
+    renamed = transformer._rename_columns(markets(0, coins=10000))
+    coerced = transformer._coerce_dtypes(renamed)
+    big.validate(coerced, original=renamed)
+    start = time.perf_counter()
+    valid, quarantined = big.validate(coerced, original=renamed)
+    assert len(valid) == 10000 and quarantined.empty
+    logger.info(f"✓ 10,000 rows validated in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+except Exception as e:
+    logger.error(f"✗ Validation test failed: {e}")
+    exit(1)